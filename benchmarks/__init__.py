@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Performance benchmarks for edn_format.
+
+Run the whole suite, over the corpora of ``benchmarks.corpora``, with::
+
+    python -m benchmarks
+
+Each other module of this package can be run on its own, e.g.::
+
+    python -m benchmarks.parser_cache
+"""
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Run the benchmark suite: measure ``loads``, ``loads_all`` and ``dumps`` on
+each corpus of ``benchmarks.corpora``, with each engine.
+
+    python -m benchmarks [--scale N] [--repeat N] [--engine ENGINE ...]
+                         [--corpus NAME ...] [--json PATH]
+                         [--compare BASELINE] [--threshold RATIO]
+
+``loads`` parses the corpus as a single vector, ``loads_all`` as
+newline-delimited top-level values, and ``dumps`` writes that vector. The
+time of each measure is the best of ``--repeat`` runs; the peak memory is
+measured in one more run, with ``tracemalloc``.
+
+``--json`` writes the results to a file (``-`` for the standard output, the
+table then goes to the standard error), so that the results of two commits
+can be compared with ``--compare``: the command exits with status 1 if a
+measure is slower than in the baseline by more than ``--threshold`` (0.1 by
+default, i.e. 10%).
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import edn_format
+from edn_format.edn_parse import ENGINES
+
+from .corpora import CORPORA
+
+
+def _commit():
+    # the commit of the working tree, if it's a git checkout
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _peak_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(corpus, scale, engines, repeat):
+    """
+    Return the list of the results of the operations on ``corpus``, as dicts.
+    """
+    values = CORPORA[corpus](scale)
+    vector = edn_format.dumps(values)
+    lines = '\n'.join(edn_format.dumps(value) for value in values)
+    cases = []
+    for engine in engines:
+        cases.append(('loads', engine, vector,
+                      lambda engine=engine: edn_format.loads(vector, engine=engine)))
+        cases.append(('loads_all', engine, lines,
+                      lambda engine=engine: edn_format.loads_all(lines, engine=engine)))
+    cases.append(('dumps', None, vector, lambda: edn_format.dumps(values)))
+
+    results = []
+    for operation, engine, text, fn in cases:
+        size = len(text.encode('utf-8'))
+        seconds = _best_time(fn, repeat)
+        results.append({
+            'corpus': corpus,
+            'operation': operation,
+            'engine': engine,
+            'bytes': size,
+            'forms': len(values),
+            'seconds': seconds,
+            'mb_per_s': size / 1e6 / seconds,
+            'forms_per_s': len(values) / seconds,
+            'peak_mb': _peak_memory(fn) / 1e6,
+        })
+    return results
+
+
+def _key(result):
+    return result['corpus'], result['operation'], result['engine']
+
+
+def _label(result):
+    return '{:<16} {:<10} {:<5}'.format(
+        result['corpus'], result['operation'], result['engine'] or '')
+
+
+def compare(results, baseline, threshold, out):
+    """
+    Print the ratio of the time of each result to the one of the same measure
+    in ``baseline``, and return the list of the results that are slower by
+    more than ``threshold``.
+    """
+    previous = {_key(result): result for result in baseline['results']}
+    regressions = []
+    print('\ncompared with {}:'.format(baseline.get('commit') or 'the baseline'), file=out)
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(result)
+            flag = '  REGRESSION'
+        print('{} {:8.3f} s -> {:8.3f} s  x{:.2f}{}'.format(
+            _label(result), old['seconds'], result['seconds'], ratio, flag), file=out)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Run the benchmark suite.')
+    parser.add_argument('--scale', type=int, default=1, help='size of the corpora (default: 1)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each measure (default: 3)')
+    parser.add_argument('--engine', action='append', choices=ENGINES, help='engine (default: all)')
+    parser.add_argument('--corpus', action='append', choices=sorted(CORPORA),
+                        help='corpus (default: all)')
+    parser.add_argument('--json', metavar='PATH',
+                        help='write the results as JSON to PATH ("-": stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown ratio above which a measure is a regression (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    out = sys.stderr if args.json == '-' else sys.stdout
+    results = []
+    print('{:<16} {:<10} {:<5} {:>9} {:>9} {:>11} {:>9}'.format(
+        'corpus', 'operation', 'eng.', 'seconds', 'MB/s', 'forms/s', 'peak MB'), file=out)
+    for corpus in args.corpus or sorted(CORPORA):
+        for result in measure(corpus, args.scale, args.engine or ENGINES, args.repeat):
+            print('{} {:9.3f} {:9.2f} {:11.0f} {:9.1f}'.format(
+                _label(result), result['seconds'], result['mb_per_s'], result['forms_per_s'],
+                result['peak_mb']), file=out)
+            results.append(result)
+
+    report = {
+        'commit': _commit(),
+        'date': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, out):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Measure how long the event loop is blocked while EDN messages are read from a
+socket: buffering the whole stream and calling ``loads_all``, against
+``aio.read_forms``, with and without an executor for the large forms.
+
+    python -m benchmarks.aio [records]
+
+``records`` defaults to 100000 maps, sent as 100 small messages followed by
+one vector of all of them.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import asyncio
+import concurrent.futures
+import socket
+import sys
+import time
+
+import edn_format
+from edn_format import aio
+
+
+async def ticker(stalls):
+    # record the longest delay of a 1 ms sleep
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - start)
+
+
+async def run(label, data, read):
+    sockets = socket.socketpair()
+    reader, reader_writer = await asyncio.open_connection(sock=sockets[0])
+    _, writer = await asyncio.open_connection(sock=sockets[1])
+
+    async def send():
+        for start in range(0, len(data), 64 * 1024):
+            writer.write(data[start:start + 64 * 1024])
+            await writer.drain()
+        writer.close()
+
+    stalls = []
+    tick = asyncio.ensure_future(ticker(stalls))
+    start = time.perf_counter()
+    values, _ = await asyncio.gather(read(reader), send())
+    elapsed = time.perf_counter() - start
+    # let the ticker record the last stall
+    await asyncio.sleep(0.01)
+    tick.cancel()
+    reader_writer.close()
+    print("{:<36} {:7.3f} s, loop blocked up to {:6.3f} s".format(label, elapsed, max(stalls)))
+    return values
+
+
+async def main(records):
+    small = "".join('{{:id {0} :user "user {0}"}}\n'.format(i) for i in range(100))
+    big = edn_format.dumps([{edn_format.Keyword("id"): i, edn_format.Keyword("scores"): [1, 2.5, 3]}
+                            for i in range(records)])
+    data = (small + big + "\n").encode("utf-8")
+
+    async def buffered(reader):
+        return edn_format.loads_all((await reader.read()).decode("utf-8"), engine="fast")
+
+    async def incremental(reader, executor=None):
+        return [value async for value in aio.read_forms(reader, executor=executor, engine="fast")]
+
+    expected = await run("read() + loads_all", data, buffered)
+    values = await run("read_forms", data, incremental)
+    assert values == expected
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        values = await run("read_forms, process pool", data,
+                           lambda reader: incremental(reader, executor))
+    assert values == expected
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
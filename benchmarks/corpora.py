@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic corpora of EDN values for the benchmark suite.
+
+Each corpus is a function of a ``scale`` (1 gives documents of a few hundred
+kilobytes) that returns the list of its top-level values; the same scale
+always gives the same values.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import datetime
+import random
+import uuid
+
+from edn_format import Keyword, MetadataValue, Symbol
+from edn_format.rfc3339 import UTC
+
+
+def numeric_vector(scale):
+    """One flat vector of integers and one of floats."""
+    rand = random.Random(1)
+    count = 20000 * scale
+    return [[rand.randint(-10 ** 9, 10 ** 9) for _ in range(count)],
+            [rand.uniform(-1e6, 1e6) for _ in range(count)]]
+
+
+def nested_maps(scale):
+    """Maps nested 12 levels deep, with a few entries at each level."""
+    rand = random.Random(2)
+
+    def build(depth):
+        node = {Keyword("depth"): depth, Keyword("weight"): rand.random()}
+        if depth < 12:
+            width = 2 if depth % 4 == 0 else 1
+            node[Keyword("children")] = [build(depth + 1) for _ in range(width)]
+        return node
+
+    return [build(0) for _ in range(100 * scale)]
+
+
+def keyword_records(scale):
+    """Flat records with namespaced keyword keys and keyword values."""
+    rand = random.Random(3)
+    statuses = [Keyword("status/" + name) for name in ("active", "pending", "closed", "failed")]
+    return [
+        {
+            Keyword("user/id"): i,
+            Keyword("user/status"): rand.choice(statuses),
+            Keyword("user/roles"): frozenset(Keyword("role/" + r)
+                                             for r in rand.sample("abcdefgh", 3)),
+            Keyword("user/score"): round(rand.random(), 4),
+            Keyword("user/admin?"): rand.random() < .1,
+            Keyword("user/manager"): None if i % 3 else i // 3,
+        }
+        for i in range(2500 * scale)
+    ]
+
+
+def escaped_strings(scale):
+    """Strings full of quotes, backslashes, newlines, tabs and non-ASCII text."""
+    rand = random.Random(4)
+    pieces = ['"quoted"', "back\\slash", "line\nbreak", "tab\tstop", "café", "€ 12", "plain text"]
+    return [[" ".join(rand.choice(pieces) for _ in range(6)) for _ in range(10)]
+            for _ in range(1000 * scale)]
+
+
+def tagged_stream(scale):
+    """A stream of events with #inst timestamps and #uuid identifiers."""
+    rand = random.Random(5)
+    start = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+    return [
+        {
+            Keyword("event/id"): uuid.UUID(int=rand.getrandbits(128)),
+            Keyword("event/at"): start + datetime.timedelta(
+                seconds=i, microseconds=rand.randint(0, 999999)),
+            Keyword("event/day"): (start + datetime.timedelta(days=i % 365)).date(),
+        }
+        for i in range(4000 * scale)
+    ]
+
+
+def metadata_forms(scale):
+    """Symbols and vectors with metadata maps and keyword metadata."""
+    rand = random.Random(6)
+    return [
+        MetadataValue(
+            {Keyword("line"): i, Keyword("column"): rand.randint(1, 80), Keyword("private"): True},
+            [MetadataValue(Keyword("tag"), Symbol("arg{}".format(j))) for j in range(4)])
+        for i in range(3000 * scale)
+    ]
+
+
+CORPORA = {
+    'numeric_vector': numeric_vector,
+    'nested_maps': nested_maps,
+    'keyword_records': keyword_records,
+    'escaped_strings': escaped_strings,
+    'tagged_stream': tagged_stream,
+    'metadata_forms': metadata_forms,
+}
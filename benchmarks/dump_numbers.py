@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Measure ``dumps`` on numeric payloads: lists, arrays and ranges of numbers,
+which are dumped in bulk, against the same numbers preceded by a string,
+which makes the list go through the items one by one, and records holding
+short series.
+
+    python -m benchmarks.dump_numbers [count]
+
+``count`` defaults to 10**6 numbers of each type.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import array
+import random
+import sys
+import time
+
+import edn_format
+
+
+def measure(label, obj):
+    start = time.time()
+    text = edn_format.dumps(obj)
+    print("{:<36} {:7.3f} s".format(label, time.time() - start))
+    return text
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    rng = random.Random(42)
+    ints = [rng.randint(-10 ** 9, 10 ** 9) for _ in range(count)]
+    floats = [rng.uniform(-1e6, 1e6) for _ in range(count)]
+
+    for name, numbers in (("ints", ints), ("floats", floats)):
+        text = measure("list of {}".format(name), numbers)
+        mixed = measure("list of {}, item by item".format(name), ["x"] + numbers)
+        assert mixed == '["x" ' + text[1:]
+        typecode = "d" if name == "floats" else "q"
+        assert measure("array of {}".format(name), array.array(typecode, numbers)) == text
+    measure("range", range(count))
+
+    key = edn_format.Keyword
+    records = [{key("sensor"): i, key("values"): floats[i:i + 10]} for i in range(0, count, 10)]
+    measure("records of 10 floats", records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the peak memory of ``dumps`` and ``dump_to`` on a large structure.
+
+    python -m benchmarks.dump_to [records]
+
+``records`` defaults to 50000 maps of a few entries each.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import time
+import tracemalloc
+
+import edn_format
+
+
+class NullWriter(object):
+    """A text stream that counts what's written to it and discards it."""
+    encoding = "utf-8"
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+
+def make_data(records):
+    return [{edn_format.Keyword("id"): i,
+             edn_format.Keyword("name"): "record-{}".format(i),
+             edn_format.Keyword("tags"): [i, i + 1, i + 2],
+             edn_format.Keyword("nested"): {"a": [{"b": i * 0.5}]}}
+            for i in range(records)]
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.time()
+    size = fn()
+    elapsed = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = make_data(records)
+
+    def to_stream():
+        writer = NullWriter()
+        edn_format.dump_to(data, writer)
+        return writer.size
+
+    for name, fn in (("dumps", lambda: len(edn_format.dumps(data))),
+                     ("dump_to", to_stream)):
+        size, elapsed, peak = measure(fn)
+        print("{:<8} {:6.1f} MB of EDN  {:6.2f} s  peak {:8.2f} MB".format(
+            name, size / 1e6, elapsed, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
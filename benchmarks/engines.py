@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the throughput of the PLY parser and of the fast reader.
+
+    python -m benchmarks.engines
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import random
+import time
+
+import edn_format
+
+
+def make_document(records, seed=42):
+    rand = random.Random(seed)
+    K = edn_format.Keyword
+    data = [
+        {
+            K("id"): i,
+            K("user/name"): "user-{}".format(rand.randint(0, 10 ** 6)),
+            K("score"): rand.random(),
+            K("tags"): frozenset(K(t) for t in rand.sample("abcdefgh", 3)),
+            K("history"): [rand.randint(-1000, 1000) for _ in range(10)],
+            K("active?"): rand.random() < .5,
+            K("parent"): None,
+        }
+        for i in range(records)
+    ]
+    return edn_format.dumps(data)
+
+
+def bench(text, engine):
+    best = None
+    for _ in range(3):
+        start = time.time()
+        edn_format.loads(text, engine=engine)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    text = make_document(10000)
+    assert edn_format.loads(text, engine="ply") == edn_format.loads(text, engine="fast")
+
+    size = len(text.encode("utf-8")) / 1e6
+    print("document: {:.1f} MB".format(size))
+    timings = {}
+    for engine in edn_format.edn_parse.ENGINES:
+        timings[engine] = bench(text, engine)
+        print("{:<6} {:8.3f} s {:8.2f} MB/s".format(
+            engine, timings[engine], size / timings[engine]))
+    print("speedup: {:.1f}x".format(timings["ply"] / timings["fast"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Compare ``IncrementalParser`` with parsing the concatenation of the chunks
+received so far after each one, on a large form that arrives in small chunks.
+
+    python -m benchmarks.incremental [items] [chunk_size]
+
+``items`` defaults to 5000 maps in one vector, received in chunks of
+``chunk_size`` (1024 by default) bytes.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import time
+
+import edn_format
+
+
+def measure(label, fn, chunks):
+    start = time.time()
+    values = fn(chunks)
+    print("{:<28} {:7.3f} s".format(label, time.time() - start))
+    return values
+
+
+def reparse(chunks):
+    received = b""
+    for chunk in chunks:
+        received += chunk
+        try:
+            return edn_format.loads_all(received, engine="fast")
+        except edn_format.EDNDecodeError:
+            pass
+
+
+def incremental(chunks):
+    parser = edn_format.IncrementalParser(engine="fast")
+    for chunk in chunks:
+        parser.feed(chunk)
+        values = list(parser.forms())
+        if values:
+            return values
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    data = edn_format.dumps([
+        {edn_format.Keyword("id"): i, edn_format.Keyword("name"): "item {}".format(i)}
+        for i in range(items)]).encode("utf-8")
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    print("{} bytes in {} chunks".format(len(data), len(chunks)))
+
+    expected = measure("parse after each chunk", reparse, chunks)
+    values = measure("IncrementalParser", incremental, chunks)
+    assert values == expected
+
+
+if __name__ == "__main__":
+    main()
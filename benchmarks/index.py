@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Compare reading a few records of a large EDN file with ``loads_all`` and with
+an ``EdnIndex``.
+
+    python -m benchmarks.index [records]
+
+``records`` defaults to 200000 top-level maps.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import edn_format
+from edn_format import index
+
+
+def measure(label, fn):
+    start = time.time()
+    result = fn()
+    print("{:<32} {:7.3f} s".format(label, time.time() - start))
+    return result
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "records.edn")
+    try:
+        with io.open(path, "w", encoding="utf-8") as f:
+            for i in range(records):
+                f.write('{{:id {0} :user "user {0}" :tags #{{:a :b}} :scores [1 2 3]}}\n'.format(i))
+        wanted = random.Random(0).sample(range(records), 1000)
+
+        data = measure("loads_all, fast engine", lambda: edn_format.loads_all(
+            io.open(path, encoding="utf-8").read(), engine="fast"))
+        expected = [data[i] for i in wanted]
+
+        edn_index = measure("index.build", lambda: index.build(path))
+        edn_index.close()
+        print("index size: {:.1f} MB".format(os.path.getsize(path + index.INDEX_SUFFIX) / 1e6))
+        with index.EdnIndex(path, engine="fast") as edn_index:
+            values = measure("EdnIndex.get, 1000 records",
+                             lambda: [edn_index.get(i) for i in wanted])
+        assert values == expected
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the parsing and generation of #inst timestamps with pyrfc3339 and
+strptime, which were used before.
+
+    python -m benchmarks.inst [count]
+
+``count`` defaults to 10**6 timestamps, half of them in UTC and half of them
+with an offset.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import datetime
+import sys
+import time
+
+import pyrfc3339
+
+from edn_format import rfc3339
+
+
+def measure(label, fn, values):
+    start = time.time()
+    results = list(map(fn, values))
+    print("{:<28} {:6.2f} s".format(label, time.time() - start))
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    start = datetime.datetime(2020, 1, 1, tzinfo=rfc3339.UTC)
+    timestamps = [
+        (start + datetime.timedelta(seconds=i, microseconds=i)).isoformat().replace("+00:00", "Z")
+        if i % 2 else
+        (start + datetime.timedelta(seconds=i)).astimezone(rfc3339._fixed_offset(330)).isoformat()
+        for i in range(count)]
+    dates = [timestamp[:10] for timestamp in timestamps]
+
+    old = measure("parse, pyrfc3339", pyrfc3339.parse, timestamps)
+    values = new = measure("parse, rfc3339", rfc3339.parse_datetime, timestamps)
+    assert old == new
+
+    old = measure("parse date, strptime",
+                  lambda text: datetime.datetime.strptime(text, '%Y-%m-%d').date(), dates)
+    new = measure("parse date, rfc3339", rfc3339.parse_inst, dates)
+    assert old == new
+
+    old = measure("generate, pyrfc3339",
+                  lambda value: pyrfc3339.generate(value, microseconds=True), values)
+    new = measure("generate, rfc3339", rfc3339.format_datetime, values)
+    assert old == new
+
+
+if __name__ == "__main__":
+    main()
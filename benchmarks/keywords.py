@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the memory used by parsed keywords and the cost of looking them up.
+
+    python -m benchmarks.keywords [records]
+
+``records`` defaults to 20000 maps of 8 keyword keys each.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import time
+import tracemalloc
+
+import edn_format
+
+KEYS = ["id", "user/name", "user/email", "score", "tags", "active?",
+        "created-at", "parent"]
+
+
+def make_document(records):
+    return "[{}]".format(" ".join(
+        "{{{}}}".format(" ".join(":{} {}".format(k, i) for k in KEYS))
+        for i in range(records)))
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = make_document(records)
+
+    for engine in edn_format.edn_parse.ENGINES:
+        tracemalloc.start()
+        start = time.time()
+        data = edn_format.loads(text, engine=engine)
+        elapsed = time.time() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print("loads, {:<4}  {:6.2f} s  {:7.1f} MB".format(engine, elapsed, size / 1e6))
+        del data
+
+    data = edn_format.loads(text, engine="fast")
+    # new keyword instances, as when they're built by application code
+    keys = [edn_format.Keyword(k) for k in KEYS]
+    start = time.time()
+    for record in data:
+        for k in keys:
+            record[k]
+    elapsed = time.time() - start
+    print("{} lookups  {:6.2f} s  ({:.0f} ns/lookup)".format(
+        records * len(keys), elapsed, elapsed * 1e9 / (records * len(keys))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Measure time and peak memory when parsing large flat collections.
+
+    python -m benchmarks.large_collections [size]
+
+``size`` defaults to 10**6 elements (or entries, for maps).
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import time
+import tracemalloc
+
+import edn_format
+
+
+def documents(size):
+    yield "vector", "[{}]".format(" ".join(str(i) for i in range(size)))
+    yield "map", "{{{}}}".format(" ".join("{} {}".format(i, -i) for i in range(size)))
+
+
+def measure(text, engine):
+    tracemalloc.start()
+    start = time.time()
+    value = edn_format.loads(text, engine=engine)
+    elapsed = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    for name, text in documents(size):
+        print("{} of {} elements ({:.1f} MB of text)".format(name, size, len(text) / 1e6))
+        for engine in edn_format.edn_parse.ENGINES:
+            value, elapsed, peak = measure(text, engine)
+            assert len(value) == size
+            print("  {:<6} {:8.2f} s  peak {:8.1f} MB".format(engine, elapsed, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Compare eager and lazy loading of a large document of which only a few
+values are used.
+
+    python -m benchmarks.lazy [records]
+
+``records`` defaults to 100000 nested maps with timestamps.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import time
+
+import edn_format
+from edn_format import Keyword
+
+
+def make_document(records):
+    return "{{:version 1 :records [{}]}}".format(" ".join(
+        '{{:id {0} :user {{:name "user {0}" :roles #{{:a :b}}}} '
+        ':events [{{:at #inst "2020-01-01T00:00:{1:02}Z" :kind :login}} '
+        '{{:at #inst "2020-01-01T00:01:{1:02}.5+02:00" :kind :logout}}]}}'.format(i, i % 60)
+        for i in range(records)))
+
+
+def measure(label, fn):
+    start = time.time()
+    result = fn()
+    print("{:<32} {:7.3f} s".format(label, time.time() - start))
+    return result
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = make_document(records)
+    version, records_key, events = Keyword("version"), Keyword("records"), Keyword("events")
+
+    def some_values(data):
+        return data[version], data[records_key][records // 2][events][1]
+
+    eager = measure("loads, fast engine",
+                    lambda: some_values(edn_format.loads(text, engine="fast")))
+    lazy = measure("loads, lazy", lambda: some_values(edn_format.loads(text, lazy=True)))
+    assert eager == lazy
+
+    data = edn_format.loads(text, lazy=True)
+    measure("lazy, all values", lambda: edn_format.dumps(data))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Compare reading an EDN file and parsing its text with ``load_path``, which
+maps the file in memory and only decodes its tokens.
+
+    python -m benchmarks.load_path [records]
+
+``records`` defaults to 50000 top-level maps.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import edn_format
+
+
+def measure(label, fn):
+    start = time.time()
+    fn()
+    elapsed = time.time() - start
+    tracemalloc.start()
+    result = fn()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<28} {:6.2f} s  {:7.1f} MB, peak {:7.1f} MB".format(
+        label, elapsed, size / 1e6, peak / 1e6))
+    return result
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    handle, path = tempfile.mkstemp(suffix=".edn")
+    os.close(handle)
+    try:
+        with io.open(path, "w", encoding="utf-8") as f:
+            for i in range(records):
+                f.write('{{:id {0} :city "Zürich" :note "{1}" :scores [1 2 3]}}\n'.format(
+                    i, "x" * 200))
+        print("file: {:.1f} MB".format(os.path.getsize(path) / 1e6))
+
+        def read_and_parse():
+            with io.open(path, encoding="utf-8") as f:
+                return edn_format.loads_all(f.read(), engine="fast")
+
+        expected = measure("read + loads_all", read_and_parse)
+        values = measure("load_path", lambda: edn_format.load_path(path))
+        assert values == expected
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
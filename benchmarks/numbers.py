@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the parsing of vectors of integers and of floats, which the fast
+engine reads at once, against lists of the same numbers, which it reads item
+by item, and against PLY (on a tenth of the numbers, as it's much slower).
+
+    python -m benchmarks.numbers [count]
+
+``count`` defaults to 10**6 numbers of each type.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import random
+import sys
+import time
+
+import edn_format
+
+
+def measure(label, fn):
+    start = time.time()
+    result = fn()
+    print("{:<36} {:7.3f} s".format(label, time.time() - start))
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    rng = random.Random(42)
+    kinds = [
+        ("ints", [rng.randint(-10 ** 9, 10 ** 9) for _ in range(count)]),
+        ("floats", [rng.uniform(-1e6, 1e6) for _ in range(count)]),
+    ]
+    for name, numbers in kinds:
+        items = " ".join(map(repr, numbers))
+        vector = measure("fast, vector of {}".format(name),
+                         lambda: edn_format.loads("[" + items + "]", engine="fast"))
+        assert list(vector) == numbers
+        values = measure("fast, list of {}".format(name),
+                         lambda: edn_format.loads("(" + items + ")", engine="fast"))
+        assert list(values) == numbers
+        values = measure("fast, bytes vector of {}".format(name), lambda: edn_format.loads(
+            ("[" + items + "]").encode("ascii"), engine="fast"))
+        assert list(values) == numbers
+        tenth = " ".join(map(repr, numbers[:count // 10]))
+        measure("ply, vector of {} / 10".format(name),
+                lambda: edn_format.loads("[" + tenth + "]"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the time and the memory (retained by the result, and peak) of parsing
+vectors of integers and of floats as ImmutableList and as NumericVector (with
+``array.array``, and with NumPy if it's installed), and of dumping them back.
+
+    python -m benchmarks.numeric_vectors [count]
+
+``count`` defaults to 10**6 numbers of each type.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import random
+import sys
+import time
+import tracemalloc
+
+import edn_format
+from edn_format.numeric_vector import numpy
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.time()
+    result = fn()
+    elapsed = time.time() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<32} {:7.3f} s {:8.1f} MB retained {:8.1f} MB peak".format(
+        label, elapsed, retained / 2 ** 20, peak / 2 ** 20))
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    rng = random.Random(42)
+    storages = [None, "array"] + (["numpy"] if numpy is not None else [])
+    for name, numbers in (("ints", [rng.randint(-10 ** 9, 10 ** 9) for _ in range(count)]),
+                          ("floats", [rng.uniform(-1e6, 1e6) for _ in range(count)])):
+        text = "[" + " ".join(map(repr, numbers)) + "]"
+        for storage in storages:
+            label = "{}, {}".format(name, storage or "ImmutableList")
+            value = measure("loads " + label,
+                            lambda: edn_format.loads(text, engine="fast", numeric_vectors=storage))
+            assert value == numbers
+            assert measure("dumps " + label, lambda: edn_format.dumps(value)) == text
+
+
+if __name__ == "__main__":
+    main()
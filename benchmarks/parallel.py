@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Measure how ``parallel.load_lines`` and ``parallel.dump_lines`` scale with the
+number of workers on a newline-delimited EDN file, against ``load_path`` and
+``dump_to`` in a single process.
+
+    python -m benchmarks.parallel [records]
+
+``records`` defaults to 200000 lines of one map each.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+import edn_format
+from edn_format import parallel
+
+
+def measure(label, fn):
+    start = time.time()
+    result = fn()
+    print("{:<28} {:7.3f} s".format(label, time.time() - start))
+    return result
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    handle, path = tempfile.mkstemp(suffix=".edn")
+    os.close(handle)
+    try:
+        with io.open(path, "w", encoding="utf-8") as f:
+            for i in range(records):
+                f.write('{{:id {0} :user "user {0}" :tags #{{:a :b}} :scores [1 2.5 3]}}\n'
+                        .format(i))
+
+        expected = measure("load_path", lambda: edn_format.load_path(path))
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            values = measure("load_lines, {} workers".format(workers),
+                             lambda: parallel.load_lines(path, workers=workers))
+            assert values == expected
+            workers *= 2
+
+        def dump():
+            with io.open(path, "wb") as f:
+                for value in expected:
+                    edn_format.dump_to(value, f)
+                    f.write(b"\n")
+
+        def dump_lines(workers):
+            with io.open(path, "wb") as f:
+                parallel.dump_lines(expected, f, workers=workers)
+
+        measure("dump_to", dump)
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            measure("dump_lines, {} workers".format(workers), lambda: dump_lines(workers))
+            workers *= 2
+        assert parallel.load_lines(path) == expected
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the per-call overhead of ``loads`` on small messages.
+
+Compares the cached parser/lexer against building them on every call, which
+is what ``parse_all`` used to do.
+
+    python -m benchmarks.parser_cache
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import re
+import timeit
+
+import ply.lex
+import ply.yacc
+
+import edn_format
+from edn_format import edn_lex, edn_parse
+from edn_format.edn_reader import COLLECTIONS
+
+MESSAGE = '{:id 42 :ok true}'
+
+
+def uncached_loads(text):
+    parser = ply.yacc.yacc(module=edn_parse, write_tables=False, debug=False)
+    lexer = ply.lex.lex(module=edn_lex, reflags=re.UNICODE)
+    lexer.collections = COLLECTIONS['immutable']
+    lexer.tagged_element = edn_parse._tagged_element
+    return list(parser.parse(text, lexer=lexer))[0]
+
+
+def bench(fn, number):
+    best = min(timeit.repeat(lambda: fn(MESSAGE), number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    assert uncached_loads(MESSAGE) == edn_format.loads(MESSAGE)
+
+    uncached = bench(uncached_loads, 20)
+    cached = bench(edn_format.loads, 2000)
+    print("message: {!r} ({} bytes)".format(MESSAGE, len(MESSAGE)))
+    print("uncached loads: {:10.1f} us/call".format(uncached))
+    print("cached loads:   {:10.1f} us/call".format(cached))
+    print("speedup:        {:10.1f}x".format(uncached / cached))
+
+
+if __name__ == "__main__":
+    main()
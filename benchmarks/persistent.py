@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Compare updating an ImmutableDict (copy, change, wrap) with PersistentMap.assoc,
+and the time to load a document with both kinds of collections.
+
+    python -m benchmarks.persistent [size]
+
+``size`` defaults to 100000 entries.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import timeit
+
+import edn_format
+from edn_format import Keyword
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = "{{{}}}".format(" ".join(":k{} [{} {}]".format(i, i, -i) for i in range(size)))
+
+    for collections in ("immutable", "persistent"):
+        seconds = min(timeit.repeat(
+            lambda: edn_format.loads(text, engine="fast", collections=collections),
+            number=1, repeat=3))
+        print("loads, {:<10}  {:8.3f} s".format(collections, seconds))
+
+    immutable = edn_format.loads(text, engine="fast")
+    persistent = edn_format.loads(text, engine="fast", collections="persistent")
+    key = Keyword("k{}".format(size // 2))
+
+    def update_immutable():
+        d = dict(immutable)
+        d[key] = 0
+        return edn_format.ImmutableDict(d, copy=False)
+
+    for name, fn in (("ImmutableDict copy", update_immutable),
+                     ("PersistentMap.assoc", lambda: persistent.assoc(key, 0))):
+        number = 10 if name.startswith("Immutable") else 10000
+        seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print("{:<20} {:10.2f} us per update".format(name, seconds * 1e6))
+
+
+if __name__ == "__main__":
+    main()
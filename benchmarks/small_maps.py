@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the memory used per map on a document of many small maps.
+
+    python -m benchmarks.small_maps [count]
+
+``count`` defaults to 10**6 maps of two entries each.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import time
+import tracemalloc
+
+import edn_format
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    text = "[{}]".format(" ".join("{{:a {} :b nil}}".format(i % 100) for i in range(count)))
+
+    start = time.time()
+    edn_format.loads(text, engine="fast")
+    print("loads:        {:6.2f} s".format(time.time() - start))
+
+    tracemalloc.start()
+    data = edn_format.loads(text, engine="fast")
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("memory:       {:6.1f} MB ({:.0f} bytes per map), peak {:.1f} MB".format(
+        size / 1e6, size / count, peak / 1e6))
+
+    start = time.time()
+    hashes = set(map(hash, data))
+    print("hash:         {:6.2f} s".format(time.time() - start))
+    assert len(hashes) >= 100
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the overhead of ``Stats`` on ``loads`` (with each engine) and
+``dumps``: for a small message and a larger document, the time per call
+with no Stats started and with one started.
+
+    python -m benchmarks.stats [number]
+
+``number`` defaults to 2000 calls on the small message (and 20 times fewer on
+the document).
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import timeit
+
+import edn_format
+
+from .corpora import tagged_stream
+
+MESSAGE = '{:id 42 :ok true :at #inst "2024-01-01T00:00:00Z"}'
+
+
+def bench(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    document = edn_format.dumps(tagged_stream(1)[:400])
+    for name, text, calls in (("message", MESSAGE, number), ("document", document, number // 20)):
+        value = edn_format.loads(text)
+        cases = [("loads, " + engine, lambda engine=engine: edn_format.loads(text, engine=engine))
+                 for engine in edn_format.edn_parse.ENGINES]
+        cases.append(("dumps", lambda: edn_format.dumps(value)))
+        for label, fn in cases:
+            disabled = bench(fn, calls)
+            with edn_format.Stats():
+                enabled = bench(fn, calls)
+            print("{:<10} {:<12} {:10.1f} us/call, {:10.1f} us/call with stats (x{:.2f})".format(
+                name, label, disabled, enabled, enabled / disabled))
+
+
+if __name__ == "__main__":
+    main()
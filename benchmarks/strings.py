@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the decoding of string escapes with the regular expression and codec
+call per escape that were used before, on plain, lightly escaped and heavily
+escaped strings, and measure the parsing of vectors of them.
+
+    python -m benchmarks.strings [count]
+
+``count`` defaults to 200000 strings of each kind.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import codecs
+import sys
+import time
+
+import edn_format
+from edn_format.edn_lex import ESCAPE_SEQUENCE_RE, decode_escapes
+
+
+def old_decode_escapes(s):
+    def decode_match(match):
+        return codecs.decode(match.group(0), 'unicode-escape')
+
+    return ESCAPE_SEQUENCE_RE.sub(decode_match, s)
+
+
+def measure(label, fn, values):
+    start = time.time()
+    results = list(map(fn, values))
+    print("{:<36} {:6.3f} s".format(label, time.time() - start))
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    kinds = [
+        ("plain", ['user name {} of the account'.format(i) for i in range(count)]),
+        ("lightly escaped", ['line {}\\nsaid \\"hello\\"'.format(i) for i in range(count)]),
+        ("heavily escaped", ['\\t{}\\\\\\n\\u00e9\\"\\\\\\r\\n\\u20ac\\t\\"'.format(i)
+                             for i in range(count)]),
+    ]
+    for name, texts in kinds:
+        old = measure("decode, regex, " + name, old_decode_escapes, texts)
+        new = measure("decode, split, " + name, decode_escapes, texts)
+        assert old == new
+        document = '[' + ' '.join('"{}"'.format(text) for text in texts) + ']'
+        measure("loads fast engine, " + name,
+                lambda text: edn_format.loads(text, engine="fast"), [document])
+
+
+if __name__ == "__main__":
+    main()
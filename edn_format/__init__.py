@@ -1,28 +1,50 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from .edn_lazy import LazyList, LazyMap, LazyVector
 from .edn_lex import Keyword, MetadataValue, Symbol
 from .edn_parse import parse as loads, parse_all as loads_all
 from .edn_parse import add_tag, remove_tag, tag, TaggedElement
-from .edn_dump import dump as dumps
+from .edn_dump import dump as dumps, dump_to, iterdump, Encoder
+from .edn_dump import register_encoder, unregister_encoder
+from .edn_stream import IncrementalParser, iter_load, load_path
 from .exceptions import EDNDecodeError
 from .immutable_dict import ImmutableDict
 from .immutable_list import ImmutableList
+from .numeric_vector import NumericVector
+from .persistent import PersistentMap, PersistentSet, PersistentVector
+from .stats import Stats
 from .char import Char
 
 __all__ = (
     'ImmutableList',
     'ImmutableDict',
+    'LazyList',
+    'LazyMap',
+    'LazyVector',
+    'NumericVector',
+    'PersistentMap',
+    'PersistentSet',
+    'PersistentVector',
+    'Stats',
     'Keyword',
     'MetadataValue',
     'Symbol',
     'Char',
     'TaggedElement',
     'EDNDecodeError',
+    'IncrementalParser',
+    'Encoder',
     'add_tag',
+    'dump_to',
     'dumps',
+    'iter_load',
+    'iterdump',
+    'load_path',
     'loads',
     'loads_all',
+    'register_encoder',
     'remove_tag',
     'tag',
+    'unregister_encoder',
 )
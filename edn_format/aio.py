@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Reading and writing EDN values over asyncio streams (Python 3.6 and later).
+
+``read_forms`` feeds the bytes of a ``StreamReader`` to an
+``IncrementalParser`` as they arrive, and parses each form once it's complete,
+so a large message doesn't need to be buffered and parsed at once. ``write_form`` writes the
+representation of a value by chunks, waiting for the ``StreamWriter`` to drain
+between them.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import asyncio
+import functools
+
+from .edn_dump import DEFAULT_OUTPUT_ENCODING, _get_encoder
+from .edn_parse import parse_all
+from .edn_stream import DEFAULT_CHUNK_SIZE, IncrementalParser
+
+# forms of at least this many characters are parsed in the executor, if any
+DEFAULT_OFFLOAD_SIZE = 64 * 1024
+
+# get_event_loop returns the running loop in a coroutine, before Python 3.7
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+async def _parse(text, executor, offload_size, kwargs):
+    if executor is not None and len(text) >= offload_size:
+        loop = _get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(parse_all, text, **kwargs))
+    return parse_all(text, **kwargs)
+
+
+async def read_forms(reader, chunk_size=DEFAULT_CHUNK_SIZE, input_encoding='utf-8',
+                     executor=None, offload_size=DEFAULT_OFFLOAD_SIZE, **kwargs):
+    """
+    Iterate asynchronously over the top-level values read from the
+    ``asyncio.StreamReader`` ``reader``, until the end of the stream.
+
+    The stream is read by chunks of at most ``chunk_size`` bytes and decoded
+    with ``input_encoding``. Each value is yielded as soon as the text of its
+    form has arrived; an atom at the top level (e.g. ``42``) is only complete
+    once it's followed by whitespace or a delimiter. Forms of at least
+    ``offload_size`` characters are parsed in ``executor`` (e.g. a
+    ``concurrent.futures.ProcessPoolExecutor``) when one is given, so that the
+    event loop isn't blocked while they're parsed. Other keyword arguments are
+    passed to ``parse_all``.
+    """
+    parser = IncrementalParser(input_encoding)
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            parser.close()
+        else:
+            parser.feed(chunk)
+        for text in parser.texts():
+            for value in await _parse(text, executor, offload_size, kwargs):
+                yield value
+        if not chunk:
+            break
+
+
+async def write_form(writer, obj, chunk_size=DEFAULT_CHUNK_SIZE,
+                     output_encoding=DEFAULT_OUTPUT_ENCODING, **kwargs):
+    """
+    Write the EDN representation of ``obj`` to the ``asyncio.StreamWriter``
+    ``writer``, followed by a newline, and wait until it's drained.
+
+    The representation is generated and written by chunks of about
+    ``chunk_size`` characters, waiting for the writer to drain after each one,
+    so that a large value isn't held in memory at once. See ``Encoder`` for the
+    other accepted arguments.
+    """
+    kwargs['output_encoding'] = output_encoding
+    parts = []
+    size = 0
+    for part in _get_encoder(kwargs).iterencode(obj):
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            writer.write(''.join(parts).encode(output_encoding))
+            parts = []
+            size = 0
+            await writer.drain()
+    parts.append('\n')
+    writer.write(''.join(parts).encode(output_encoding))
+    await writer.drain()
@@ -1,20 +1,27 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import array
 import datetime
 import decimal
 import fractions
+import io
 import math
 import re
+import threading
 import uuid
 
-import pyrfc3339
 
 from .immutable_dict import ImmutableDict
 from .immutable_list import ImmutableList
 from .char import Char
+from .edn_lazy import LazyList, LazyMap, LazyVector
 from .edn_lex import Keyword, MetadataValue, Symbol
 from .edn_parse import TaggedElement
+from .numeric_vector import NumericVector, numpy
+from .persistent import PersistentMap, PersistentSet, PersistentVector
+from .rfc3339 import format_datetime
+from . import stats as _stats
 
 from .compat import _PY3, long, basestring, unicode, unichr
 
@@ -67,33 +74,430 @@ def dump_char(c):
     return "\\u{}".format(hex(ord(c))[2:].upper().rjust(4, str("0")))
 
 
-def indent_lines(lines, open_sym, close_sym, indent, indent_step):
+def dump_float(f):
+    """Return an EDN representation of a float."""
+    if math.isnan(f):
+        # EDN symbolic values; https://clojure.org/reference/reader#_symbolic_values
+        # A bare `inf`/`nan` would read back as a Symbol, breaking round-tripping.
+        return '##NaN'
+    if math.isinf(f):
+        return '##Inf' if f > 0 else '##-Inf'
+    return unicode(f)
+
+
+def dump_numbers(numbers, is_float):
     """
-    Indents a data structure.
+    Return the EDN representation of the items of ``numbers``, which are all
+    integers or all floats, separated by spaces.
+    """
+    text = ' '.join(map(unicode, numbers))
+    # the text of finite floats has no letter but "e"
+    if is_float and 'n' in text:
+        text = ' '.join(map(dump_float, numbers))
+    return text
+
+
+# formats of the arrays and memoryviews of integers and of floats
+_INT_FORMATS = frozenset('bBhHiIlLqQnN')
+_FLOAT_FORMATS = frozenset('efd')
+
 
-    ``lines`` is an array of strings composed of each element of the data
-    structure. ``open_sym`` and ``close_sym`` are strings representing the
-    opening and closing symbol of the data structure (i.e.: for a dict it
-    would be '{' and '}', respectively). ``indent`` is an integer representing
-    the number of spaces used to indent. ``indent_step`` is an integer
-    representing the current level of indentation.
+def _numbers(obj):
     """
-    indent_prev = indent_step
-    indent_step = indent_prev + indent
-    # open symbol should not be indented
-    result = [open_sym]
+    Return whether the items of a buffer of numbers (array, memoryview, NumPy
+    array, range or NumericVector) are all integers (False), all floats (True)
+    or something else (None), from its format.
+    """
+    if type(obj) is range:
+        return False
+    if isinstance(obj, NumericVector):
+        return obj.is_float
+    if isinstance(obj, array.array):
+        fmt = obj.typecode
+    elif isinstance(obj, memoryview):
+        fmt = obj.format.lstrip('@=<>!') if obj.ndim == 1 else None
+    else:  # NumPy array
+        fmt = obj.dtype.char if obj.ndim == 1 and obj.dtype.kind in 'iuf' else None
+    return True if fmt in _FLOAT_FORMATS else False if fmt in _INT_FORMATS else None
+
+
+def _tolist(numbers):
+    # Python numbers of a buffer, or of a slice of it; ranges are left as is
+    return numbers.tolist() if hasattr(numbers, 'tolist') else numbers
+
+
+# Functions that return the EDN representation of the values of a type, by
+# exact type. Subclasses of these types are added as they're encountered.
+_encoders = {
+    type(None): lambda obj: 'nil',
+    bool: lambda obj: 'true' if obj else 'false',
+    int: unicode,
+    long: unicode,
+    float: dump_float,
+    decimal.Decimal: '{}M'.format,
+    Keyword: unicode,
+    Symbol: unicode,
+    Char: dump_char,
+    unicode: unicode_escape,
+    fractions.Fraction: lambda obj: '{}/{}'.format(obj.numerator, obj.denominator),
+    datetime.datetime: lambda obj: '#inst "{}"'.format(format_datetime(obj)),
+    datetime.date: lambda obj: '#inst "{}"'.format(obj.isoformat()),
+    uuid.UUID: '#uuid "{}"'.format,
+    TaggedElement: unicode,
+}
+# the encoders of the module, to tell them from the ones registered with
+# ``register_encoder``
+_default_encoders = dict(_encoders)
+
+# Types that ``_iterdump`` handles itself, with their opening symbol (or
+# _BYTES for bytes, which are decoded with ``string_encoding``, or _NUMBERS
+# for buffers of numbers, which are dumped as vectors, at once when they're
+# not indented)
+_BYTES = 'bytes'
+_NUMBERS = 'numbers'
+_COLLECTIONS = {
+    bytes: _BYTES,
+    MetadataValue: '^',
+    tuple: '(',
+    list: '[',
+    ImmutableList: '[',
+    set: '#{',
+    frozenset: '#{',
+    dict: '{',
+    ImmutableDict: '{',
+    PersistentVector: '[',
+    PersistentSet: '#{',
+    PersistentMap: '{',
+    LazyVector: '[',
+    LazyList: '(',
+    LazyMap: '{',
+    NumericVector: _NUMBERS,
+    array.array: _NUMBERS,
+    memoryview: _NUMBERS,
+}
+if _PY3:
+    _COLLECTIONS[range] = _NUMBERS
+if numpy is not None:
+    _COLLECTIONS[numpy.ndarray] = _NUMBERS
+
+# vectors and lists that are dumped at once when their items are all integers
+# or all floats and they're not indented
+_SEQUENCES = frozenset([list, ImmutableList, tuple])
+_NUMBER_TYPES = frozenset([int, long, float])
+# whether the numbers have their default encoders, which dumping them in bulk
+# is the same as
+_bulk_numbers = True
+_CLOSE_SYMBOLS = {'(': ')', '[': ']', '#{': '}', '{': '}'}
+
+# subclasses added to _encoders or _COLLECTIONS by _resolve
+_resolved = set()
+# held while changing _resolved or the encoders, which can be done by dumping
+# in another thread
+_resolve_lock = threading.Lock()
+
+
+def _resolve(obj):
+    """
+    Find how to encode ``obj``, of a type without an entry of its own in
+    ``_encoders`` or ``_COLLECTIONS``, from the closest base class of its type
+    that has one, and cache it. Return the encoder function, or None if the
+    type is handled as one of ``_COLLECTIONS``.
+    """
+    cls = type(obj)
+    with _resolve_lock:
+        for base in cls.__mro__:
+            if base in _encoders:
+                _resolved.add(cls)
+                encoder = _encoders[cls] = _encoders[base]
+                return encoder
+            if base in _COLLECTIONS:
+                _resolved.add(cls)
+                _COLLECTIONS[cls] = _COLLECTIONS[base]
+                return None
+    raise NotImplementedError(
+        u"encountered object of type '{}' for which no known encoding is available: {}".format(
+            cls, repr(obj)))
+
+
+def register_encoder(cls, encoder):
+    """
+    Register a function that returns the EDN representation of the instances
+    of ``cls`` (and its subclasses, unless they have their own encoder).
+
+    Example:
+
+        register_encoder(Dog, lambda dog: '#dog "{}"'.format(dog.name))
+
+        dumps([Dog("Max")])
+        # => '[#dog "Max"]'
+    """
+    assert isinstance(cls, type)
+    with _resolve_lock:
+        _clear_resolved()
+        _encoders[cls] = encoder
+        _update_bulk_numbers()
+
+
+def unregister_encoder(cls):
+    """
+    Remove the encoder registered for ``cls`` with ``register_encoder``. Its
+    instances are then encoded with the default encoder of ``cls``, if any, or
+    else as instances of its closest base class.
+    """
+    assert isinstance(cls, type)
+    with _resolve_lock:
+        if cls in _resolved or cls not in _encoders:
+            raise KeyError(cls)
+        _clear_resolved()
+        if cls in _default_encoders:
+            _encoders[cls] = _default_encoders[cls]
+        else:
+            del _encoders[cls]
+        _update_bulk_numbers()
+
+
+def _update_bulk_numbers():
+    global _bulk_numbers
+    _bulk_numbers = all(_encoders[cls] is _default_encoders[cls] for cls in _NUMBER_TYPES)
 
-    indent_spaces = indent_step * ' '
-    result += [indent_spaces + line for line in lines]
 
-    # close symbol should be indented using the previous indentation level
-    result += [indent_prev * ' ' + close_sym]
+def _clear_resolved():
+    # the types resolved from a base class may resolve to another one now;
+    # called with _resolve_lock held
+    for resolved in _resolved:
+        _encoders.pop(resolved, None)
+        _COLLECTIONS.pop(resolved, None)
+    _resolved.clear()
 
-    return '\n'.join(result)
 
+def _separated(items, first, separator):
+    for item in items:
+        yield first, item
+        first = separator
 
-def seq(obj, **kwargs):
-    return [udump(i, **kwargs) for i in obj]
+
+def _separated_pairs(pairs, first, separator):
+    for key, value in pairs:
+        yield first, key
+        yield ' ', value
+        first = separator
+
+
+class Encoder(object):
+    """
+    Encoder of Python objects to EDN.
+
+    The options are set once when the encoder is created, so an encoder can be
+    reused to encode many objects the same way:
+
+        encoder = Encoder(sort_keys=True, indent=2)
+        encoder.encode({"b": 1, "a": 2})
+
+    ``string_encoding`` (defaults to 'utf-8') is the encoding to be used if the
+    object are bytes instead of strings. ``output_encoding`` (defaults to
+    'utf-8') is the encoding of the EDN text written to binary streams by
+    ``dump``, and of the text returned by ``dumps`` in Python 2.
+    ``keyword_keys`` when True (defaults to False) converts the keys from a
+    dict from string to keywords. ``sort_keys`` when True (defaults to False)
+    sort dict keys alphabetically. ``sort_sets`` when True (defaults to False)
+    sort sets alphabetically. ``indent`` when set to a positive integer
+    (defaults to None) represents the number of spaces used to indent the
+    object.
+    """
+
+    # number of strings buffered by ``iterencode`` before it yields them
+    chunk_parts = 1024
+
+    def __init__(self,
+                 string_encoding=DEFAULT_INPUT_ENCODING,
+                 output_encoding=DEFAULT_OUTPUT_ENCODING,
+                 keyword_keys=False,
+                 sort_keys=False,
+                 sort_sets=False,
+                 indent=None):
+        self.string_encoding = string_encoding
+        self.output_encoding = output_encoding
+        self.keyword_keys = keyword_keys
+        self.sort_keys = sort_keys
+        self.sort_sets = sort_sets
+        self.indent = indent
+
+    def encode(self, obj, indent_step=0):
+        """
+        Return the EDN representation of ``obj``. ``indent_step`` (defaults to
+        0) represents the current indentation level when ``indent`` is
+        different from None.
+        """
+        record = _stats.recorder()
+        if record is None:
+            return ''.join(self.iterencode(obj, indent_step))
+
+        start = _stats.clock()
+        text = ''.join(self.iterencode(obj, indent_step))
+        record.calls['dump'] += 1
+        record.times['dump'] += _stats.clock() - start
+        record.chars_written += len(text)
+        _stats.publish(record)
+        return text
+
+    def dump(self, obj, fp):
+        """
+        Write the EDN representation of ``obj`` to the file-like object ``fp``,
+        chunk by chunk. Binary streams get the chunks encoded with
+        ``output_encoding``.
+        """
+        binary = _is_binary(fp)
+        output_encoding = self.output_encoding
+        write = fp.write
+        record = _stats.recorder()
+        if record is None:
+            for chunk in self.iterencode(obj):
+                write(chunk.encode(output_encoding) if binary else chunk)
+            return
+
+        start = _stats.clock()
+        for chunk in self.iterencode(obj):
+            write(chunk.encode(output_encoding) if binary else chunk)
+            record.chars_written += len(chunk)
+        record.calls['dump'] += 1
+        record.times['dump'] += _stats.clock() - start
+        _stats.publish(record)
+
+    def iterencode(self, obj, indent_step=0):
+        """
+        Generate the EDN representation of ``obj`` by chunks.
+
+        Collections are walked with an explicit stack of iterators over their
+        items rather than by recursion, so nothing but the output is built and
+        there's no limit on the nesting depth.
+        """
+        string_encoding = self.string_encoding
+        keyword_keys = self.keyword_keys
+        sort_keys = self.sort_keys
+        sort_sets = self.sort_sets
+        indent = self.indent
+        chunk_parts = self.chunk_parts
+        encoders = _encoders
+        collections = _COLLECTIONS
+        sequences = _SEQUENCES
+        number_types = _NUMBER_TYPES
+        bulk_numbers = _bulk_numbers and indent is None
+
+        def _decode_bytes(obj):
+            return unicode_escape(obj.decode(string_encoding))
+
+        parts = []
+        append = parts.append
+        # iterators over the (separator, item) pairs of the collections being
+        # dumped, with what closes them
+        stack = []
+        items = iter((('', obj),))
+        close = ''
+        step = indent_step
+
+        while True:
+            for separator, obj in items:
+                append(separator)
+                cls = type(obj)
+                encoder = encoders.get(cls)
+                if encoder is None and cls not in collections:
+                    encoder = _resolve(obj)
+                if encoder is None:
+                    open_sym = collections[cls]
+                    if open_sym is _BYTES:
+                        encoder = _decode_bytes
+                    elif open_sym is _NUMBERS:
+                        # the buffer is only converted to Python numbers by
+                        # slices when they're dumped in bulk
+                        is_float = _numbers(obj)
+                        if is_float is None or not bulk_numbers:
+                            obj = _tolist(obj)
+                        open_sym = '['
+                    elif bulk_numbers and cls in sequences and obj and type(obj[0]) in number_types:
+                        item_types = set(map(type, obj))
+                        is_float = float in item_types if len(item_types) == 1 else None
+                    else:
+                        is_float = None
+                if encoder is not None:
+                    append(encoder(obj))
+                    if len(parts) >= chunk_parts:
+                        yield ''.join(parts)
+                        del parts[:]
+                    continue
+
+                if is_float is not None and bulk_numbers:
+                    # numbers are dumped by slices of chunk_parts items, and
+                    # count as parts
+                    append(open_sym)
+                    for start in range(0, len(obj), chunk_parts):
+                        if start:
+                            append(' ')
+                        numbers = _tolist(obj[start:start + chunk_parts])
+                        append(dump_numbers(numbers, is_float))
+                        if len(parts) + len(numbers) >= chunk_parts:
+                            yield ''.join(parts)
+                            del parts[:]
+                    append(_CLOSE_SYMBOLS[open_sym])
+                    continue
+
+                stack.append((items, close, step))
+                if open_sym == '^':
+                    # EDN metadata `^M V`. Both metadata and value serialize
+                    # at the same nesting depth as the MetadataValue itself.
+                    append('^')
+                    items = _separated((obj.metadata, obj.value), '', ' ')
+                    close = ''
+                    break
+
+                close_sym = _CLOSE_SYMBOLS[open_sym]
+                if sort_sets and open_sym == '#{':
+                    obj = sorted(obj)
+
+                if indent is None:
+                    first, separator, close = '', ' ', close_sym
+                else:
+                    # open symbol should not be indented, close symbol should
+                    # be indented using the previous indentation level
+                    first = separator = '\n' + (step + indent) * ' '
+                    close = '\n' + step * ' ' + close_sym
+                    step += indent
+
+                append(open_sym)
+                if open_sym == '{':
+                    pairs = obj.items()
+                    if sort_keys:
+                        pairs = sorted(pairs, key=lambda p: str(p[0]))
+                    if keyword_keys:
+                        pairs = ((Keyword(k) if isinstance(k, (bytes, basestring)) else k, v)
+                                 for k, v in pairs)
+                    items = _separated_pairs(pairs, first, separator)
+                else:
+                    items = _separated(obj, first, separator)
+                break
+            else:
+                append(close)
+                if not stack:
+                    break
+                items, close, step = stack.pop()
+
+        yield ''.join(parts)
+
+
+_default_encoder = Encoder()
+_DEFAULT_OPTIONS = (DEFAULT_INPUT_ENCODING, DEFAULT_OUTPUT_ENCODING, False,
+                    False, False, None)
+
+
+def _get_encoder(kwargs):
+    return Encoder(**kwargs) if kwargs else _default_encoder
+
+
+def _is_binary(fp):
+    if isinstance(fp, io.TextIOBase):
+        return False
+    if isinstance(fp, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    return 'b' in getattr(fp, 'mode', '')
 
 
 def udump(obj,
@@ -106,105 +510,37 @@ def udump(obj,
     """
     Dumps a formatted representation of a Python object.
 
-    ``string_encoding`` (defaults to 'utf-8') is the encoding to be used if the
-    object are bytes instead of strings. ``keyword_keys`` when True (defaults
-    to False) converts the keys from a dict from string to keywords.
-    ``sort_keys`` when True (defaults to False) sort dict keys alphabetically.
-    ``sort_sets`` when True (defaults to False) sort sets alphabetically.
-    ``indent`` when set to a positive integer (defaults to None) represents
-    the number of spaces used to indent the object. ``indent_step`` (defaults
-    to 0) represents the current indentation level when ``indent`` is different
+    See ``Encoder`` for the arguments. ``indent_step`` (defaults to 0)
+    represents the current indentation level when ``indent`` is different
     from None.
     """
-    kwargs = {
-        "string_encoding": string_encoding,
-        "keyword_keys": keyword_keys,
-        "sort_keys": sort_keys,
-        "sort_sets": sort_sets,
-        "indent": indent,
-        "indent_step": indent_step + (indent or 0),
-    }
-
-    if isinstance(obj, MetadataValue):
-        # EDN metadata `^M V`. Both metadata and value serialize at the same
-        # nesting depth as the MetadataValue itself (don't bump indent_step).
-        same_level = dict(kwargs, indent_step=indent_step)
-        meta_str = udump(obj.metadata, **same_level)
-        value_str = udump(obj.value, **same_level)
-        return '^{} {}'.format(meta_str, value_str)
-    elif obj is None:
-        return 'nil'
-    elif isinstance(obj, bool):
-        return 'true' if obj else 'false'
-    elif isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
-        # EDN symbolic values; https://clojure.org/reference/reader#_symbolic_values
-        # A bare `inf`/`nan` would read back as a Symbol, breaking round-tripping.
-        if math.isnan(obj):
-            return '##NaN'
-        return '##Inf' if obj > 0 else '##-Inf'
-    elif isinstance(obj, (int, long, float)):
-        return unicode(obj)
-    elif isinstance(obj, decimal.Decimal):
-        return '{}M'.format(obj)
-    elif isinstance(obj, (Keyword, Symbol)):
-        return unicode(obj)
-    elif isinstance(obj, Char):
-        return dump_char(obj)
-    # CAVEAT LECTOR! In Python 3 'basestring' is alised to 'str' above.
-    # Furthermore, in Python 2 bytes is an instance of 'str'/'basestring' while
-    # in Python 3 it is not.
-    elif isinstance(obj, bytes):
-        return unicode_escape(obj.decode(string_encoding))
-    elif isinstance(obj, basestring):
-        return unicode_escape(obj)
-    elif isinstance(obj, tuple):
-        lines = seq(obj, **kwargs)
-        if indent is None:
-            return '({})'.format(' '.join(lines))
-        else:
-            return indent_lines(lines, '(', ')', indent, indent_step)
-    elif isinstance(obj, (list, ImmutableList)):
-        lines = seq(obj, **kwargs)
-        if indent is None:
-            return '[{}]'.format(' '.join(lines))
-        else:
-            return indent_lines(lines, '[', ']', indent, indent_step)
-    elif isinstance(obj, (set, frozenset)):
-        if sort_sets:
-            obj = sorted(obj)
-
-        lines = seq(obj, **kwargs)
-        if indent is None:
-            return '#{{{}}}'.format(' '.join(lines))
-        else:
-            return indent_lines(lines, '#{', '}', indent, indent_step)
-    elif isinstance(obj, (dict, ImmutableDict)):
-        pairs = obj.items()
+    return Encoder(string_encoding=string_encoding,
+                   keyword_keys=keyword_keys,
+                   sort_keys=sort_keys,
+                   sort_sets=sort_sets,
+                   indent=indent).encode(obj, indent_step)
 
-        if sort_keys:
-            pairs = sorted(pairs, key=lambda p: str(p[0]))
 
-        if keyword_keys:
-            pairs = ((Keyword(k) if isinstance(k, (bytes, basestring)) else k, v) for k, v in pairs)
+def iterdump(obj, **kwargs):
+    """
+    Iterate over the chunks of the EDN representation of a Python object.
+
+    The chunks are generated as the object is walked, so the whole
+    representation is never held in memory. See ``Encoder`` for the accepted
+    arguments.
+    """
+    return _get_encoder(kwargs).iterencode(obj)
 
-        lines = [' '.join(seq(p, **kwargs)) for p in pairs]
-        if indent is None:
-            return '{{{}}}'.format(' '.join(lines))
-        else:
-            return indent_lines(lines, '{', '}', indent, indent_step)
-    elif isinstance(obj, fractions.Fraction):
-        return '{}/{}'.format(obj.numerator, obj.denominator)
-    elif isinstance(obj, datetime.datetime):
-        return '#inst "{}"'.format(pyrfc3339.generate(obj, microseconds=True))
-    elif isinstance(obj, datetime.date):
-        return '#inst "{}"'.format(obj.isoformat())
-    elif isinstance(obj, uuid.UUID):
-        return '#uuid "{}"'.format(obj)
-    elif isinstance(obj, TaggedElement):
-        return unicode(obj)
-    raise NotImplementedError(
-        u"encountered object of type '{}' for which no known encoding is available: {}".format(
-            type(obj), repr(obj)))
+
+def dump_to(obj, fp, **kwargs):
+    """
+    Write the EDN representation of a Python object to the file-like object
+    ``fp``, chunk by chunk.
+
+    Binary streams get the chunks encoded with ``output_encoding``. See
+    ``Encoder`` for the accepted arguments.
+    """
+    _get_encoder(kwargs).dump(obj, fp)
 
 
 def dump(obj,
@@ -214,12 +550,19 @@ def dump(obj,
          sort_keys=False,
          sort_sets=False,
          indent=None):
-    outcome = udump(obj,
-                    string_encoding=string_encoding,
-                    keyword_keys=keyword_keys,
-                    sort_keys=sort_keys,
-                    sort_sets=sort_sets,
-                    indent=indent)
+    """
+    Return the EDN representation of a Python object.
+
+    See ``Encoder`` for the arguments. The encoder is only created when options
+    are given; otherwise a shared default one is used.
+    """
+    options = (string_encoding, output_encoding, keyword_keys, sort_keys,
+               sort_sets, indent)
+    if options == _DEFAULT_OPTIONS:
+        encoder = _default_encoder
+    else:
+        encoder = Encoder(*options)
+    outcome = encoder.encode(obj)
     if _PY3:
         return outcome
     return outcome.encode(output_encoding)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# Lazy reading of EDN texts. Vectors, lists and maps are read as proxies that
+# only know the span of their text; the first access to one of their items
+# finds the spans of all the items, without parsing them, and parses that item
+# alone. Everything else (scalars, sets, tagged elements, metadata) is parsed
+# when it's accessed, with the fast reader.
+
+import re
+
+try:
+    import collections.abc as collections_abc
+except ImportError:
+    import collections as collections_abc
+
+from .edn_lex import MAP_NAMESPACE_TAG
+from .edn_reader import _apply_map_namespace_tag, read_all
+from .edn_scan import form_spans
+from .exceptions import EDNDecodeError
+from .immutable_dict import ImmutableDict, hash_unordered
+from .immutable_list import ImmutableList
+
+_NAMESPACED_MAP_RE = re.compile(r'({})[ \t\n\r,]*\{{'.format(MAP_NAMESPACE_TAG))
+_CLOSE_SYMBOLS = {'[': ']', '(': ')', '{': '}'}
+
+# placeholder for the items that haven't been parsed yet
+_UNREAD = object()
+
+
+def read_value(text, start, end, tagged_element):
+    """
+    Return the value of the form ``text[start:end]``: a lazy proxy if it's a
+    vector, a list or a map, otherwise its value.
+
+    The span of a form is found without tokenizing it, so it can hold tokens
+    that the parser reads as several values (e.g. ``1/`` reads as ``1 /``);
+    since the items are counted by spans, that raises an EDNDecodeError.
+    """
+    c = text[start]
+    # A collection that isn't closed by the right symbol is parsed right away,
+    # so that the error is raised here.
+    if _CLOSE_SYMBOLS.get(c) == text[end - 1] and end - start > 1:
+        if c == '[':
+            return LazyVector(text, start + 1, end - 1, tagged_element)
+        if c == '(':
+            return LazyList(text, start + 1, end - 1, tagged_element)
+        return LazyMap(text, start + 1, end - 1, tagged_element)
+    if c == '#' and text[end - 1] == '}':
+        m = _NAMESPACED_MAP_RE.match(text, start, end)
+        if m is not None:
+            return LazyMap(text, m.end(), end - 1, tagged_element, m.group(1)[2:])
+    values = read_all(text[start:end], tagged_element)
+    if len(values) != 1:
+        raise EDNDecodeError(
+            u"Expected a single value, read {} from {!r}".format(len(values), text[start:end]))
+    return values[0]
+
+
+def read_lazy(text, tagged_element):
+    """
+    Read all the values of an EDN text lazily and return them as a list.
+
+    ``tagged_element`` is called with the tag and the element of each tagged
+    element when it's accessed; it returns the value to use in place of the
+    element.
+    """
+    return [read_value(text, start, end, tagged_element)
+            for start, end in form_spans(text)]
+
+
+class _LazySequence(collections_abc.Sequence, collections_abc.Hashable):
+    __slots__ = ('_text', '_start', '_end', '_tagged_element', '_spans',
+                 '_items', '_hash')
+
+    def __init__(self, text, start, end, tagged_element):
+        self._text = text
+        self._start = start
+        self._end = end
+        self._tagged_element = tagged_element
+        self._spans = None
+        self._items = None
+        self._hash = None
+
+    def _read_spans(self):
+        if self._spans is None:
+            spans = form_spans(self._text, self._start, self._end)
+            self._items = [_UNREAD] * len(spans)
+            self._spans = spans
+        return self._spans
+
+    def __getitem__(self, index):
+        spans = self._read_spans()
+        if isinstance(index, slice):
+            return self._slice_type(self[i] for i in range(*index.indices(len(spans))))
+        value = self._items[index]
+        if value is _UNREAD:
+            start, end = spans[index]
+            value = self._items[index] = read_value(self._text, start, end, self._tagged_element)
+        return value
+
+    def __len__(self):
+        return len(self._read_spans())
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reduce__(self):
+        return self._realized_type, (tuple(self),)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self))
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, self._equal_types):
+            return NotImplemented
+        return len(self) == len(other) and tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+
+class LazyVector(_LazySequence):
+    """
+    A vector whose items are parsed when they're accessed. It's equal to the
+    ImmutableList of the same items.
+    """
+    __slots__ = ()
+    _realized_type = ImmutableList
+    # the type of the slices of an ImmutableList
+    _slice_type = list
+
+    def __repr__(self):
+        return list(self).__repr__()
+
+
+LazyVector._equal_types = (LazyVector, ImmutableList, list)
+
+
+class LazyList(_LazySequence):
+    """
+    A list whose items are parsed when they're accessed. It's equal to the
+    tuple of the same items.
+    """
+    __slots__ = ()
+    _realized_type = tuple
+    _slice_type = tuple
+
+    def __repr__(self):
+        return tuple(self).__repr__()
+
+
+LazyList._equal_types = (LazyList, tuple)
+
+
+class LazyMap(collections_abc.Mapping):
+    """
+    A map whose values are parsed when they're accessed; its keys are all
+    parsed on the first access. It's equal to the ImmutableDict of the same
+    items.
+    """
+    __slots__ = ('_text', '_start', '_end', '_tagged_element', '_ns',
+                 '_spans', '_index', '_values', '_hash')
+
+    def __init__(self, text, start, end, tagged_element, ns=None):
+        self._text = text
+        self._start = start
+        self._end = end
+        self._tagged_element = tagged_element
+        self._ns = ns
+        self._spans = None
+        # key -> index of the span of its value
+        self._index = None
+        self._values = None
+        self._hash = None
+
+    def _read_keys(self):
+        if self._index is None:
+            spans = form_spans(self._text, self._start, self._end)
+            if len(spans) % 2 != 0:
+                raise EDNDecodeError('Even number of terms required for map')
+            text = self._text
+            tagged_element = self._tagged_element
+            ns = self._ns
+            index = {}
+            for i in range(0, len(spans), 2):
+                start, end = spans[i]
+                key = read_value(text, start, end, tagged_element)
+                if ns is not None:
+                    key = _apply_map_namespace_tag(ns, key)
+                index[key] = i + 1
+            self._spans = spans
+            self._values = [_UNREAD] * len(spans)
+            self._index = index
+        return self._index
+
+    def __getitem__(self, key):
+        i = self._read_keys()[key]
+        value = self._values[i]
+        if value is _UNREAD:
+            start, end = self._spans[i]
+            value = self._values[i] = read_value(self._text, start, end, self._tagged_element)
+        return value
+
+    def __len__(self):
+        return len(self._read_keys())
+
+    def __iter__(self):
+        return iter(self._read_keys())
+
+    def __contains__(self, key):
+        return key in self._read_keys()
+
+    def __reduce__(self):
+        return ImmutableDict, (dict(self.items()), False)
+
+    def __repr__(self):
+        return dict(self.items()).__repr__()
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash_unordered(self.items())
+        return self._hash
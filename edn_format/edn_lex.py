@@ -8,15 +8,16 @@ import decimal
 import fractions
 import logging
 import re
+import threading
+import weakref
 
 
 import ply.lex
 
 from .exceptions import EDNDecodeError
-from .immutable_dict import ImmutableDict
 from .char import Char
 
-from .compat import unicode, _bytes
+from .compat import unichr, unicode, _bytes
 
 
 ESCAPE_SEQUENCE_RE = re.compile(r'''
@@ -28,18 +29,71 @@ ESCAPE_SEQUENCE_RE = re.compile(r'''
     | \\[\\'"abfnrtv]  # Single-character escapes
     )''', re.UNICODE | re.VERBOSE)
 
+SINGLE_CHARACTER_ESCAPES = {"'": "'", '"': '"', 'a': '\a', 'b': '\b', 'f': '\f',
+                            'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+_HEX4_RE = re.compile('[0-9a-fA-F]{4}')
 
-def decode_escapes(s):
-    def decode_match(match):
-        return codecs.decode(match.group(0), 'unicode-escape')
 
-    return ESCAPE_SEQUENCE_RE.sub(decode_match, s)
+def _decode_match(match):
+    return codecs.decode(match.group(0), 'unicode-escape')
+
+
+def decode_escapes(s):
+    # Most strings don't have any escape, and most escapes are a single
+    # character or \uXXXX. The text is split on the backslashes, so that each part but
+    # the first starts with an escape; an empty part is an escaped backslash,
+    # followed by a part that is plain text. Strings with other escapes are
+    # decoded by the codec, one escape at a time.
+    if '\\' not in s:
+        return s
+    parts = s.split('\\')
+    decoded = [parts[0]]
+    append = decoded.append
+    escapes = SINGLE_CHARACTER_ESCAPES
+    i = 1
+    count = len(parts)
+    while i < count:
+        part = parts[i]
+        i += 1
+        if not part:
+            append('\\')
+            if i < count:
+                append(parts[i])
+                i += 1
+            continue
+        c = escapes.get(part[0])
+        if c is not None:
+            append(c)
+            append(part[1:])
+        elif part[0] == 'u' and _HEX4_RE.match(part, 1):
+            append(unichr(int(part[1:5], 16)))
+            append(part[5:])
+        else:
+            return ESCAPE_SEQUENCE_RE.sub(_decode_match, s)
+    return ''.join(decoded)
+
+
+# Keywords and symbols are interned: creating one with the name of an existing
+# one returns the existing instance, as long as it's referenced somewhere.
+_interned = weakref.WeakValueDictionary()
 
 
 class BaseEdnType(object):
-    def __init__(self, name):
-        self._name = unicode(name)
-        self._type = BaseEdnType
+    __slots__ = ('_name', '_hash', '__weakref__')
+
+    def __new__(cls, name):
+        name = unicode(name)
+        key = (cls, name)
+        self = _interned.get(key)
+        if self is None:
+            self = object.__new__(cls)
+            self._name = name
+            self._hash = hash((self._type, name))
+            self = _interned.setdefault(key, self)
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self._name,)
 
     @property
     def name(self):
@@ -50,9 +104,11 @@ class BaseEdnType(object):
         return self._type
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, self.__class__):
             return False
-        return self.__dict__ == other.__dict__
+        return self._type is other._type and self._name == other._name
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -61,13 +117,14 @@ class BaseEdnType(object):
         return '{}({})'.format(self.__class__.__name__, self._name)
 
     def __hash__(self):
-        return ImmutableDict(self.__dict__).__hash__()
+        return self._hash
+
+
+BaseEdnType._type = BaseEdnType
 
 
 class Keyword(BaseEdnType):
-    def __init__(self, name):
-        super(Keyword, self).__init__(name)
-        self._type = Keyword
+    __slots__ = ()
 
     def __str__(self):
         return ':{}'.format(self.name)
@@ -104,15 +161,19 @@ class Keyword(BaseEdnType):
         return self.__class__("%s/%s" % (ns, name))
 
 
+Keyword._type = Keyword
+
+
 class Symbol(BaseEdnType):
-    def __init__(self, name):
-        super(Symbol, self).__init__(name)
-        self._type = Symbol
+    __slots__ = ()
 
     def __str__(self):
         return self._name
 
 
+Symbol._type = Symbol
+
+
 class MetadataValue(object):
     """An EDN value annotated with metadata, serialized as ``^{metadata} value``."""
 
@@ -218,26 +279,75 @@ t_CARET = r'\^'
 t_ignore = ''.join([" ", "\t", "\n", ","])
 
 
+SYMBOLIC_VALUES = {"##Inf": float("inf"),
+                   "##-Inf": float("-inf"),
+                   "##NaN": float("nan")}
+
+_DECIMAL_ONE = decimal.Decimal(1)
+
+NAMED_CHARS = {r"\newline": Char("\n"),
+               r"\return": Char("\r"),
+               r"\space": Char(" "),
+               r"\tab": Char("\t")}
+
+
+# The functions below convert the text of a token to its value. They're shared
+# by the PLY rules of this module and by the reader in ``edn_reader``.
+
+def parse_char(s):
+    return Char(s[1]
+                if len(s) == 2
+                else _bytes(s).decode('raw_unicode_escape'))
+
+
+def parse_string(s):
+    return decode_escapes(s[1:-1])
+
+
+def parse_float(s):
+    # The token regex only accepts valid exponents, which float and Decimal
+    # apply themselves. Multiplying by one rounds the Decimal to the precision
+    # of the current context.
+    if s[-1] == 'M':
+        return decimal.Decimal(s[:-1]) * _DECIMAL_ONE
+    return float(s)
+
+
+def parse_ratio(s):
+    numerator, _, denominator = s.partition("/")
+    return fractions.Fraction(int(numerator), int(denominator))
+
+
+def parse_integer(s):
+    if s[-1] == 'N':
+        return int(s[:-1])
+    return int(s)
+
+
+def parse_hex_integer(s):
+    return int(s, 16)
+
+
+def parse_symbol(s):
+    if s == "nil":
+        return None
+    elif s == "true":
+        return True
+    elif s == "false":
+        return False
+    return Symbol(s)
+
+
 def t_SYMBOLIC_VALUE(t):
     # https://clojure.org/reference/reader#_symbolic_values
     r"\#\#(-Inf|Inf|NaN)"
-    t.value = {"##Inf": float("inf"),
-               "##-Inf": float("-inf"),
-               "##NaN": float("nan")}[t.value]
+    t.value = SYMBOLIC_VALUES[t.value]
     return t
 
 
 def t_WHITESPACE(t):
     r"(\\newline)|(\\return)|(\\space)|(\\tab)"
-    if t.value == r"\newline":
-        t.value = Char("\n")
-    elif t.value == r"\return":
-        t.value = Char("\r")
-    elif t.value == r"\space":
-        t.value = Char(" ")
-    elif t.value == r"\tab":
-        t.value = Char("\t")
-
+    t.value = NAMED_CHARS[t.value]
     return t
 
 
@@ -245,39 +355,25 @@ def t_CHAR(t):
     # uXXXX hex code or from "!" to "~" = all printable ASCII chars except the space
     # or unicode word chars
     r"(\\u[0-9A-Fa-f]{4}|\\[!-~\w])"
-    t.value = Char(t.value[1]
-                   if len(t.value) == 2
-                   else _bytes(t.value).decode('raw_unicode_escape'))
+    t.value = parse_char(t.value)
     return t
 
 
 def t_STRING(t):
     r'"([^"\\]*(\\.[^"\\]*)*)"'
-    t.value = t.value[1:-1]
-    t.value = decode_escapes(t.value)
+    t.value = parse_string(t.value)
     return t
 
 
 def t_FLOAT(t):
     r"""[+-]?\d+(?:(?:\.\d+([eE][+-]?\d+)?|[eE][+-]?\d+)M?|M)"""
-    e_value = 0
-    if 'e' in t.value or 'E' in t.value:
-        matches = re.search(r'[eE]([+-]?\d+)M?$', t.value)
-        if matches is None:
-            raise EDNDecodeError('Invalid float : {}'.format(t.value))
-        e_value = int(matches.group(1))
-    if t.value.endswith('M'):
-        ctx = decimal.getcontext()
-        t.value = decimal.Decimal(t.value[:-1]) * ctx.power(1, e_value)
-    else:
-        t.value = float(t.value) * pow(1, e_value)
+    t.value = parse_float(t.value)
     return t
 
 
 def t_RATIO(t):
     r"""-?\d+/\d+"""
-    numerator, denominator = t.value.split("/", 1)
-    t.value = fractions.Fraction(int(numerator), int(denominator))
+    t.value = parse_ratio(t.value)
     return t
 
 
@@ -285,15 +381,13 @@ def t_INTEGER(t):
     # "No integer other than 0 may begin with 0."
     # https://github.com/edn-format/edn#integers
     r"""[+-]?(?:0(?!x)|[1-9]\d*)N?"""
-    if t.value.endswith('N'):
-        t.value = t.value[:-1]
-    t.value = int(t.value)
+    t.value = parse_integer(t.value)
     return t
 
 
 def t_HEX_INTEGER(t):
     r"""[+-]?0x[0-9A-Fa-f]+"""
-    t.value = int(t.value, 16)
+    t.value = parse_hex_integer(t.value)
     return t
 
 
@@ -328,14 +422,7 @@ def t_KEYWORD(t):
 
 @ply.lex.TOKEN(SYMBOL)
 def t_SYMBOL(t):
-    if t.value == "nil":
-        t.value = None
-    elif t.value == "true":
-        t.value = True
-    elif t.value == "false":
-        t.value = False
-    else:
-        t.value = Symbol(t.value)
+    t.value = parse_symbol(t.value)
     return t
 
 
@@ -345,12 +432,31 @@ def t_error(t):
             c=t.value[0], p=t.lexpos, a=t.value[0:100]))
 
 
+_master_lexer = None
+_master_lexer_lock = threading.Lock()
+
+
+def _build_lexer():
+    global _master_lexer
+    with _master_lexer_lock:
+        if _master_lexer is None:
+            kwargs = {}
+            if __debug__:
+                kwargs["debug"] = True
+                kwargs["debuglog"] = logging.getLogger(__name__)
+            _master_lexer = ply.lex.lex(reflags=re.UNICODE, **kwargs)
+    return _master_lexer
+
+
 def lex(text=None):
-    kwargs = {}
-    if __debug__:
-        kwargs["debug"] = True
-        kwargs["debuglog"] = logging.getLogger(__name__)
-    lex = ply.lex.lex(reflags=re.UNICODE, **kwargs)
+    """
+    Return a new lexer, optionally fed with ``text``.
+
+    The master lexer (and its compiled regexes) is built once per process;
+    each call returns a cheap clone of it so that lexers can be used
+    concurrently.
+    """
+    lex = (_master_lexer or _build_lexer()).clone()
     if text is not None:
         lex.input(text)
     return lex
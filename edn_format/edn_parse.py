@@ -1,17 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import datetime
+import codecs
+import copy
+import threading
 import uuid
-from collections import deque
 
 import ply.yacc
-import pyrfc3339
 
-from .edn_lex import tokens, lex, Keyword, MetadataValue
+from .edn_lazy import read_lazy
+from .edn_lex import tokens, lex, MetadataValue
+from .edn_reader import COLLECTIONS, CollectionTypes, read_all
 from .exceptions import EDNDecodeError
-from .immutable_dict import ImmutableDict
-from .immutable_list import ImmutableList
+from .numeric_vector import numeric_vectors as _numeric_vectors
+from .rfc3339 import parse_inst
+from . import stats as _stats
 
 from .compat import basestring, unicode
 
@@ -85,74 +88,65 @@ def p_term_leaf(p):
 
 def p_vector(p):
     """vector : VECTOR_START expressions VECTOR_END"""
-    p[0] = ImmutableList(p[2])
+    p[0] = p.lexer.collections.vector(p[2])
 
 
 def p_list(p):
     """list : LIST_START expressions LIST_END"""
-    p[0] = tuple(p[2])
+    p[0] = p.lexer.collections.list(p[2])
 
 
 def p_set(p):
     """set : SET_START expressions MAP_OR_SET_END"""
-    p[0] = frozenset(p[2])
+    p[0] = p.lexer.collections.set(p[2])
 
 
-def p_simple_map(p):
-    """simple_map : MAP_START expressions MAP_OR_SET_END"""
-    terms = p[2]
-    if len(terms) % 2 != 0:
-        raise EDNDecodeError('Even number of terms required for map')
-    # partition terms in pairs
-    p[0] = ImmutableDict((terms[i], terms[i+1]) for i in range(0, len(terms), 2))
+def p_map_terms(p):
+    """map_terms : MAP_START expressions MAP_OR_SET_END"""
+    p[0] = p[2]
 
 
 def p_map(p):
-    """map : simple_map"""
-    p[0] = p[1]
+    """map : map_terms"""
+    p[0] = p.lexer.collections.map(p[1], None)
 
 
-def _apply_map_namespace_tag(ns, k):
-    """
-    Helper for the p_map_with_namespace_tag rule.
-    Apply a namespace tag on a map key.
-    """
-    if not isinstance(k, Keyword):
-        return k
+def p_map_with_namespace_tag(p):
+    """map : MAP_NAMESPACE_TAG map_terms"""
+    p[0] = p.lexer.collections.map(p[2], p[1])
 
-    if k.namespace:
-        # https://clojure.org/reference/reader#_maps
-        if k.namespace == "_":
-            return k.with_namespace(None)
 
-        return k
+# ``expressions`` is left-recursive so that the parser reduces each expression
+# as soon as it's read: the parser stack doesn't grow with the size of a
+# collection, and its expressions are appended to a single list.
+def p_expressions_expression(p):
+    """expressions : expressions expression"""
+    p[1].append(p[2])
+    p[0] = p[1]
 
-    return k.with_namespace(ns)
 
+def p_expressions_discard(p):
+    """expressions : expressions discard"""
+    p[0] = p[1]
 
-def p_map_with_namespace_tag(p):
-    """map : MAP_NAMESPACE_TAG simple_map"""
-    ns = p[1]
-    p[0] = ImmutableDict((
-        (_apply_map_namespace_tag(ns, k), v)
-        for k, v in p[2].items()))
 
+def p_expressions_empty(p):
+    """expressions :"""
+    p[0] = []
 
-def p_discarded_expressions(p):
-    """discarded_expressions : DISCARD_TAG expression discarded_expressions
-                             |"""
-    p[0] = deque()
 
+def p_discard(p):
+    """discard : DISCARD_TAG operand"""
 
-def p_expressions_expression_expressions(p):
-    """expressions : expression expressions"""
-    p[2].appendleft(p[1])
-    p[0] = p[2]
 
+def p_operand(p):
+    """operand : expression"""
+    p[0] = p[1]
 
-def p_expressions_empty(p):
-    """expressions : discarded_expressions"""
-    p[0] = deque()
+
+def p_operand_discard(p):
+    """operand : DISCARD_TAG operand operand"""
+    p[0] = p[3]
 
 
 def p_expression(p):
@@ -164,28 +158,12 @@ def p_expression(p):
     p[0] = p[1]
 
 
-def p_expression_discard_expression_expression(p):
-    """expression : DISCARD_TAG expression expression"""
-    p[0] = p[3]
-
-
-def p_expression_tagged_element(p):
-    """expression : TAG expression"""
-    tag = p[1]
-    element = p[2]
-
+def _tagged_element(tag, element):
+    """
+    Return the value of the element ``element`` tagged with ``tag``.
+    """
     if tag == 'inst':
-        length = len(element)
-        hyphens_count = element.count('-')
-
-        if length == 10 and hyphens_count == 2:
-            output = datetime.datetime.strptime(element, '%Y-%m-%d').date()
-        elif length == 7 and hyphens_count == 1:
-            output = datetime.datetime.strptime(element, '%Y-%m').date()
-        elif length == 4 and hyphens_count == 0:
-            output = datetime.datetime.strptime(element, '%Y').date()
-        else:
-            output = pyrfc3339.parse(element)
+        output = parse_inst(element)
     elif tag == 'uuid':
         output = uuid.UUID(element)
     elif tag in _serializers:
@@ -194,11 +172,16 @@ def p_expression_tagged_element(p):
         raise NotImplementedError(
             u"Don't know how to handle tag ImmutableDict({})".format(tag))
 
-    p[0] = output
+    return output
+
+
+def p_expression_tagged_element(p):
+    """expression : TAG operand"""
+    p[0] = p.lexer.tagged_element(p[1], p[2])
 
 
 def p_expression_metadata(p):
-    """expression : CARET expression expression"""
+    """expression : CARET operand operand"""
     p[0] = MetadataValue(metadata=p[2], value=p[3])
 
 
@@ -213,11 +196,87 @@ def p_error(p):
         raise EDNDecodeError(p)
 
 
+_parsers = {}
+_parsers_lock = threading.Lock()
+_thread_parsers = threading.local()
+
+
+def _get_parser(debug=False, write_tables=True):
+    """
+    Return a Yacc parser for the EDN grammar.
+
+    Building the parser reflects over the grammar rules of this module and
+    loads (or generates) the LALR tables, so it's only done once per process.
+    ``LRParser.parse`` keeps some of its state on the instance, hence every
+    thread gets its own shallow copy of the shared parser.
+    """
+    debug = bool(debug)
+    parsers = getattr(_thread_parsers, 'parsers', None)
+    if parsers is None:
+        parsers = _thread_parsers.parsers = {}
+
+    parser = parsers.get(debug)
+    if parser is None:
+        with _parsers_lock:
+            shared = _parsers.get(debug)
+            if shared is None:
+                # See http://www.dabeaz.com/ply/ply.html#ply_nn36
+                shared = ply.yacc.yacc(debug=debug, write_tables=write_tables)
+                _parsers[debug] = shared
+        parser = parsers[debug] = copy.copy(shared)
+    return parser
+
+
+ENGINES = ('ply', 'fast')
+
+
+_numeric_collection_types = {}
+
+
+def _numeric_collections(numeric_vectors):
+    collection_types = _numeric_collection_types.get(numeric_vectors)
+    if collection_types is None:
+        base = COLLECTIONS['immutable']
+        collection_types = _numeric_collection_types[numeric_vectors] = CollectionTypes(
+            _numeric_vectors(base.vector, numeric_vectors), base.list, base.set, base.map)
+    return collection_types
+
+
 def parse_all(text, input_encoding='utf-8', debug=False,
-              write_ply_tables=True):
+              write_ply_tables=True, engine='ply', collections='immutable',
+              lazy=False, numeric_vectors=None):
     """
     Parse all objects from the text and return a (possibly empty) list.
 
+    ``engine`` selects the implementation of the parser. ``'ply'`` (the
+    default) uses the PLY lexer and parser. ``'fast'`` uses a hand-written
+    reader that accepts the same syntax and gives the same results, but is
+    several times faster, especially on large documents.
+
+    ``collections`` selects the types of the collections. With
+    ``'immutable'`` (the default), vectors are read as ``ImmutableList``,
+    sets as ``frozenset`` and maps as ``ImmutableDict``. With
+    ``'persistent'``, they are read as ``PersistentVector``, ``PersistentSet``
+    and ``PersistentMap``, which can be updated efficiently. Lists are always
+    read as tuples.
+
+    If ``lazy`` is True, vectors, lists and maps are read as ``LazyVector``,
+    ``LazyList`` and ``LazyMap`` proxies, which only parse an item (and call
+    the handlers of its tags) when it's accessed, with the fast reader. They
+    keep a reference to ``text``, and syntax errors in an item are only
+    raised when it's accessed. ``collections`` must be ``'immutable'``.
+
+    ``numeric_vectors`` reads the vectors of only integers or only floats as
+    ``NumericVector``, which stores them in a compact buffer: an
+    ``array.array`` with ``'array'``, or a NumPy array with ``'numpy'``.
+    Integers that don't fit in 64 bits keep the vector from being numeric. It
+    can't be used with ``lazy``, and ``collections`` must be ``'immutable'``,
+    as a NumericVector is only equal to the ImmutableList of its numbers.
+
+    ``text`` is a string, or a bytes-like object (bytes, ``memoryview``,
+    ``mmap``...) encoded with ``input_encoding``. The fast engine reads UTF-8
+    bytes as they are, without decoding a copy of the whole text.
+
     ``debug`` and ``write_ply_tables`` arguments are passed to the Yacc parser.
     If ``debug`` is True, the parser writes a ``parser.out`` debugging file.
     If ``write_ply_tables`` is True, the parser writes grammar tables in a
@@ -226,14 +285,75 @@ def parse_all(text, input_encoding='utf-8', debug=False,
     efficient as it'll have to re-generate the tables every time. If you can't
     let it write its cache, you can disable this warning by passing
     `write_ply_tables=False`.
+
+    The parser is only built on the first call (per value of ``debug``) and
+    cached for the lifetime of the process; subsequent calls reuse it.
+
+    The work of the call is recorded by the started ``Stats``, if any.
     """
-    if not isinstance(text, unicode):
-        text = text.decode(input_encoding)
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine {!r}, expected one of {}".format(
+            engine, ", ".join(ENGINES)))
+    if collections not in COLLECTIONS:
+        raise ValueError("Unknown collections {!r}, expected one of {}".format(
+            collections, ", ".join(sorted(COLLECTIONS))))
+    collection_types = COLLECTIONS[collections]
+    if lazy and collections != 'immutable':
+        raise ValueError("lazy=True requires collections='immutable'")
+    if numeric_vectors is not None:
+        if lazy:
+            raise ValueError("lazy=True doesn't support numeric_vectors")
+        if collections != 'immutable':
+            raise ValueError("numeric_vectors requires collections='immutable'")
+        collection_types = _numeric_collections(numeric_vectors)
+
+    record = _stats.recorder()
+    if record is None:
+        return _parse_all(text, input_encoding, debug, write_ply_tables, engine,
+                          collection_types, lazy, None)
+
+    start = _stats.clock()
+    record.calls['parse'] += 1
+    if isinstance(text, unicode):
+        record.chars_read += len(text)
+    else:
+        record.bytes_read += len(text)
+    try:
+        return _parse_all(text, input_encoding, debug, write_ply_tables, engine,
+                          collection_types, lazy, record)
+    finally:
+        record.times['parse'] += _stats.clock() - start
+        _stats.publish(record)
+
 
-    # See http://www.dabeaz.com/ply/ply.html#ply_nn36
-    p = ply.yacc.yacc(debug=debug, write_tables=write_ply_tables)
-    expressions = p.parse(text, lexer=lex())
-    return list(expressions)
+def _parse_all(text, input_encoding, debug, write_ply_tables, engine,
+               collection_types, lazy, record):
+    tagged_element = _tagged_element
+    if record is not None and not lazy:
+        tagged_element = _stats.timed_tags(record, _tagged_element)
+
+    if not isinstance(text, unicode):
+        if engine == 'fast' and not lazy and codecs.lookup(input_encoding).name == 'utf-8':
+            # read the bytes as they are, and only decode their tokens
+            return _stats.timed(record, 'read', read_all, text, tagged_element, collection_types)
+        text = _stats.timed(record, 'decode', unicode, text, input_encoding)
+
+    if lazy:
+        return _stats.timed(record, 'read', read_lazy, text, tagged_element)
+
+    if engine == 'fast':
+        return _stats.timed(record, 'read', read_all, text, tagged_element, collection_types)
+
+    p = _stats.timed(record, 'build', _get_parser, debug, write_ply_tables)
+    lexer = _stats.timed(record, 'build', lex)
+    # the grammar rules get the collection types and the tag handler through
+    # ``p.lexer``
+    lexer.collections = collection_types
+    lexer.tagged_element = tagged_element
+    if record is not None:
+        _stats.count_tokens(record, lexer)
+        p = _stats.count_reductions(record, p)
+    return p.parse(text, lexer=lexer)
 
 
 def parse(text, **kwargs):
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# A reader that doesn't go through PLY: the input is tokenized with a single
+# master regex, and values are built as soon as their last token is read,
+# using an explicit stack instead of an LALR automaton.
+
+import re
+import string
+
+from . import edn_lex
+from .edn_lex import Keyword, MetadataValue, NAMED_CHARS, SYMBOLIC_VALUES, \
+    parse_char, parse_float, parse_hex_integer, parse_integer, parse_ratio, \
+    parse_string, parse_symbol
+from .exceptions import EDNDecodeError
+from .immutable_dict import ImmutableDict
+from .immutable_list import ImmutableList
+from .persistent import PersistentMap, PersistentSet, PersistentVector
+
+from .compat import _PY3, unicode
+
+
+# Token rules of ``edn_lex``, in the order PLY tries them: rules defined by
+# functions come first in definition order, then rules defined by strings,
+# longest regex first.
+RULES = (
+    'SYMBOLIC_VALUE',
+    'WHITESPACE',
+    'CHAR',
+    'STRING',
+    'FLOAT',
+    'RATIO',
+    'INTEGER',
+    'HEX_INTEGER',
+    'COMMENT',
+    'DISCARD_TAG',
+    'TAG',
+    'MAP_NAMESPACE_TAG',
+    'KEYWORD',
+    'SYMBOL',
+    'SET_START',
+    'VECTOR_START',
+    'VECTOR_END',
+    'LIST_START',
+    'LIST_END',
+    'MAP_START',
+    'MAP_OR_SET_END',
+    'CARET',
+)
+
+
+def _rule_regex(name):
+    rule = getattr(edn_lex, 't_' + name)
+    if callable(rule):
+        return getattr(rule, 'regex', rule.__doc__)
+    return rule
+
+
+def _token_regex(rules):
+    return re.compile(
+        '|'.join('(?P<{}>{})'.format(name, _rule_regex(name)) for name in rules),
+        re.UNICODE)
+
+
+TOKEN_RE = _token_regex(RULES)
+
+# characters ignored between tokens, including comments
+IGNORED_CHARACTERS = edn_lex.t_ignore + ';'
+IGNORE_RE = re.compile('(?:[{}]+|{})*'.format(re.escape(edn_lex.t_ignore),
+                                              edn_lex.t_COMMENT.__doc__))
+
+# Rather than trying all the rules in turn at each position, the reader looks
+# at the first character of the next token and only tries the rules that can
+# start with it, in the same relative order. Tokens that are a single character
+# don't need a regex at all. Any other character goes through TOKEN_RE.
+_SYMBOL_RE = _token_regex(('SYMBOL',))
+_NUMBER_RE = _token_regex(('FLOAT', 'RATIO', 'INTEGER', 'HEX_INTEGER', 'SYMBOL'))
+FIRST_CHARACTERS = {
+    '[': (None, 'VECTOR_START'),
+    ']': (None, 'VECTOR_END'),
+    '(': (None, 'LIST_START'),
+    ')': (None, 'LIST_END'),
+    '{': (None, 'MAP_START'),
+    '}': (None, 'MAP_OR_SET_END'),
+    '^': (None, 'CARET'),
+    ':': (_token_regex(('KEYWORD',)), 'KEYWORD'),
+    '"': (_token_regex(('STRING',)), 'STRING'),
+    '\\': (_token_regex(('WHITESPACE', 'CHAR')), None),
+    '#': (_token_regex(('SYMBOLIC_VALUE', 'DISCARD_TAG', 'TAG',
+                        'MAP_NAMESPACE_TAG', 'SET_START')), None),
+}
+for _c in '0123456789+-':
+    FIRST_CHARACTERS[_c] = (_NUMBER_RE, None)
+for _c in string.ascii_letters + '*!_?$%&=<>@./':
+    FIRST_CHARACTERS[_c] = (_SYMBOL_RE, 'SYMBOL')
+del _c
+
+# The reader also reads bytes-like objects of UTF-8 text (bytes, mmap,
+# memoryview...) without decoding them first: it uses bytes versions of the
+# regexes and the tables above, and only decodes the tokens. Where a regex
+# accepts a word character (``\w``), its bytes version accepts any non-ASCII
+# character; the tokens that have some are checked against the regex of their
+# rule once decoded.
+_WORD_CLASS_RE = re.compile(r'\[(?:[^\]\\]|\\.)*\\w(?:[^\]\\]|\\.)*\]')
+_NON_ASCII_CHARACTER = r'[\xc2-\xf4][\x80-\xbf]+'
+
+
+def _bytes_regex(regex):
+    pattern = _WORD_CLASS_RE.sub(
+        lambda m: '(?:{}|{})'.format(m.group(), _NON_ASCII_CHARACTER), regex.pattern)
+    return re.compile(pattern.encode('ascii'))
+
+
+def _byte(c):
+    # the type of the items of bytes
+    return ord(c) if _PY3 else c.encode('ascii')
+
+
+BYTES_TOKEN_RE = _bytes_regex(TOKEN_RE)
+BYTES_IGNORED_CHARACTERS = IGNORED_CHARACTERS.encode('ascii')
+BYTES_IGNORE_RE = _bytes_regex(IGNORE_RE)
+_bytes_regexes = {}
+BYTES_FIRST_CHARACTERS = {}
+for _c, (_regex, _kind) in FIRST_CHARACTERS.items():
+    if _regex is not None:
+        if _regex.pattern not in _bytes_regexes:
+            _bytes_regexes[_regex.pattern] = _bytes_regex(_regex)
+        _regex = _bytes_regexes[_regex.pattern]
+    BYTES_FIRST_CHARACTERS[_byte(_c)] = (_regex, _kind)
+del _c, _regex, _kind, _bytes_regexes
+
+# regexes of the whole tokens that can have word characters
+WORD_TOKEN_RES = {
+    name: re.compile('(?:{})\\Z'.format(_rule_regex(name)), re.UNICODE)
+    for name in ('CHAR', 'TAG', 'MAP_NAMESPACE_TAG', 'KEYWORD', 'SYMBOL')
+}
+
+# Vectors of plain integers or of plain floats (with a fraction or an
+# exponent, but no suffix) are read at once: the text of their items is split
+# and converted in bulk instead of being tokenized item by item. Anything else
+# in the vector (a comment, a discard, another kind of value...) makes the
+# regexes fail, and the vector is read as usual.
+_SEPARATOR = '[{}]'.format(re.escape(edn_lex.t_ignore))
+NUMERIC_VECTOR_RES = tuple(
+    re.compile(r'{s}*({n}(?:{s}+{n})*){s}*\]'.format(s=_SEPARATOR, n=number))
+    for number in (r'[+-]?(?:0|[1-9]\d*)',
+                   r'[+-]?\d+(?:\.\d+(?:[eE][+-]?\d+)?|[eE][+-]?\d+)'))
+BYTES_NUMERIC_VECTOR_RES = tuple(re.compile(regex.pattern.encode('ascii'))
+                                 for regex in NUMERIC_VECTOR_RES)
+
+
+def _read_numbers(text, pos, regexes, comma, space):
+    # Return the list of the numbers of the vector whose items start at
+    # ``pos`` and the end of the vector, or None if it's not a vector of
+    # numbers of the same type.
+    for regex, number_type in zip(regexes, (int, float)):
+        m = regex.match(text, pos)
+        if m is not None:
+            numbers = m.group(1)
+            if comma in numbers:
+                numbers = numbers.replace(comma, space)
+            return list(map(number_type, numbers.split())), m.end()
+    return None
+
+
+LEAVES = {
+    'STRING': parse_string,
+    'INTEGER': parse_integer,
+    'KEYWORD': lambda s: Keyword(s[1:]),
+    'SYMBOL': parse_symbol,
+    'FLOAT': parse_float,
+    'CHAR': parse_char,
+    'WHITESPACE': NAMED_CHARS.__getitem__,
+    'SYMBOLIC_VALUE': SYMBOLIC_VALUES.__getitem__,
+    'RATIO': parse_ratio,
+    'HEX_INTEGER': parse_hex_integer,
+}
+
+CLOSERS = {
+    'VECTOR_START': 'VECTOR_END',
+    'LIST_START': 'LIST_END',
+    'MAP_START': 'MAP_OR_SET_END',
+    'SET_START': 'MAP_OR_SET_END',
+}
+
+# placeholder for the metadata of a ``^`` that hasn't been read yet
+_NO_METADATA = object()
+
+
+def _apply_map_namespace_tag(ns, k):
+    """
+    Apply a namespace tag on a map key.
+    """
+    if not isinstance(k, Keyword):
+        return k
+
+    if k.namespace:
+        # https://clojure.org/reference/reader#_maps
+        if k.namespace == "_":
+            return k.with_namespace(None)
+
+        return k
+
+    return k.with_namespace(ns)
+
+
+def map_dict(terms, ns=None):
+    """
+    Return a dict of the keys and values in ``terms``, applying the map
+    namespace tag ``ns`` on the keys if it's not None.
+    """
+    if len(terms) % 2 != 0:
+        raise EDNDecodeError('Even number of terms required for map')
+    # partition terms in pairs
+    pairs = iter(terms)
+    if ns is None:
+        return dict(zip(pairs, pairs))
+    return {_apply_map_namespace_tag(ns, k): v for k, v in zip(pairs, pairs)}
+
+
+def build_map(terms, ns=None):
+    """
+    Return an ImmutableDict of the keys and values in ``terms``, applying the
+    map namespace tag ``ns`` on the keys if it's not None.
+    """
+    return ImmutableDict(map_dict(terms, ns), copy=False)
+
+
+class CollectionTypes(object):
+    """
+    The functions that build the vectors, lists, sets and maps read by the
+    parsers, from the list of their items (and, for maps, the namespace tag of
+    their keys, or None).
+    """
+    __slots__ = ('vector', 'list', 'set', 'map')
+
+    def __init__(self, vector, list, set, map):
+        self.vector = vector
+        self.list = list
+        self.set = set
+        self.map = map
+
+
+COLLECTIONS = {
+    'immutable': CollectionTypes(
+        vector=ImmutableList,
+        list=tuple,
+        set=frozenset,
+        map=build_map),
+    'persistent': CollectionTypes(
+        vector=PersistentVector,
+        list=tuple,
+        set=PersistentSet,
+        map=lambda terms, ns=None: PersistentMap(map_dict(terms, ns))),
+}
+
+
+def _collection(opener, items, ns, types):
+    if opener == 'VECTOR_START':
+        return types.vector(items)
+    if opener == 'LIST_START':
+        return types.list(items)
+    if opener == 'SET_START':
+        return types.set(items)
+    return types.map(items, ns)
+
+
+def _text(text):
+    if isinstance(text, unicode):
+        return text
+    return bytes(text).decode('utf-8', 'replace')
+
+
+def _decode_token(token, kind, text, pos):
+    decoded = token.decode('utf-8')
+    if len(decoded) != len(token) and kind in WORD_TOKEN_RES and \
+            WORD_TOKEN_RES[kind].match(decoded) is None:
+        raise _illegal_character(text, pos)
+    return decoded
+
+
+def _illegal_character(text, pos):
+    return EDNDecodeError(
+        "Illegal character '{c}' with lexpos {p} in the area of ...{a}...".format(
+            c=_text(text[pos:pos + 1]), p=pos, a=_text(text[pos:pos + 100])))
+
+
+def _unexpected_token(kind, token, pos):
+    if isinstance(token, int):
+        token = chr(token)
+    return EDNDecodeError("Unexpected token {} {!r} with lexpos {}".format(
+        kind, token, pos))
+
+
+def read_all(text, tagged_element, collection_types=COLLECTIONS['immutable']):
+    """
+    Read all the values of an EDN text and return them as a list.
+
+    ``tagged_element`` is called with the tag and the element of each tagged
+    element; it returns the value to use in place of the element.
+    ``collection_types`` is the CollectionTypes used to build collections.
+
+    ``text`` is either a string, or a bytes-like object of UTF-8 text, in
+    which case the offsets of error messages are in bytes.
+    """
+    if isinstance(text, unicode):
+        first_characters = FIRST_CHARACTERS
+        default = (TOKEN_RE, None)
+        skip = IGNORE_RE.match
+        ignored = IGNORED_CHARACTERS
+        open_brace = '{'
+        semicolon = ';'
+        numeric_vector = (NUMERIC_VECTOR_RES, ',', ' ')
+        is_bytes = False
+    else:
+        first_characters = BYTES_FIRST_CHARACTERS
+        default = (BYTES_TOKEN_RE, None)
+        skip = BYTES_IGNORE_RE.match
+        ignored = BYTES_IGNORED_CHARACTERS
+        open_brace = b'{'
+        semicolon = _byte(';')
+        numeric_vector = (BYTES_NUMERIC_VECTOR_RES, b',', b' ')
+        is_bytes = True
+    keyword = Keyword
+    # keywords are interned, but looking them up in a plain dict first is
+    # cheaper than in the weak-value table
+    keywords = {}
+    leaves = LEAVES
+    closers = CLOSERS
+
+    result = items = []
+    # open collections, as (opening token, items, prefixes base, namespace)
+    # tuples saved for the enclosing collection
+    collections = []
+    opener = None
+    ns = None
+    # pending tags, metadata and discards, as [token, argument] lists; the
+    # ones above ``base`` are waiting for a value of the current collection
+    prefixes = []
+    base = 0
+    pos = 0
+    end = len(text)
+
+    while True:
+        if pos >= end:
+            break
+        c = text[pos]
+        if c in ignored:
+            # most of the time that's a single space between two tokens
+            pos += 1
+            if c == semicolon or (pos < end and text[pos] in ignored):
+                pos = skip(text, pos - 1).end()
+            if pos >= end:
+                break
+            c = text[pos]
+
+        regex, kind = first_characters.get(c, default)
+        if regex is None:
+            token = c
+            pos += 1
+        else:
+            m = regex.match(text, pos)
+            if m is None:
+                raise _illegal_character(text, pos)
+            if kind is None:
+                kind = m.lastgroup
+            token = m.group()
+            if is_bytes and kind != 'KEYWORD':
+                token = _decode_token(token, kind, text, pos)
+            pos = m.end()
+
+        if kind == 'KEYWORD':
+            # in bytes, the cache of keywords saves decoding their tokens too
+            value = keywords.get(token)
+            if value is None:
+                name = _decode_token(token, kind, text, pos - len(token)) if is_bytes else token
+                value = keywords[token] = keyword(name[1:])
+        elif kind == 'STRING':
+            value = parse_string(token)
+        elif kind in leaves:
+            value = leaves[kind](token)
+        elif kind in closers:
+            numbers = _read_numbers(text, pos, *numeric_vector) if kind == 'VECTOR_START' else None
+            if numbers is None:
+                collections.append((opener, items, base, ns))
+                opener, items, base, ns = kind, [], len(prefixes), None
+                continue
+            numbers, pos = numbers
+            value = collection_types.vector(numbers)
+        elif kind == 'VECTOR_END' or kind == 'LIST_END' or kind == 'MAP_OR_SET_END':
+            if opener is None or closers[opener] != kind or len(prefixes) != base:
+                raise _unexpected_token(kind, token, pos - 1)
+            value = _collection(opener, items, ns, collection_types)
+            opener, items, base, ns = collections.pop()
+        elif kind == 'MAP_NAMESPACE_TAG':
+            pos = skip(text, pos).end()
+            if pos >= end:
+                raise EDNDecodeError('EOF Reached')
+            if text[pos:pos + 1] != open_brace:
+                raise EDNDecodeError("Expected a map after #:{} with lexpos {}".format(
+                    token[2:], pos))
+            pos += 1
+            collections.append((opener, items, base, ns))
+            opener, items, base, ns = 'MAP_START', [], len(prefixes), token[2:]
+            continue
+        elif kind == 'TAG':
+            prefixes.append([kind, token[1:]])
+            continue
+        elif kind == 'CARET':
+            prefixes.append([kind, _NO_METADATA])
+            continue
+        else:  # DISCARD_TAG
+            prefixes.append([kind, None])
+            continue
+
+        # The value goes through the pending prefixes of the current
+        # collection first, innermost first; what's left of it, if anything,
+        # is added to the collection.
+        while len(prefixes) > base:
+            prefix = prefixes[-1]
+            if prefix[0] == 'TAG':
+                prefixes.pop()
+                value = tagged_element(prefix[1], value)
+            elif prefix[0] == 'CARET':
+                if prefix[1] is _NO_METADATA:
+                    prefix[1] = value
+                    break
+                prefixes.pop()
+                value = MetadataValue(metadata=prefix[1], value=value)
+            else:
+                prefixes.pop()
+                break
+        else:
+            items.append(value)
+
+    if opener is not None or prefixes:
+        raise EDNDecodeError('EOF Reached')
+    return result
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# Finding the boundaries of EDN forms without parsing them, for the streaming
+# and lazy readers.
+
+import re
+
+
+# characters that are significant inside a collection
+_NESTED_RE = re.compile(r'["\\;()\[\]{}]')
+# characters that are significant inside a string
+_STRING_RE = re.compile(r'["\\]')
+# start of the next token at the top level
+_TOKEN_START_RE = re.compile(r'[^ \t\n\r,]')
+# end of a symbol, keyword, number, tag, etc.
+_ATOM_END_RE = re.compile(r'[ \t\n\r,;"()\[\]{}^\\]')
+
+
+def _balanced_re(levels):
+    # Regular expression of the rest of a collection, up to its closing
+    # symbol, if it has fewer than ``levels`` levels of nesting. Each part is
+    # unambiguous, so that it fails in linear time when the collection isn't
+    # complete.
+    text = r'[^"\\;()\[\]{}]*'
+    leaves = r'"[^"\\]*(?:\\.[^"\\]*)*"|\\.|;[^\n]*(?:\n|\Z)'
+    body = '{text}(?:(?:{leaves}){text})*'.format(text=text, leaves=leaves)
+    for _ in range(levels - 1):
+        body = r'{text}(?:(?:{leaves}|[(\[{{]{body}[)\]}}]){text})*'.format(
+            text=text, leaves=leaves, body=body)
+    return re.compile(body + r'[)\]}]', re.DOTALL)
+
+
+# rest of a collection, matched at once rather than symbol by symbol
+_BALANCED_RE = _balanced_re(8)
+
+# scanner modes
+_NORMAL = 0
+_STRING = 1
+_STRING_ESCAPE = 2
+_COMMENT = 3
+_CHAR = 4
+_ATOM = 5
+_HASH = 6
+
+
+class FormScanner(object):
+    """
+    Find the boundaries of the top-level forms of an EDN text that is read in
+    chunks, without building any value.
+
+    The scanner only keeps track of what it needs to know where a form ends
+    (nesting depth, strings, comments, characters, and the tags, metadata and
+    discards that prefix a value), so it works on any chunking of the text,
+    including chunks that split a form or a string in the middle.
+    """
+
+    def __init__(self):
+        # offset of the next chunk from the start of the text
+        self.offset = 0
+        # offset of the start of the current, incomplete, form
+        self.form_start = None
+        self._mode = _NORMAL
+        self._depth = 0
+        # number of values the current form still needs
+        self._need = 0
+        # whether the current token is a tag rather than a value
+        self._atom_is_prefix = False
+        self._hash_offset = None
+
+    def _value(self, end, forms):
+        self._need -= 1
+        if self._need == 0:
+            forms.append((self.form_start, end))
+            self.form_start = None
+
+    def scan(self, chunk):
+        """
+        Scan the next chunk of text and return a list of ``(start, end)``
+        offsets of the forms that end in this chunk.
+        """
+        forms = []
+        offset = self.offset
+        mode = self._mode
+        pos = 0
+        size = len(chunk)
+
+        while pos < size:
+            if mode == _STRING:
+                m = _STRING_RE.search(chunk, pos)
+                if m is None:
+                    break
+                pos = m.end()
+                if m.group() == '"':
+                    mode = _NORMAL
+                    if self._depth == 0:
+                        self._value(offset + pos, forms)
+                else:
+                    mode = _STRING_ESCAPE
+            elif mode == _STRING_ESCAPE:
+                pos += 1
+                mode = _STRING
+            elif mode == _COMMENT:
+                pos = chunk.find('\n', pos)
+                if pos < 0:
+                    break
+                mode = _NORMAL
+            elif mode == _CHAR:
+                # the character following a backslash is always part of the
+                # character literal, be it a delimiter or not
+                pos += 1
+                mode = _ATOM if self._depth == 0 else _NORMAL
+            elif mode == _ATOM:
+                m = _ATOM_END_RE.search(chunk, pos)
+                if m is None:
+                    break
+                pos = m.start()
+                mode = _NORMAL
+                self._end_atom(offset + pos, forms)
+            elif mode == _HASH:
+                c = chunk[pos]
+                pos += 1
+                if c == '{':
+                    mode = _NORMAL
+                    pos = self._open(chunk, pos, offset, forms)
+                elif c == '_':
+                    mode = _NORMAL
+                    self._discard()
+                else:
+                    mode = _ATOM
+                    self._atom_is_prefix = c == ':' or c.isalpha()
+            elif self._depth:
+                m = _NESTED_RE.search(chunk, pos)
+                if m is None:
+                    break
+                pos = m.end()
+                c = m.group()
+                if c == '"':
+                    mode = _STRING
+                elif c == ';':
+                    mode = _COMMENT
+                elif c == '\\':
+                    mode = _CHAR
+                elif c in '([{':
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._value(offset + pos, forms)
+            else:
+                m = _TOKEN_START_RE.search(chunk, pos)
+                if m is None:
+                    break
+                pos = m.start()
+                c = chunk[pos]
+                if c == ';':
+                    mode = _COMMENT
+                    continue
+                if self.form_start is None:
+                    self.form_start = offset + pos
+                    self._need = 1
+                pos += 1
+                if c == '"':
+                    mode = _STRING
+                elif c in '([{':
+                    pos = self._open(chunk, pos, offset, forms)
+                elif c in ')]}':
+                    # unbalanced: let the parser report it
+                    self._value(offset + pos, forms)
+                elif c == '^':
+                    self._need += 1
+                elif c == '#':
+                    mode = _HASH
+                    self._hash_offset = offset + pos - 1
+                elif c == '\\':
+                    mode = _CHAR
+                    self._atom_is_prefix = False
+                else:
+                    mode = _ATOM
+                    self._atom_is_prefix = False
+
+        self._mode = mode
+        self.offset += size
+        return forms
+
+    def _open(self, chunk, pos, offset, forms):
+        # Skip the rest of a collection opened at the top level if it's in
+        # this chunk, or else go through it symbol by symbol.
+        m = _BALANCED_RE.match(chunk, pos)
+        if m is None:
+            self._depth = 1
+            return pos
+        self._value(offset + m.end(), forms)
+        return m.end()
+
+    def _end_atom(self, end, forms):
+        if not self._atom_is_prefix:
+            self._value(end, forms)
+
+    def _discard(self):
+        # A discard at the start of a form makes a form of its own, which is
+        # complete after the discarded value. Anywhere else, it adds a value
+        # to the ones the current form needs.
+        if self.form_start != self._hash_offset:
+            self._need += 1
+
+    def end(self):
+        """
+        Signal the end of the text, which ends the current atom, if any.
+        Return a list of the ``(start, end)`` offsets of the forms it
+        completes.
+        """
+        forms = []
+        if self._mode == _ATOM or self._mode == _CHAR:
+            self._mode = _NORMAL
+            self._end_atom(self.offset, forms)
+        return forms
+
+    def finish(self):
+        """
+        Signal the end of the text. Return the ``(start, end)`` offsets of the
+        last form if it hasn't been returned by ``scan`` yet (it may be
+        incomplete), or ``None``.
+        """
+        forms = self.end()
+        if forms:
+            return forms[0]
+        if self.form_start is None:
+            return None
+        start, self.form_start = self.form_start, None
+        return start, self.offset
+
+
+def form_spans(text, start=0, end=None):
+    """
+    Return the ``(start, end)`` offsets of the forms of ``text[start:end]``,
+    leaving out the discarded ones (``#_ value``). An incomplete last form is
+    kept, so that parsing it raises the error.
+    """
+    chunk = text[start:end]
+    scanner = FormScanner()
+    spans = [(start + form_start, start + form_end)
+             for form_start, form_end in scanner.scan(chunk) + scanner.end()
+             if not chunk.startswith('#_', form_start)]
+    last = scanner.finish()
+    if last is not None:
+        spans.append((start + last[0], start + last[1]))
+    return spans
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import codecs
+import collections
+import mmap
+import os
+
+from .edn_parse import parse_all
+from .edn_scan import FormScanner
+
+from .compat import unicode
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class FormSplitter(object):
+    """
+    Split an EDN text that is read in chunks into the texts of its top-level
+    forms.
+
+    Only the text of the current form is kept between two chunks, so the memory
+    used is bounded by the size of the largest form and of a chunk.
+    """
+
+    def __init__(self):
+        self._scanner = FormScanner()
+        # parts of the current form that come from previous chunks
+        self._pending = []
+
+    def feed(self, text):
+        """
+        Add a chunk of text and return the list of the texts of the forms that
+        are complete.
+        """
+        scanner = self._scanner
+        offset = scanner.offset
+        forms = []
+        for start, end in scanner.scan(text):
+            if start < offset:
+                self._pending.append(text[:end - offset])
+                forms.append(''.join(self._pending))
+                self._pending = []
+            else:
+                forms.append(text[start - offset:end - offset])
+
+        start = scanner.form_start
+        if start is not None:
+            if start < offset:
+                self._pending.append(text)
+            else:
+                self._pending = [text[start - offset:]]
+        return forms
+
+    def close(self):
+        """
+        Signal the end of the text and return the list of the texts of the
+        remaining forms.
+        """
+        boundaries = self._scanner.finish()
+        pending, self._pending = self._pending, []
+        if boundaries is None:
+            return []
+        return [''.join(pending)]
+
+
+class IncrementalParser(object):
+    """
+    Parse an EDN text that is pushed in chunks, e.g. as it's received.
+
+        parser = IncrementalParser()
+        parser.feed(b'[1 2] {:a')
+        list(parser.forms())  # => [(1, 2)]
+        parser.feed(b' 1}')
+        list(parser.forms())  # => [{Keyword(a): 1}]
+
+    Chunks are bytes, decoded with ``input_encoding``, or text. Only the state
+    of the scanner and the text of the current form are kept between chunks,
+    so each character is scanned once and each form is parsed once, whatever
+    the chunking. A top-level atom (e.g. ``42``) is only complete once it's
+    followed by whitespace or a delimiter, or when the parser is closed.
+    Other keyword arguments are passed to ``parse_all``.
+    """
+
+    def __init__(self, input_encoding='utf-8', **kwargs):
+        self._splitter = FormSplitter()
+        self._decoder = codecs.getincrementaldecoder(input_encoding)()
+        self._kwargs = kwargs
+        # texts of the complete forms that haven't been parsed yet
+        self._texts = collections.deque()
+        self._closed = False
+
+    def feed(self, chunk):
+        """
+        Add a chunk of bytes or text.
+        """
+        if self._closed:
+            raise ValueError("feed() called on a closed IncrementalParser")
+        if not isinstance(chunk, unicode):
+            chunk = self._decoder.decode(chunk)
+        self._texts.extend(self._splitter.feed(chunk))
+
+    def close(self):
+        """
+        Signal the end of the text, so that ``forms`` returns the last form
+        too. An incomplete form raises an EDNDecodeError when it's parsed.
+        """
+        if not self._closed:
+            self._closed = True
+            self._texts.extend(self._splitter.feed(self._decoder.decode(b'', final=True)))
+            self._texts.extend(self._splitter.close())
+
+    def texts(self):
+        """
+        Iterate over the texts of the complete forms that haven't been returned
+        yet, without parsing them, e.g. to parse them elsewhere. Forms that
+        arrive while iterating are included.
+        """
+        texts = self._texts
+        while texts:
+            yield texts.popleft()
+
+    def forms(self):
+        """
+        Iterate over the values of the complete forms that haven't been
+        returned yet. Forms that arrive while iterating are included.
+        """
+        for text in self.texts():
+            for value in parse_all(text, **self._kwargs):
+                yield value
+
+
+def iter_load(fileobj, chunk_size=DEFAULT_CHUNK_SIZE, input_encoding='utf-8',
+              **kwargs):
+    """
+    Iterate over the top-level values of an EDN file-like object.
+
+    ``fileobj`` is read by chunks of ``chunk_size`` bytes or characters. Each
+    value is yielded as soon as the text of its form has been read, so the
+    memory used is bounded by the size of the largest form rather than the size
+    of the file. Binary files are decoded with ``input_encoding``; forms and
+    multi-byte characters can span several chunks.
+
+    Other keyword arguments are passed to ``parse_all``.
+    """
+    parser = IncrementalParser(input_encoding, **kwargs)
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        for value in parser.forms():
+            yield value
+    parser.close()
+    for value in parser.forms():
+        yield value
+
+
+def map_file(fileobj):
+    """
+    Return a read-only memory map of the binary file object ``fileobj``, or
+    empty bytes if the file is empty (which can't be mapped).
+    """
+    if os.fstat(fileobj.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_path(path, **kwargs):
+    """
+    Return the list of the top-level values of the EDN file ``path``.
+
+    The file is mapped in memory rather than read, and with the fast engine
+    (the default here) only the text of its tokens is decoded, so the memory
+    used is about the one of the values. Keyword arguments are passed to
+    ``parse_all``.
+    """
+    kwargs.setdefault('engine', 'fast')
+    with open(path, 'rb') as f:
+        data = map_file(f)
+        try:
+            return parse_all(data, **kwargs)
+        finally:
+            if data:
+                data.close()
@@ -7,11 +7,25 @@ except ImportError:
     import collections as collections_abc
 
 
+def hash_unordered(items):
+    """
+    Return a hash of the hashable ``items`` that doesn't depend on their order,
+    without building a frozenset of them.
+    """
+    return hash(sum(map(hash, items)))
+
+
 class ImmutableDict(collections_abc.Mapping):
-    def __init__(self, somedict):
-        self.dict = dict(somedict)   # make a copy
+    __slots__ = ('dict', 'hash')
+
+    def __init__(self, somedict, copy=True):
+        """Returns an immutable version of the given dict. Optionally creates a shallow copy."""
+        self.dict = dict(somedict) if copy else somedict
         self.hash = None
 
+    def __reduce__(self):
+        return ImmutableDict, (self.dict, False)
+
     def __getitem__(self, key):
         return self.dict[key]
 
@@ -24,9 +38,27 @@ class ImmutableDict(collections_abc.Mapping):
     def __iter__(self):
         return iter(self.dict)
 
+    # The methods below are provided by collections_abc.Mapping, but going
+    # through __getitem__ is much slower than calling the ones of the dict.
+
+    def __contains__(self, key):
+        return key in self.dict
+
+    def get(self, key, default=None):
+        return self.dict.get(key, default)
+
+    def keys(self):
+        return self.dict.keys()
+
+    def items(self):
+        return self.dict.items()
+
+    def values(self):
+        return self.dict.values()
+
     def __hash__(self):
         if self.hash is None:
-            self.hash = hash(frozenset(self.dict.items()))
+            self.hash = hash_unordered(self.dict.items())
         return self.hash
 
     def __eq__(self, other):
@@ -5,50 +5,101 @@ try:
     import collections.abc as collections_abc
 except ImportError:
     import collections as collections_abc
-import copy as _copy
 
 
 class ImmutableList(collections_abc.Sequence, collections_abc.Hashable):
+    __slots__ = ('_items', '_hash')
+
     def __init__(self, wrapped_list, copy=True):
-        """Returns an immutable version of the given list. Optionally creates a shallow copy."""
-        self._list = list(wrapped_list) if copy else wrapped_list
+        """
+        Returns an immutable version of the given list.
+
+        The items are stored in a tuple, so a tuple is used as is and anything
+        else is copied once. If ``copy`` is False, the given sequence is used
+        as is instead, and must not be modified afterwards.
+        """
+        self._items = tuple(wrapped_list) if copy else wrapped_list
         self._hash = None
 
+    def _tuple(self):
+        # the items of copy=False are converted once, on the first call
+        items = self._items
+        if type(items) is not tuple:
+            items = self._items = tuple(items)
+        return items
+
+    def __reduce__(self):
+        return ImmutableList, (self._tuple(),)
+
     def __repr__(self):
-        return self._list.__repr__()
+        return list(self._items).__repr__()
 
     def __eq__(self, other):
         if isinstance(other, ImmutableList):
-            return self._list == other._list
-        else:
-            return self._list == other
+            items, other_items = self._items, other._items
+            if type(items) is not type(other_items):
+                items, other_items = self._tuple(), other._tuple()
+            return items == other_items
+        if isinstance(other, list):
+            items = self._items
+            if type(items) is list:
+                return items == other
+            # item by item rather than through a copy, with the identity check
+            # of list equality
+            return len(items) == len(other) and all(
+                item is other_item or item == other_item for item, other_item in zip(items, other))
+        return NotImplemented
 
-    def _call_wrapped_list_method(self, method, *args):
-        new_list = _copy.copy(self._list)
-        getattr(new_list, method)(*args)
-        return ImmutableList(new_list, copy=False)
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
 
     # collection.Sequence methods
     # https://docs.python.org/2/library/collections.html#collections-abstract-base-classes
 
     def __getitem__(self, index):
-        return self._list[index]
+        if isinstance(index, slice):
+            return list(self._items[index])
+        return self._items[index]
 
     def __len__(self):
-        return len(self._list)
+        return len(self._items)
+
+    # The methods below are provided by collections_abc.Sequence, but going
+    # through __getitem__ is much slower than calling the ones of the tuple.
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def __contains__(self, value):
+        return value in self._items
+
+    def index(self, *args):
+        return self._items.index(*args)
+
+    def count(self, value):
+        return self._items.count(value)
 
     # collection.Hashable methods
     # https://docs.python.org/2/library/collections.html#collections-abstract-base-classes
 
     def __hash__(self):
         if self._hash is None:
-            self._hash = hash(tuple(self._list))
+            self._hash = hash(self._tuple())
         return self._hash
 
     # Other list methods https://docs.python.org/2/tutorial/datastructures.html#more-on-lists
+    # They return a new list rather than modifying this one.
+
+    def append(self, value):
+        return ImmutableList(self._tuple() + (value,))
 
-    def insert(self, *args):
-        return self._call_wrapped_list_method("insert", *args)
+    def insert(self, index, value):
+        items = self._tuple()
+        return ImmutableList(items[:index] + (value,) + items[index:])
 
-    def sort(self, *args):
-        return self._call_wrapped_list_method("sort", *args)
+    def sort(self, key=None, reverse=False):
+        return ImmutableList(sorted(self._items, key=key, reverse=reverse))
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Random access to the top-level forms of large EDN files.
+
+``build(path)`` scans a file once, without building any value, and writes the
+offsets of its top-level forms to a sidecar index file (``path + ".idx"``).
+An ``EdnIndex`` then reads form number N by mapping the file in memory and
+parsing the text of that form alone.
+
+    python -m edn_format.index path [path ...]
+
+builds the index of each file.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import array
+import bisect
+import os
+import sys
+
+from .edn_parse import parse_all
+from .edn_scan import FormScanner
+from .edn_stream import map_file
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+INDEX_SUFFIX = '.idx'
+
+_MAGIC = b'EDNIDX1\n'
+
+try:
+    array.array('Q')
+    _TYPECODE = 'Q'
+except ValueError:  # Python 2
+    _TYPECODE = 'L'
+
+
+def _offsets_to_bytes(offsets):
+    # offsets are stored as little-endian 64-bit integers
+    if sys.byteorder == 'big':
+        offsets = array.array(_TYPECODE, offsets)
+        offsets.byteswap()
+    if hasattr(offsets, 'tobytes'):
+        return offsets.tobytes()
+    return offsets.tostring()
+
+
+def _offsets_from_bytes(data):
+    offsets = array.array(_TYPECODE)
+    if hasattr(offsets, 'frombytes'):
+        offsets.frombytes(data)
+    else:
+        offsets.fromstring(data)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+def scan_offsets(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Return an array of the start offsets of the complete top-level forms of
+    the UTF-8 EDN bytes ``data``, followed by the end offset of the last one.
+    Discarded forms (``#_ value``) are left out, and so is a symbol, keyword
+    or number at the very end of ``data``, which may be truncated.
+    """
+    # All the characters that matter to the scanner are ASCII, and the bytes of
+    # the other UTF-8 characters aren't, so scanning the bytes decoded as
+    # Latin-1 finds the same forms, with byte offsets.
+    scanner = FormScanner()
+    offsets = array.array(_TYPECODE)
+    end = 0
+    size = len(data)
+    for chunk_start in range(0, size + 1, chunk_size):
+        chunk = data[chunk_start:chunk_start + chunk_size].decode('latin-1')
+        # only the forms that the scanner sees terminated are complete
+        for start, end in scanner.scan(chunk):
+            if data[start:start + 2] != b'#_':
+                offsets.append(start)
+    offsets.append(end)
+    return offsets
+
+
+def build(path, index_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scan the EDN file ``path``, write the offsets of its top-level forms to
+    ``index_path`` (``path + ".idx"`` by default) and return an ``EdnIndex``
+    of the file.
+
+    Forms that are incomplete when the file is scanned (e.g. that are being
+    appended) are left out of the index, as well as a symbol, keyword or
+    number that isn't followed by anything, not even a newline.
+    """
+    if index_path is None:
+        index_path = path + INDEX_SUFFIX
+    with open(path, 'rb') as f:
+        data = map_file(f)
+        try:
+            offsets = scan_offsets(data, chunk_size)
+        finally:
+            if data:
+                data.close()
+
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(_offsets_to_bytes(offsets))
+    # replace the index at once, for the readers of the previous one
+    getattr(os, 'replace', os.rename)(tmp_path, index_path)
+    return EdnIndex(path, index_path)
+
+
+class EdnIndex(object):
+    """
+    Read the top-level forms of the EDN file ``path`` by number, from the
+    index written by ``build``.
+
+    ``index[i]`` or ``index.get(i)`` parses form number ``i`` (negative
+    numbers count from the end, and slices return lists). Other keyword
+    arguments are passed to ``parse_all``. Forms appended to the file after
+    the index was built aren't part of it until it's built again.
+    """
+
+    def __init__(self, path, index_path=None, **kwargs):
+        if index_path is None:
+            index_path = path + INDEX_SUFFIX
+        with open(index_path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("{} is not an EDN index".format(index_path))
+            self._offsets = _offsets_from_bytes(f.read())
+        self._file = open(path, 'rb')
+        self._data = map_file(self._file)
+        if self._offsets[-1] > len(self._data):
+            self.close()
+            raise ValueError("The index {} is out of date".format(index_path))
+        self.path = path
+        self._kwargs = kwargs
+
+    def close(self):
+        if self._data:
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def span(self, i):
+        """
+        Return the ``(start, end)`` byte offsets of form number ``i``. The end
+        is the start of the next form, so the span includes what separates
+        them (whitespace, comments and discarded forms).
+        """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("form index out of range")
+        return self._offsets[i], self._offsets[i + 1]
+
+    def get(self, i):
+        """
+        Parse and return form number ``i``.
+        """
+        start, end = self.span(i)
+        return parse_all(self._data[start:end], **self._kwargs)[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.get(j) for j in range(*i.indices(len(self)))]
+        return self.get(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get(i)
+
+    def between(self, start, end):
+        """
+        Return the list of the forms that start at byte offsets between
+        ``start`` (included) and ``end`` (excluded).
+        """
+        offsets = self._offsets
+        count = len(self)
+        first = bisect.bisect_left(offsets, start, 0, count)
+        last = bisect.bisect_left(offsets, end, first, count)
+        return self[first:last]
+
+
+def main(paths):
+    for path in paths:
+        index = build(path)
+        print("{}: {} forms".format(path, len(index)))
+        index.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import array
+
+try:
+    import collections.abc as collections_abc
+except ImportError:
+    import collections as collections_abc
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .immutable_list import ImmutableList
+
+from .compat import long
+
+# the ways numeric vectors can be stored
+NUMERIC_VECTORS = ('array', 'numpy')
+
+try:
+    array.array('q')
+    _INT_TYPECODE = 'q'
+except ValueError:  # Python 2
+    _INT_TYPECODE = 'l'
+
+
+class NumericVector(collections_abc.Sequence, collections_abc.Hashable):
+    """
+    A read-only vector of integers or of floats, stored in a compact buffer:
+    an ``array.array`` of 64-bit integers or floats, or a NumPy array.
+
+    Items are returned as Python numbers. It's equal to the ImmutableList of
+    the same numbers, and has the same hash.
+    """
+    __slots__ = ('_data', '_hash')
+
+    def __init__(self, data):
+        if numpy is not None and isinstance(data, numpy.ndarray):
+            # a view of its own, so that the array of the caller stays writable
+            data = data.view()
+            data.flags.writeable = False
+        self._data = data
+        self._hash = None
+
+    @property
+    def data(self):
+        """
+        The buffer of the numbers: a read-only NumPy array, or a read-only
+        memoryview of the ``array.array`` (of a copy of it before Python 3.8).
+        """
+        if isinstance(self._data, array.array):
+            view = memoryview(self._data)
+            if hasattr(view, 'toreadonly'):
+                return view.toreadonly()
+            # a view of bytes is read-only
+            return memoryview(self._data.tobytes()).cast(self._data.typecode)
+        return self._data
+
+    @property
+    def is_float(self):
+        """
+        Whether the numbers are floats rather than integers.
+        """
+        if isinstance(self._data, array.array):
+            return self._data.typecode == 'd'
+        return self._data.dtype.kind == 'f'
+
+    def tolist(self):
+        """
+        Return a list of the numbers.
+        """
+        return self._data.tolist()
+
+    def __reduce__(self):
+        return NumericVector, (self._data,)
+
+    def __repr__(self):
+        return self.tolist().__repr__()
+
+    def __eq__(self, other):
+        if isinstance(other, NumericVector):
+            return len(self) == len(other) and self.tolist() == other.tolist()
+        if isinstance(other, (ImmutableList, list)):
+            return len(self) == len(other) and self.tolist() == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return NumericVector(self._data[index])
+        value = self._data[index]
+        return value.item() if hasattr(value, 'item') else value
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self.tolist()))
+        return self._hash
+
+
+def _buffer(items, is_float, storage):
+    if storage == 'numpy':
+        return numpy.array(items, dtype=numpy.float64 if is_float else numpy.int64)
+    return array.array('d' if is_float else _INT_TYPECODE, items)
+
+
+def numeric_vectors(vector, storage):
+    """
+    Return a function that builds the vectors of a list of items: a
+    NumericVector with the given ``storage`` (one of ``NUMERIC_VECTORS``) if
+    they're all integers or all floats, or else ``vector(items)``.
+    """
+    if storage not in NUMERIC_VECTORS:
+        raise ValueError("Unknown numeric_vectors {!r}, expected one of {}".format(
+            storage, ", ".join(NUMERIC_VECTORS)))
+    if storage == 'numpy' and numpy is None:
+        raise ValueError("numeric_vectors='numpy' requires NumPy")
+
+    def build(items):
+        if items:
+            types = set(map(type, items))
+            if len(types) == 1:
+                item_type = types.pop()
+                if item_type is int or item_type is long or item_type is float:
+                    try:
+                        return NumericVector(_buffer(items, item_type is float, storage))
+                    except OverflowError:
+                        # integers that don't fit in 64 bits
+                        pass
+        return vector(items)
+
+    return build
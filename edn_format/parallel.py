@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Parsing of large EDN files, such as newline-delimited ones, and writing of
+newline-delimited EDN files, with a pool of processes.
+
+For parsing, the file is split in chunks of about ``chunk_bytes`` bytes, that
+end at the end of a top-level form, and each chunk is parsed by a worker
+process. The forms are found with ``edn_scan.FormScanner``, so they can span
+several lines.
+
+For writing, records are encoded by batches in the workers, and written in
+order.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import pickle
+
+from . import edn_dump, edn_parse
+from .edn_scan import FormScanner
+from .edn_stream import map_file
+
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_BATCH = 1000
+# the size of the pieces of the file that are scanned at once to split it
+_SCAN_BYTES = 1024 * 1024
+
+
+def _chunks(data, chunk_bytes):
+    # (start, end) offsets of the chunks of the UTF-8 EDN bytes ``data``, of at
+    # least ``chunk_bytes`` bytes but the last one, split at the end of a
+    # top-level form. As in index.scan_offsets, the bytes are scanned decoded
+    # as Latin-1, which gives byte offsets.
+    scanner = FormScanner()
+    size = len(data)
+    scan_bytes = min(chunk_bytes, _SCAN_BYTES)
+    start = 0
+    for scan_start in range(0, size, scan_bytes):
+        forms = scanner.scan(data[scan_start:scan_start + scan_bytes].decode('latin-1'))
+        if forms and forms[-1][1] - start >= chunk_bytes:
+            end = forms[-1][1]
+            yield start, end
+            start = end
+    if start < size:
+        # the rest, which may hold an incomplete form for the parser to report
+        yield start, size
+
+
+class _Unsent(object):
+    """
+    Stands in the workers for a handler that can't be pickled, and raises an
+    error when it's called.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+    def __call__(self, *args):
+        raise NotImplementedError(self.message)
+
+
+def _picklable(items, kind):
+    # The items of a dict of handlers to send to the workers, where the ones
+    # that can't be pickled are replaced by an _Unsent that the workers only
+    # use if they don't have the handler (forked workers inherit it). Items
+    # with a key that can't be pickled are left out.
+    picklable = {}
+    for key, handler in items:
+        try:
+            pickle.dumps(key)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            continue
+        try:
+            pickle.dumps(handler)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            handler = _Unsent(
+                u"The {} {!r} of {!r} can't be sent to the worker processes ({}); "
+                u"use a module-level function or class".format(kind, handler, key, e))
+        picklable[key] = handler
+    return picklable
+
+
+def _run_in_order(executor, fn, tasks, workers):
+    # Yield the results of fn(*task) for each task, in order, with at most
+    # two tasks per worker submitted ahead of the results that are consumed.
+    pending = collections.deque()
+    tasks = iter(tasks)
+
+    def submit():
+        task = next(tasks, None)
+        if task is not None:
+            pending.append(executor.submit(fn, *task))
+
+    try:
+        for _ in range(2 * workers):
+            submit()
+        while pending:
+            result = pending.popleft().result()
+            submit()
+            yield result
+    finally:
+        # when the iteration is stopped early
+        for future in pending:
+            future.cancel()
+
+
+def _load_chunk(path, start, end, tags, kwargs):
+    # runs in the workers
+    for tag, handler in tags.items():
+        if isinstance(handler, _Unsent):
+            edn_parse._serializers.setdefault(tag, handler)
+        else:
+            edn_parse._serializers[tag] = handler
+    with open(path, 'rb') as f:
+        data = map_file(f)
+        try:
+            return edn_parse.parse_all(data[start:end], **kwargs)
+        finally:
+            if data:
+                data.close()
+
+
+def iter_load_lines(path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                    **kwargs):
+    """
+    Iterate over the top-level values of the EDN file ``path`` (e.g. a
+    newline-delimited one), in order, parsing its chunks in ``workers``
+    processes (by default, one per CPU).
+
+    At most two chunks per worker are parsed ahead of the values that are
+    consumed. Each worker caches its own parser, as ``parse_all`` does. The
+    handlers of the tags registered with ``add_tag`` are sent to the workers
+    if they're picklable (e.g. module-level functions or classes); the other
+    ones are only available where workers are forked (on Linux), and reading
+    their tags elsewhere raises a NotImplementedError that says so. Other
+    keyword arguments are passed to ``parse_all``; the engine defaults to
+    ``'fast'``.
+
+    The file is split in chunks while the workers parse the previous ones.
+    """
+    kwargs.setdefault('engine', 'fast')
+    workers = workers or os.cpu_count() or 1
+    tags = _picklable(edn_parse._serializers.items(), 'tag handler')
+
+    with open(path, 'rb') as f:
+        data = map_file(f)
+        try:
+            tasks = ((path, start, end, tags, kwargs) for start, end in _chunks(data, chunk_bytes))
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                for values in _run_in_order(executor, _load_chunk, tasks, workers):
+                    for value in values:
+                        yield value
+        finally:
+            if data:
+                data.close()
+
+
+def load_lines(path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES, **kwargs):
+    """
+    Return the list of the top-level values of the EDN file ``path``,
+    parsing its chunks in ``workers`` processes.
+
+    See ``iter_load_lines`` for the accepted arguments.
+    """
+    return list(iter_load_lines(path, workers, chunk_bytes, **kwargs))
+
+
+def _registered_encoders():
+    # the encoders registered with ``register_encoder``: the workers have the
+    # default ones, and find the ones of the subclasses themselves
+    defaults = edn_dump._default_encoders
+    with edn_dump._resolve_lock:
+        return [(cls, encoder) for cls, encoder in edn_dump._encoders.items()
+                if cls not in edn_dump._resolved and defaults.get(cls) is not encoder]
+
+
+def _dump_batch(records, encoders, kwargs):
+    # runs in the workers
+    for cls, encoder in encoders.items():
+        if isinstance(encoder, _Unsent):
+            # unless the encoder was inherited by forking
+            if edn_dump._encoders.get(cls) is edn_dump._default_encoders.get(cls):
+                edn_dump.register_encoder(cls, encoder)
+        # unpickled bound methods are new objects, but equal
+        elif edn_dump._encoders.get(cls) != encoder:
+            edn_dump.register_encoder(cls, encoder)
+    encode = edn_dump._get_encoder(dict(kwargs)).encode
+    return ''.join([encode(record) + '\n' for record in records])
+
+
+def dump_lines(iterable, fp, workers=None, batch=DEFAULT_BATCH, **kwargs):
+    """
+    Write the EDN representation of each item of ``iterable`` to the file-like
+    object ``fp``, one per line, encoding batches of ``batch`` items in
+    ``workers`` processes (by default, one per CPU).
+
+    The items are written in order. At most two batches per worker are read
+    from ``iterable`` ahead of the ones that are written. The encoders
+    registered with ``register_encoder`` are sent to the workers if they're
+    picklable; as for the tag handlers of ``iter_load_lines``, the other ones
+    are only available where workers are forked. Other keyword arguments are
+    the options of ``Encoder``; note that with ``indent``, items span several
+    lines.
+    """
+    workers = workers or os.cpu_count() or 1
+    encoders = _picklable(_registered_encoders(), 'encoder')
+    output_encoding = kwargs.get('output_encoding', edn_dump.DEFAULT_OUTPUT_ENCODING)
+    binary = edn_dump._is_binary(fp)
+
+    items = iter(iterable)
+    batches = iter(lambda: list(itertools.islice(items, batch)), [])
+    tasks = ((records, encoders, kwargs) for records in batches)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for text in _run_in_order(executor, _dump_batch, tasks, workers):
+            fp.write(text.encode(output_encoding) if binary else text)
@@ -0,0 +1,596 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# Persistent collections: "modifying" one returns a new collection that shares
+# most of its structure with the original, which is left unchanged.
+#
+# PersistentMap (and PersistentSet on top of it) is a hash array mapped trie;
+# PersistentVector is a 32-way trie with a tail, as in Clojure. Updates copy a
+# path of O(log32 n) nodes of at most 32 entries.
+
+import itertools
+
+try:
+    import collections.abc as collections_abc
+except ImportError:
+    import collections as collections_abc
+
+from .immutable_dict import hash_unordered
+from .immutable_list import ImmutableList
+
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# marks a sub-node in place of a key in a _BitmapNode
+_NODE = object()
+_NOT_FOUND = object()
+
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+
+def _popcount(n):
+    return bin(n).count('1')
+
+
+class _BitmapNode(object):
+    """
+    A trie node of up to 32 entries, one for each 5-bit slice of the hashes of
+    the keys at its level. ``array`` holds a key and its value, or _NODE and a
+    sub-node, for each bit set in ``bitmap``.
+    """
+    __slots__ = ('bitmap', 'array')
+
+    def __init__(self, bitmap, array):
+        self.bitmap = bitmap
+        self.array = array
+
+
+class _CollisionNode(object):
+    """A node of the (key, value) ``pairs`` of keys that have the same hash."""
+    __slots__ = ('hash', 'pairs')
+
+    def __init__(self, hash, pairs):
+        self.hash = hash
+        self.pairs = pairs
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
+
+
+def _find(node, shift, h, key):
+    while True:
+        if node.__class__ is _CollisionNode:
+            if node.hash == h:
+                for k, v in node.pairs:
+                    if k is key or k == key:
+                        return v
+            return _NOT_FOUND
+
+        bit = 1 << ((h >> shift) & _MASK)
+        bitmap = node.bitmap
+        if not bitmap & bit:
+            return _NOT_FOUND
+        i = 2 * _popcount(bitmap & (bit - 1))
+        k = node.array[i]
+        if k is _NODE:
+            node = node.array[i + 1]
+            shift += _BITS
+        elif k is key or k == key:
+            return node.array[i + 1]
+        else:
+            return _NOT_FOUND
+
+
+def _pair_node(shift, h1, k1, v1, h2, k2, v2):
+    """Return a node of two different keys."""
+    if h1 == h2:
+        return _CollisionNode(h1, ((k1, v1), (k2, v2)))
+    i1 = (h1 >> shift) & _MASK
+    i2 = (h2 >> shift) & _MASK
+    if i1 == i2:
+        return _BitmapNode(1 << i1, (_NODE, _pair_node(shift + _BITS, h1, k1, v1, h2, k2, v2)))
+    if i1 > i2:
+        k1, v1, k2, v2 = k2, v2, k1, v1
+    return _BitmapNode((1 << i1) | (1 << i2), (k1, v1, k2, v2))
+
+
+def _assoc(node, shift, h, key, value):
+    """
+    Return a node with ``key`` mapped to ``value``, and whether the key was
+    added. ``node`` itself is returned if it already has this mapping.
+    """
+    if node.__class__ is _CollisionNode:
+        if node.hash == h:
+            pairs = node.pairs
+            for i, (k, v) in enumerate(pairs):
+                if k is key or k == key:
+                    if v is value:
+                        return node, False
+                    return _CollisionNode(h, pairs[:i] + ((key, value),) + pairs[i + 1:]), False
+            return _CollisionNode(h, pairs + ((key, value),)), True
+        # nest the collision node in a bitmap node to tell the hashes apart
+        node = _BitmapNode(1 << ((node.hash >> shift) & _MASK), (_NODE, node))
+
+    bit = 1 << ((h >> shift) & _MASK)
+    bitmap = node.bitmap
+    array = node.array
+    i = 2 * _popcount(bitmap & (bit - 1))
+    if not bitmap & bit:
+        return _BitmapNode(bitmap | bit, array[:i] + (key, value) + array[i:]), True
+
+    k = array[i]
+    v = array[i + 1]
+    if k is _NODE:
+        child, added = _assoc(v, shift + _BITS, h, key, value)
+        if child is v:
+            return node, False
+        return _BitmapNode(bitmap, array[:i + 1] + (child,) + array[i + 2:]), added
+    if k is key or k == key:
+        if v is value:
+            return node, False
+        return _BitmapNode(bitmap, array[:i + 1] + (value,) + array[i + 2:]), False
+    child = _pair_node(shift + _BITS, _hash(k), k, v, h, key, value)
+    return _BitmapNode(bitmap, array[:i] + (_NODE, child) + array[i + 2:]), True
+
+
+def _without(node, shift, h, key):
+    """
+    Return a node without ``key``, or None if it'd be empty. ``node`` itself
+    is returned if it doesn't have the key.
+    """
+    if node.__class__ is _CollisionNode:
+        if node.hash != h:
+            return node
+        pairs = tuple(pair for pair in node.pairs
+                      if not (pair[0] is key or pair[0] == key))
+        if len(pairs) == len(node.pairs):
+            return node
+        return _CollisionNode(h, pairs) if pairs else None
+
+    bit = 1 << ((h >> shift) & _MASK)
+    bitmap = node.bitmap
+    if not bitmap & bit:
+        return node
+    array = node.array
+    i = 2 * _popcount(bitmap & (bit - 1))
+    k = array[i]
+    if k is _NODE:
+        child = _without(array[i + 1], shift + _BITS, h, key)
+        if child is array[i + 1]:
+            return node
+        if child is not None:
+            return _BitmapNode(bitmap, array[:i + 1] + (child,) + array[i + 2:])
+    elif not (k is key or k == key):
+        return node
+    if bitmap == bit:
+        return None
+    return _BitmapNode(bitmap ^ bit, array[:i] + array[i + 2:])
+
+
+def _build(entries, shift):
+    """
+    Return a node of ``entries``, a list of at least two (hash, key, value)
+    tuples of different keys whose hashes are equal below ``shift``.
+    """
+    if shift >= _HASH_BITS:
+        return _CollisionNode(entries[0][0], tuple((k, v) for _, k, v in entries))
+
+    buckets = {}
+    for entry in entries:
+        index = (entry[0] >> shift) & _MASK
+        if index in buckets:
+            buckets[index].append(entry)
+        else:
+            buckets[index] = [entry]
+
+    bitmap = 0
+    array = []
+    for index in sorted(buckets):
+        bitmap |= 1 << index
+        bucket = buckets[index]
+        if len(bucket) == 1:
+            array.append(bucket[0][1])
+            array.append(bucket[0][2])
+        else:
+            array.append(_NODE)
+            array.append(_build(bucket, shift + _BITS))
+    return _BitmapNode(bitmap, tuple(array))
+
+
+def _iter_items(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is _CollisionNode:
+            for pair in node.pairs:
+                yield pair
+            continue
+        array = node.array
+        for i in range(0, len(array), 2):
+            if array[i] is _NODE:
+                stack.append(array[i + 1])
+            else:
+                yield array[i], array[i + 1]
+
+
+def _update_in(coll, keys, fn, args):
+    key = keys[0]
+    value = coll.get(key)
+    if len(keys) == 1:
+        value = fn(value, *args)
+    else:
+        if value is None:
+            value = _EMPTY_MAP
+        value = _update_in(value, keys[1:], fn, args)
+    return coll.assoc(key, value)
+
+
+class _ItemsView(collections_abc.ItemsView):
+    __slots__ = ()
+
+    def __iter__(self):
+        return _iter_items(self._mapping._root)
+
+
+class _ValuesView(collections_abc.ValuesView):
+    __slots__ = ()
+
+    def __iter__(self):
+        for _, value in _iter_items(self._mapping._root):
+            yield value
+
+
+class PersistentMap(collections_abc.Mapping):
+    """
+    An immutable mapping, with ``assoc``, ``dissoc`` and ``update_in`` methods
+    that return an updated copy of it in O(log32 n) time, sharing most of its
+    structure.
+
+    It's equal to, and has the same hash as, an ``ImmutableDict`` of the same
+    items.
+    """
+    __slots__ = ('_root', '_count', '_hash')
+
+    def __init__(self, items=()):
+        """
+        Return a persistent map of ``items``, a mapping or an iterable of
+        (key, value) pairs.
+        """
+        if not isinstance(items, dict):
+            items = dict(items)
+        if len(items) == 0:
+            root = _EMPTY_NODE
+        elif len(items) == 1:
+            (key, value), = items.items()
+            root = _BitmapNode(1 << (_hash(key) & _MASK), (key, value))
+        else:
+            root = _build([(_hash(k), k, v) for k, v in items.items()], 0)
+        self._root = root
+        self._count = len(items)
+        self._hash = None
+
+    @classmethod
+    def _make(cls, root, count):
+        self = cls.__new__(cls)
+        self._root = root
+        self._count = count
+        self._hash = None
+        return self
+
+    def __reduce__(self):
+        return PersistentMap, (dict(self.items()),)
+
+    def __getitem__(self, key):
+        value = _find(self._root, 0, _hash(key), key)
+        if value is _NOT_FOUND:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = _find(self._root, 0, _hash(key), key)
+        return default if value is _NOT_FOUND else value
+
+    def __contains__(self, key):
+        return _find(self._root, 0, _hash(key), key) is not _NOT_FOUND
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for key, _ in _iter_items(self._root):
+            yield key
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    def assoc(self, key, value):
+        """Return a copy of this map with ``key`` mapped to ``value``."""
+        root, added = _assoc(self._root, 0, _hash(key), key, value)
+        if root is self._root:
+            return self
+        return self._make(root, self._count + 1 if added else self._count)
+
+    def dissoc(self, key):
+        """Return a copy of this map without ``key``."""
+        root = _without(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        return self._make(root or _EMPTY_NODE, self._count - 1)
+
+    def update_in(self, keys, fn, *args):
+        """
+        Return a copy of this map where the value at the path ``keys`` of
+        nested maps (or vectors) is replaced by ``fn(value, *args)``. Missing
+        maps are created, and missing values are None.
+        """
+        return _update_in(self, tuple(keys), fn, args)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash_unordered(self.items())
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, collections_abc.Mapping):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        for key, value in _iter_items(self._root):
+            other_value = other.get(key, _NOT_FOUND)
+            if not (other_value is value or other_value == value):
+                return False
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, dict(self.items()))
+
+
+_EMPTY_MAP = PersistentMap()
+
+
+class PersistentSet(collections_abc.Set, collections_abc.Hashable):
+    """
+    An immutable set, with ``conj`` and ``disj`` methods that return an updated
+    copy of it in O(log32 n) time, sharing most of its structure.
+
+    It's equal to, and has the same hash as, a frozenset of the same items.
+    """
+    __slots__ = ('_map', '_hash_value')
+
+    def __init__(self, items=()):
+        self._map = PersistentMap((item, item) for item in items)
+        self._hash_value = None
+
+    @classmethod
+    def _make(cls, map_):
+        self = cls.__new__(cls)
+        self._map = map_
+        self._hash_value = None
+        return self
+
+    @classmethod
+    def _from_iterable(cls, items):
+        return cls(items)
+
+    def __reduce__(self):
+        return PersistentSet, (list(self),)
+
+    def __contains__(self, item):
+        return item in self._map
+
+    def __len__(self):
+        return len(self._map)
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def conj(self, item):
+        """Return a copy of this set with ``item`` added."""
+        map_ = self._map.assoc(item, item)
+        return self if map_ is self._map else self._make(map_)
+
+    def disj(self, item):
+        """Return a copy of this set without ``item``."""
+        map_ = self._map.dissoc(item)
+        return self if map_ is self._map else self._make(map_)
+
+    def __hash__(self):
+        # the same hash as a frozenset of the same items, which Set._hash
+        # doesn't give on all versions of Python
+        if self._hash_value is None:
+            self._hash_value = hash(frozenset(self))
+        return self._hash_value
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, set(self))
+
+
+def _new_path(level, node):
+    while level > 0:
+        node = (node,)
+        level -= _BITS
+    return node
+
+
+class PersistentVector(collections_abc.Sequence, collections_abc.Hashable):
+    """
+    An immutable sequence, with ``conj``, ``assoc`` and ``update_in`` methods
+    that return an updated copy of it in O(log32 n) time, sharing most of its
+    structure.
+
+    It's equal to, and has the same hash as, an ``ImmutableList`` of the same
+    items.
+    """
+    __slots__ = ('_count', '_shift', '_root', '_tail', '_hash')
+
+    def __init__(self, items=()):
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+        count = len(items)
+        tail_offset = ((count - 1) >> _BITS) << _BITS if count else 0
+        nodes = [tuple(items[i:i + _WIDTH]) for i in range(0, tail_offset, _WIDTH)]
+        shift = _BITS
+        while len(nodes) > _WIDTH:
+            nodes = [tuple(nodes[i:i + _WIDTH]) for i in range(0, len(nodes), _WIDTH)]
+            shift += _BITS
+        self._count = count
+        self._shift = shift
+        self._root = tuple(nodes)
+        self._tail = tuple(items[tail_offset:])
+        self._hash = None
+
+    @classmethod
+    def _make(cls, count, shift, root, tail):
+        self = cls.__new__(cls)
+        self._count = count
+        self._shift = shift
+        self._root = root
+        self._tail = tail
+        self._hash = None
+        return self
+
+    def __reduce__(self):
+        return PersistentVector, (tuple(self),)
+
+    def _tail_offset(self):
+        return self._count - len(self._tail)
+
+    def _leaf(self, index):
+        """Return the tuple of up to 32 items where the item at ``index`` is."""
+        if index >= self._count - len(self._tail):
+            return self._tail
+        node = self._root
+        level = self._shift
+        while level > 0:
+            node = node[(index >> level) & _MASK]
+            level -= _BITS
+        return node
+
+    def _leaves(self):
+        for start in range(0, self._tail_offset(), _WIDTH):
+            yield self._leaf(start)
+        yield self._tail
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PersistentVector(tuple(self)[index])
+        count = self._count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('vector index out of range')
+        return self._leaf(index)[index & _MASK]
+
+    def get(self, index, default=None):
+        """Return the item at ``index``, or ``default`` if there's none."""
+        if isinstance(index, int) and 0 <= index < self._count:
+            return self._leaf(index)[index & _MASK]
+        return default
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._leaves())
+
+    def conj(self, item):
+        """Return a copy of this vector with ``item`` added at the end."""
+        count = self._count
+        tail = self._tail
+        if len(tail) < _WIDTH:
+            return self._make(count + 1, self._shift, self._root, tail + (item,))
+
+        # the tail is full: push it into the tree
+        shift = self._shift
+        if (count >> _BITS) > (1 << shift):
+            root = (self._root, _new_path(shift, tail))
+            shift += _BITS
+        else:
+            root = self._push_tail(shift, self._root, tail)
+        return self._make(count + 1, shift, root, (item,))
+
+    def _push_tail(self, level, parent, tail):
+        index = ((self._count - 1) >> level) & _MASK
+        if level == _BITS:
+            child = tail
+        elif index < len(parent):
+            child = self._push_tail(level - _BITS, parent[index], tail)
+        else:
+            child = _new_path(level - _BITS, tail)
+        return parent[:index] + (child,) + parent[index + 1:]
+
+    def assoc(self, index, item):
+        """
+        Return a copy of this vector with the item at ``index`` replaced by
+        ``item``. ``index`` may be the length of the vector, to add an item.
+        """
+        count = self._count
+        if index == count:
+            return self.conj(item)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('vector index out of range')
+
+        if index >= self._tail_offset():
+            i = index & _MASK
+            tail = self._tail[:i] + (item,) + self._tail[i + 1:]
+            return self._make(count, self._shift, self._root, tail)
+        return self._make(count, self._shift,
+                          self._assoc_in_tree(self._shift, self._root, index, item),
+                          self._tail)
+
+    def _assoc_in_tree(self, level, node, index, item):
+        i = (index >> level) & _MASK
+        if level == 0:
+            child = item
+        else:
+            child = self._assoc_in_tree(level - _BITS, node[i], index, item)
+        return node[:i] + (child,) + node[i + 1:]
+
+    def update_in(self, keys, fn, *args):
+        """
+        Return a copy of this vector where the value at the path ``keys`` of
+        nested vectors (or maps) is replaced by ``fn(value, *args)``.
+        """
+        return _update_in(self, tuple(keys), fn, args)
+
+    def __hash__(self):
+        # same as the hash of an ImmutableList of the same items
+        if self._hash is None:
+            self._hash = hash(tuple(self))
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, (PersistentVector, ImmutableList, list)):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        for a, b in zip(self, other):
+            if not (a is b or a == b):
+                return False
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, list(self))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# Parsing and generation of the RFC 3339 timestamps of #inst elements.
+#
+# Timestamps are usually in the canonical form that ``dumps`` writes, so they
+# are parsed with ``datetime.fromisoformat`` when it accepts all of RFC 3339
+# (Python 3.11 and later), or else with a regular expression. Anything that
+# isn't an RFC 3339 timestamp is left to pyrfc3339, as before.
+
+import datetime
+import re
+import sys
+
+import pyrfc3339
+
+try:
+    from functools import lru_cache
+except ImportError:  # Python 2
+    def lru_cache(maxsize):
+        return lambda fn: fn
+
+if hasattr(datetime, 'timezone'):
+    UTC = datetime.timezone.utc
+
+    def _fixed_offset(minutes):
+        return datetime.timezone(datetime.timedelta(minutes=minutes))
+else:  # Python 2
+    import pytz
+
+    UTC = pytz.utc
+    _fixed_offset = pytz.FixedOffset
+
+if sys.version_info >= (3, 11):
+    _fromisoformat = datetime.datetime.fromisoformat
+else:
+    # Older versions don't accept "Z" nor fractions of other than 3 or 6 digits
+    _fromisoformat = None
+
+# date.fromisoformat only accepts YYYY-MM-DD before Python 3.11, and other
+# ISO 8601 dates of 10 characters don't have hyphens at the same positions
+_date_fromisoformat = getattr(datetime.date, 'fromisoformat', None)
+
+_DATETIME_RE = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)[Tt ](\d\d):(\d\d):(\d\d)(?:\.(\d+))?'
+    r'(?:[Zz]|([+-]\d\d:\d\d))\Z')
+
+_DATETIME_FORMAT = '%04d-%02d-%02dT%02d:%02d:%02d.%06dZ'
+
+
+@lru_cache(maxsize=64)
+def _tzinfo(offset):
+    """
+    Return the tzinfo of the UTC offset ``offset`` (e.g. ``"+05:30"``), so that
+    the datetimes built from the regular expression share a few tzinfo objects.
+    """
+    minutes = int(offset[1:3]) * 60 + int(offset[4:6])
+    if not minutes:
+        return UTC
+    return _fixed_offset(minutes if offset[0] == '+' else -minutes)
+
+
+def _is_date(text, length):
+    return text[:4].isdigit() and (
+        length == 4 or text[4] == '-' and text[5:7].isdigit() and (
+            length == 7 or text[7] == '-' and text[8:10].isdigit()))
+
+
+def parse_inst(text):
+    """
+    Return the date (for ``YYYY``, ``YYYY-MM`` and ``YYYY-MM-DD``) or the
+    datetime of the #inst element ``text``.
+    """
+    length = len(text)
+    if length == 10 and _date_fromisoformat is not None and text[4] == '-' and text[7] == '-':
+        return _date_fromisoformat(text)
+    if length in (4, 7, 10) and _is_date(text, length):
+        return datetime.date(int(text[:4]),
+                             int(text[5:7]) if length > 4 else 1,
+                             int(text[8:10]) if length > 7 else 1)
+    return parse_datetime(text)
+
+
+def parse_datetime(text):
+    """
+    Return the timezone-aware datetime of the RFC 3339 timestamp ``text``.
+    Digits of the fraction of seconds beyond microseconds are ignored.
+    """
+    if (_fromisoformat is not None and len(text) >= 20 and text[4] == '-' and text[7] == '-'
+            and text[10] == 'T' and text[13] == ':' and text[16] == ':' and text[19] in '.Z+-'
+            and (text[-1] == 'Z' or text[-3] == ':' and text[-6] in '+-')):
+        # The tzinfo isn't replaced with the one of _tzinfo, as replace() takes
+        # several times longer than fromisoformat itself
+        try:
+            return _fromisoformat(text)
+        except ValueError:
+            pass
+
+    match = _DATETIME_RE.match(text)
+    if match is None:
+        return pyrfc3339.parse(text)
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    return datetime.datetime(int(year), int(month), int(day),
+                             int(hour), int(minute), int(second),
+                             int(fraction[:6].ljust(6, '0')) if fraction else 0,
+                             UTC if offset is None else _tzinfo(offset))
+
+
+def format_datetime(value):
+    """
+    Return the RFC 3339 timestamp of the timezone-aware datetime ``value``, in
+    UTC and with microseconds, e.g. ``"2012-12-22T19:40:18.000000Z"``.
+    """
+    if value.tzinfo is not UTC:
+        offset = value.utcoffset()
+        if offset is None:
+            raise ValueError("Can't encode naive datetime {!r}".format(value))
+        if offset:
+            value -= offset
+    return _DATETIME_FORMAT % (value.year, value.month, value.day,
+                               value.hour, value.minute, value.second,
+                               value.microsecond)
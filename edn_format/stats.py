@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import copy
+import threading
+import time
+
+clock = getattr(time, 'perf_counter', time.time)
+
+# the started Stats; parsing and dumping only check that it's not empty when
+# no Stats is started
+_started = []
+_lock = threading.Lock()
+
+
+class Stats(object):
+    """
+    Counters of the work done by ``loads``, ``loads_all`` and ``dumps`` (and
+    the functions built on them) in this process, in all threads, while the
+    Stats is started:
+
+        with Stats() as stats:
+            loads(text)
+        stats.as_dict()
+
+    ``times`` maps phases to their wall time in seconds:
+
+    - ``'parse'``: the whole calls to ``loads``/``loads_all``;
+    - ``'build'``: getting the PLY lexer and parser, which are built on the
+      first call only;
+    - ``'decode'``: decoding bytes input;
+    - ``'lex'``: lexing, with the PLY engine;
+    - ``'reduce'``: the grammar rules, with the PLY engine, including the tag
+      handlers they call;
+    - ``'read'``: the fast and lazy readers, including the tag handlers;
+    - ``'tags'``: the tag handlers;
+    - ``'dump'``: the whole calls to ``dumps``, ``dump_to`` and
+      ``Encoder.encode``/``Encoder.dump``.
+
+    ``tokens`` counts the tokens by type and ``reductions`` the reductions by
+    grammar rule, with the PLY engine. ``tag_calls`` and ``tag_times`` count
+    the calls and the time of the handler of each tag (not of the items of
+    lazy collections, which are read after the call). ``calls`` counts the
+    ``'parse'`` and ``'dump'`` calls, ``bytes_read`` the length of bytes
+    input, ``chars_read`` the length of string input and ``chars_written``
+    the length of the output.
+
+    When no Stats is started, parsing and dumping only pay for checking it.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Set all the counters to zero.
+        """
+        with _lock:
+            self.calls = collections.Counter()
+            self.times = collections.Counter()
+            self.tokens = collections.Counter()
+            self.reductions = collections.Counter()
+            self.tag_calls = collections.Counter()
+            self.tag_times = collections.Counter()
+            self.bytes_read = 0
+            self.chars_read = 0
+            self.chars_written = 0
+
+    def start(self):
+        """
+        Start recording. Several Stats can be started at the same time.
+        """
+        with _lock:
+            if self not in _started:
+                _started.append(self)
+
+    def stop(self):
+        """
+        Stop recording; the counters keep their values.
+        """
+        with _lock:
+            if self in _started:
+                _started.remove(self)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _add(self, other):
+        self.calls.update(other.calls)
+        self.times.update(other.times)
+        self.tokens.update(other.tokens)
+        self.reductions.update(other.reductions)
+        self.tag_calls.update(other.tag_calls)
+        self.tag_times.update(other.tag_times)
+        self.bytes_read += other.bytes_read
+        self.chars_read += other.chars_read
+        self.chars_written += other.chars_written
+
+    def as_dict(self):
+        """
+        Return the counters as a dict of numbers and of dicts of numbers, which
+        can be serialized to JSON.
+        """
+        with _lock:
+            return {
+                'calls': dict(self.calls),
+                'times': dict(self.times),
+                'tokens': dict(self.tokens),
+                'reductions': dict(self.reductions),
+                'tag_calls': dict(self.tag_calls),
+                'tag_times': dict(self.tag_times),
+                'bytes_read': self.bytes_read,
+                'chars_read': self.chars_read,
+                'chars_written': self.chars_written,
+            }
+
+    def __repr__(self):
+        return 'Stats({!r})'.format(self.as_dict())
+
+
+def recorder():
+    """
+    Return a new Stats to record a call in if a Stats is started, else None.
+    """
+    return Stats() if _started else None
+
+
+def publish(record):
+    """
+    Add the counters of ``record`` to the started Stats.
+    """
+    with _lock:
+        for stats in _started:
+            stats._add(record)
+
+
+def timed(record, phase, fn, *args):
+    """
+    Return ``fn(*args)``, adding its time to ``phase`` in ``record`` if it's
+    not None.
+    """
+    if record is None:
+        return fn(*args)
+    start = clock()
+    try:
+        return fn(*args)
+    finally:
+        record.times[phase] += clock() - start
+
+
+def timed_tags(record, tagged_element):
+    """
+    Wrap the ``tagged_element(tag, element)`` function to record the time of
+    each tag.
+    """
+    def timed_tagged_element(tag, element):
+        start = clock()
+        try:
+            return tagged_element(tag, element)
+        finally:
+            elapsed = clock() - start
+            record.times['tags'] += elapsed
+            record.tag_times[tag] += elapsed
+            record.tag_calls[tag] += 1
+    return timed_tagged_element
+
+
+def count_tokens(record, lexer):
+    """
+    Make the PLY ``lexer`` record the time of lexing and the type of each
+    token.
+    """
+    token = lexer.token
+
+    def counted_token():
+        start = clock()
+        tok = token()
+        record.times['lex'] += clock() - start
+        if tok is not None:
+            record.tokens[tok.type] += 1
+        return tok
+    lexer.token = counted_token
+
+
+def count_reductions(record, parser):
+    """
+    Return a copy of the PLY ``parser`` that records the time of the grammar
+    rules and the number of reductions of each.
+    """
+    def counted(production):
+        rule = production.str
+        callable_ = production.callable
+
+        def counted_callable(p):
+            start = clock()
+            try:
+                callable_(p)
+            finally:
+                record.times['reduce'] += clock() - start
+                record.reductions[rule] += 1
+
+        production = copy.copy(production)
+        if callable_ is not None:
+            production.callable = counted_callable
+        return production
+
+    parser = copy.copy(parser)
+    parser.productions = [counted(production) for production in parser.productions]
+    return parser
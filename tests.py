@@ -2,20 +2,43 @@
 # TODO: Tests pass on Python 3.6, Disabled to not break tests on 2.7 :-(
 # from __future__ import absolute_import, division, print_function, unicode_literals
 
+import copy
+import array
+import asyncio
+import concurrent.futures
 import datetime
 import fractions
+import gc
+import io
+import json
+import pickle
+import os
 import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
 from collections import OrderedDict
 from uuid import uuid4, UUID
 
 import pytz
 
-from edn_format import edn_lex, edn_parse, \
-    loads, dumps, Keyword, Symbol, ImmutableDict, ImmutableList, Char, \
-    MetadataValue, TaggedElement, add_tag, remove_tag, tag, \
-    EDNDecodeError
+from edn_format import aio, edn_dump, edn_lex, edn_parse, index, parallel, rfc3339, \
+    loads, loads_all, dumps, Keyword, Symbol, ImmutableDict, ImmutableList, Char, \
+    MetadataValue, NumericVector, TaggedElement, add_tag, remove_tag, tag, \
+    LazyList, LazyMap, LazyVector, PersistentMap, PersistentSet, PersistentVector, Stats, \
+    EDNDecodeError, Encoder, IncrementalParser, dump_to, iter_load, iterdump, load_path, \
+    register_encoder, unregister_encoder
 from edn_format.compat import _PY3, unicode
+from edn_format.numeric_vector import numpy
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
 
 
 class ConsoleTest(unittest.TestCase):
@@ -49,8 +72,49 @@ class KeywordTest(unittest.TestCase):
             self.assertEqual(Keyword(expected),
                              Keyword(keyword).with_namespace(namespace))
 
+    def test_interning(self):
+        self.assertIs(Keyword("a/b"), Keyword("a/b"))
+        self.assertIs(Symbol("a/b"), Symbol("a/b"))
+        self.assertIsNot(Keyword("a/b"), Symbol("a/b"))
+        self.assertIs(Keyword("b"), Keyword("a/b").with_namespace(None))
+        for engine in edn_parse.ENGINES:
+            k1, k2, s = loads("[:a/b :a/b a/b]", engine=engine)
+            self.assertIs(Keyword("a/b"), k1)
+            self.assertIs(k1, k2)
+            self.assertIs(Symbol("a/b"), s)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(Keyword("a"), "__dict__"))
+        self.assertFalse(hasattr(Symbol("a"), "__dict__"))
+        self.assertEqual(Keyword, Keyword("a").type)
+        self.assertEqual(Symbol, Symbol("a").type)
+
+    def test_pickle(self):
+        for value in (Keyword("a/b"), Symbol("c"), [Keyword("a"), Symbol("a")]):
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                self.assertEqual(value, pickle.loads(pickle.dumps(value, protocol)))
+        self.assertIs(Keyword("a/b"), pickle.loads(pickle.dumps(Keyword("a/b"))))
+        self.assertIs(Keyword("a/b"), copy.deepcopy(Keyword("a/b")))
+
+    def test_weak_references(self):
+        name = "not-referenced-anywhere-else"
+        Keyword(name)
+        gc.collect()
+        self.assertNotIn((Keyword, name), edn_lex._interned)
+
 
 class EdnTest(unittest.TestCase):
+    engine = 'ply'
+
+    def loads(self, text, **kw):
+        return loads(text, engine=self.engine, **kw)
+
+    def parse(self, text):
+        return edn_parse.parse(text, engine=self.engine)
+
+    def parse_all(self, text):
+        return edn_parse.parse_all(text, engine=self.engine)
+
     def check_lex(self, expected_output, actual_input):
         self.assertEqual(expected_output, str(list(edn_lex.lex(actual_input))))
 
@@ -118,11 +182,11 @@ class EdnTest(unittest.TestCase):
                        "^{} [1]")
 
     def check_parse(self, expected_output, actual_input):
-        self.assertEqual(expected_output, edn_parse.parse(actual_input),
+        self.assertEqual(expected_output, self.parse(actual_input),
                          actual_input)
 
     def check_parse_all(self, expected_output, actual_input):
-        self.assertEqual(expected_output, edn_parse.parse_all(actual_input),
+        self.assertEqual(expected_output, self.parse_all(actual_input),
                          actual_input)
 
     def check_dumps(self, expected_output, actual_input, **kw):
@@ -217,11 +281,11 @@ class EdnTest(unittest.TestCase):
                 self.check_parse(expected[0], edn_string)
 
     def check_roundtrip(self, data_input, **kw):
-        self.assertEqual(data_input, loads(dumps(data_input, **kw)))
+        self.assertEqual(data_input, self.loads(dumps(data_input, **kw)))
 
     def check_eof(self, data_input, **kw):
         with self.assertRaises(EDNDecodeError) as ctx:
-            loads(data_input, **kw)
+            self.loads(data_input, **kw)
 
         self.assertEqual('EOF Reached', str(ctx.exception))
 
@@ -248,6 +312,15 @@ class EdnTest(unittest.TestCase):
         self.check_roundtrip(u'\\"')
         self.check_roundtrip(u'\b\f\n\r\t"\\')
 
+    def test_string_escapes(self):
+        self.assertEqual(u"plain", loads(u'"plain"'))
+        self.assertEqual(u'a\n"b"\\n\t\\', loads(u'"a\\n\\"b\\"\\\\n\\t\\\\"'))
+        self.assertEqual(u"\u00e9\u20ac!", loads(u'"\\u00e9\\u20AC!"'))
+        # escapes that aren't a single character nor \uXXXX
+        self.assertEqual(u"\x41\x00 \u00e9\n", edn_lex.decode_escapes(
+            u"\\x41\\0 \\N{LATIN SMALL LETTER E WITH ACUTE}\\n"))
+        self.assertEqual(u"\\q\\u12", edn_lex.decode_escapes(u"\\q\\u12"))
+
     def test_round_trip_conversion(self):
         edn_literals = [
             ["[ :ghi ]", "[:ghi]"],
@@ -264,24 +337,24 @@ class EdnTest(unittest.TestCase):
 
         for literal in edn_literals:
             step1 = literal[0]
-            step2 = loads(step1)
+            step2 = self.loads(step1)
             step3 = dumps(step2)
             self.assertEqual(literal[1], step3)
 
     def test_round_trip_sets(self):
         step1 = '#{:a (1 2 3) :b}'
-        step2 = loads(step1)
+        step2 = self.loads(step1)
         step3 = dumps(step2)
-        step4 = loads(step3)
+        step4 = self.loads(step3)
         self.assertIn(Keyword("a"), step4)
         self.assertIn(Keyword("b"), step4)
         self.assertIn((1, 2, 3), step4)
 
     def test_round_trip_inst_short(self):
         step1 = '#inst "2011"'
-        step2 = loads(step1)
+        step2 = self.loads(step1)
         step3 = dumps(step2)
-        step4 = loads(step3)
+        step4 = self.loads(step3)
         self.assertEqual('#inst "2011-01-01"', step3)
         self.assertEqual(datetime.date(2011, 1, 1), step4)
 
@@ -360,13 +433,13 @@ class EdnTest(unittest.TestCase):
 
         for literal in EDN_LITERALS:
             step1 = literal
-            step2 = loads(step1)
+            step2 = self.loads(step1)
             step3 = dumps(step2)
             self.assertEqual(step1, step3)
 
     def check_char(self, expected, name):
         edn_data = "\\{}".format(name)
-        parsed = loads(edn_data)
+        parsed = self.loads(edn_data)
         self.assertIsInstance(parsed, unicode)
         self.assertEqual(expected, parsed, edn_data)
 
@@ -390,7 +463,7 @@ class EdnTest(unittest.TestCase):
 
     def test_exceptions(self):
         with self.assertRaises(EDNDecodeError):
-            loads("{")
+            self.loads("{")
 
     def test_fractions(self):
         for edn_data in (
@@ -401,15 +474,15 @@ class EdnTest(unittest.TestCase):
             '-5/3',
             '99999999999999999999999999999999999/999999999999999999999999991',
         ):
-            self.assertEqual(edn_data, dumps(loads(edn_data)), edn_data)
+            self.assertEqual(edn_data, dumps(self.loads(edn_data)), edn_data)
 
     def test_symbolic_values(self):
         import math
 
         # Parsing the EDN symbolic values yields the matching float.
-        self.assertEqual(float("inf"), loads("##Inf"))
-        self.assertEqual(float("-inf"), loads("##-Inf"))
-        self.assertTrue(math.isnan(loads("##NaN")))
+        self.assertEqual(float("inf"), self.loads("##Inf"))
+        self.assertEqual(float("-inf"), self.loads("##-Inf"))
+        self.assertTrue(math.isnan(self.loads("##NaN")))
 
         # Dumping non-finite floats produces the symbolic values, so that
         # round-tripping does not silently turn them into Symbols.
@@ -419,7 +492,7 @@ class EdnTest(unittest.TestCase):
 
         self.check_roundtrip(float("inf"))
         self.check_roundtrip(float("-inf"))
-        self.assertTrue(math.isnan(loads(dumps(float("nan")))))
+        self.assertTrue(math.isnan(self.loads(dumps(float("nan")))))
 
     def test_keyword_keys(self):
         unchanged = (
@@ -456,7 +529,7 @@ class EdnTest(unittest.TestCase):
 
         self.assertEqual(
                 {Keyword("a"): {Keyword("b"): 2}, 3: 4},
-                loads(dumps({Keyword("a"): {"b": 2}, 3: 4}, keyword_keys=True)))
+                self.loads(dumps({Keyword("a"): {"b": 2}, 3: 4}, keyword_keys=True)))
 
     def test_sort_keys(self):
         cases = (
@@ -580,6 +653,15 @@ class EdnTest(unittest.TestCase):
   )
 }''', fixture, keyword_keys=True, sort_keys=True, sort_sets=True, indent=2)
 
+    def test_large_collections(self):
+        size = 10000
+        numbers = list(range(size))
+        self.assertEqual(numbers, self.loads(dumps(numbers)))
+        self.assertEqual(tuple(numbers), self.loads(dumps(tuple(numbers))))
+        self.assertEqual(set(numbers), self.loads(dumps(set(numbers))))
+        mapping = {i: -i for i in numbers}
+        self.assertEqual(mapping, self.loads(dumps(mapping)))
+
     def test_discard(self):
         for expected, edn_data in (
             ('[x]', '[x #_ z]'),
@@ -600,12 +682,12 @@ class EdnTest(unittest.TestCase):
             ('[1]', '[1 #_\n\n42]'),
             ('{}', '{#_ 1}'),
         ):
-            self.assertEqual(expected, dumps(loads(edn_data)), edn_data)
+            self.assertEqual(expected, dumps(self.loads(edn_data)), edn_data)
 
     def test_discard_syntax_errors(self):
         for edn_data in ('#_', '#_ #_ 1', '#inst #_ 2017', '[#_]'):
             with self.assertRaises(EDNDecodeError):
-                loads(edn_data)
+                self.loads(edn_data)
 
     def test_discard_all(self):
         for edn_data in (
@@ -613,15 +695,15 @@ class EdnTest(unittest.TestCase):
             ':foo', ':foo/bar', '[]', '{}', '#{}', '()', '(a)', '(a b)',
             '[a [[[b] c]] 2]', '#inst "2017"',
         ):
-            self.assertEqual([1], loads('[1 #_ {}]'.format(edn_data)), edn_data)
-            self.assertEqual([1], loads('[#_ {} 1]'.format(edn_data)), edn_data)
+            self.assertEqual([1], self.loads('[1 #_ {}]'.format(edn_data)), edn_data)
+            self.assertEqual([1], self.loads('[#_ {} 1]'.format(edn_data)), edn_data)
 
-            self.assertEqual(None, loads('#_ {}'.format(edn_data)))
+            self.assertEqual(None, self.loads('#_ {}'.format(edn_data)))
 
             for coll in ('[%s]', '(%s)', '{%s}', '#{%s}'):
                 expected = coll % ""
                 edn_data = coll % '#_ {}'.format(edn_data)
-                self.assertEqual(expected, dumps(loads(edn_data)), edn_data)
+                self.assertEqual(expected, dumps(self.loads(edn_data)), edn_data)
 
     def test_chained_discards(self):
         for expected, edn_data in (
@@ -629,7 +711,7 @@ class EdnTest(unittest.TestCase):
             ('[]', '[#_ #_ 1 2 #_ 3]'),
             ('[]', '[#_ #_ #_ 1 2 3]'),
         ):
-            self.assertEqual(expected, dumps(loads(edn_data)), edn_data)
+            self.assertEqual(expected, dumps(self.loads(edn_data)), edn_data)
 
     def test_custom_tags(self):
         @tag("dog")
@@ -645,23 +727,894 @@ class EdnTest(unittest.TestCase):
             def __init__(self, name):
                 self.name = name
 
-        dog = loads("#dog \"Max\"")
+        dog = self.loads("#dog \"Max\"")
         self.assertEqual(
                 {"kind": "dog", "name": "Max", "message": "woof-woof"}, dog)
 
-        cat = loads("#cat \"Alex\"")
+        cat = self.loads("#cat \"Alex\"")
         self.assertIsInstance(cat, Cat)
         self.assertEqual("Alex", cat.name)
 
         remove_tag("cat")
-        self.assertRaises(NotImplementedError, lambda: loads("#cat \"Alex\""))
+        self.assertRaises(NotImplementedError, lambda: self.loads("#cat \"Alex\""))
 
         add_tag("cat", Cat)
-        cat = loads("#cat \"Alex\"")
+        cat = self.loads("#cat \"Alex\"")
         self.assertIsInstance(cat, Cat)
         self.assertEqual("Alex", cat.name)
 
 
+class FastEngineTest(EdnTest):
+    """
+    Run all the tests of EdnTest with the fast reader instead of PLY.
+    """
+    engine = 'fast'
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, lambda: loads("1", engine="slow"))
+
+    def test_same_results_as_ply(self):
+        for edn_data in (
+            "12abc",
+            "[1 2 #_ 3]",
+            '#:a{:b 1 :_/c 2 "d" 3}',
+            "#:a ; comment\n {:b 1}",
+            "^:foo ^{:bar 1} [1]",
+            "[##Inf ##-Inf \\newline \\u0041 0x1F 1/2 3.5M 1e3 -0 nil.]",
+            "(a/b :c/d a.b)",
+            "#{#{} [] () {}}",
+        ):
+            self.assertEqual(loads_all(edn_data, engine="ply"),
+                             loads_all(edn_data, engine="fast"), edn_data)
+
+    def test_numeric_vectors(self):
+        for edn_data in (
+            "[1 -2 +3 0 -0]",
+            "[ 1,2 ,3 ]",
+            "[1.5 -2e3 +0.5E-2 00.5]",
+            "[[1 2] ^:a [3] #_ [4] [1 2.5] [01] [1N 2] [1.5M 1.0]]",
+            "[1 ; comment\n 2]",
+            "[1 2 :a]",
+        ):
+            self.assertEqual(loads(edn_data, engine="ply"), self.loads(edn_data), edn_data)
+        self.assertEqual([int, int, float], [type(x) for x in self.loads("[1 2 1.0]")])
+        self.assertEqual(PersistentVector([1, 2]), self.loads("[1 2]", collections="persistent"))
+        self.assertRaises(EDNDecodeError, self.loads, "[1 2")
+
+    def test_errors(self):
+        for edn_data in ("]", "[1 2)", "{:a}", "#:a [1]", "#:a", "^{}",
+                         "[#tag]", "\r", "[1 \r]", "[1 2"):
+            with self.assertRaises(EDNDecodeError):
+                self.loads(edn_data)
+
+
+class BytesInputTest(FastEngineTest):
+    """
+    Run all the tests of FastEngineTest with memoryviews of UTF-8 text, which
+    the fast reader reads without decoding them first.
+    """
+    @staticmethod
+    def encode(text):
+        if isinstance(text, unicode):
+            text = text.encode("utf-8")
+        return memoryview(text)
+
+    def loads(self, text, **kw):
+        return loads(self.encode(text), engine=self.engine, **kw)
+
+    def parse(self, text):
+        return edn_parse.parse(self.encode(text), engine=self.engine)
+
+    def parse_all(self, text):
+        return edn_parse.parse_all(self.encode(text), engine=self.engine)
+
+    def test_non_ascii(self):
+        text = '[:été/ü "ünï" sym\u00e9 \\é #tâg 1]'
+        add_tag("tâg", lambda value: value + 1)
+        try:
+            self.assertEqual(loads(text, engine="ply"), self.loads(text))
+        finally:
+            remove_tag("tâg")
+        self.assertEqual([ImmutableList([]), 1], self.parse_all("[;c\n] ;d\n1"))
+        for edn_data in ("a€", ":a€", "\\€", "[1 €]"):
+            self.assertRaises(EDNDecodeError, self.loads, edn_data)
+
+
+class ParserCacheTest(unittest.TestCase):
+    def test_parser_is_built_once(self):
+        loads("[1 2 3]")
+        parsers = dict(edn_parse._parsers)
+        loads("{:a 1}")
+        self.assertEqual(parsers, edn_parse._parsers)
+        self.assertIs(edn_parse._get_parser(), edn_parse._get_parser())
+
+    def test_lexers_are_independent(self):
+        lexer1 = edn_lex.lex("1 2")
+        lexer2 = edn_lex.lex(":a")
+        self.assertIsNot(lexer1, lexer2)
+        self.assertEqual(1, lexer1.token().value)
+        self.assertEqual(Keyword("a"), lexer2.token().value)
+        self.assertEqual(2, lexer1.token().value)
+
+    def test_threads(self):
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(50):
+                    self.assertEqual([n, i, {Keyword("n"): n}],
+                                     loads("[{} {} {{:n {}}}]".format(n, i, n)))
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+
+
+class StatsTest(unittest.TestCase):
+    document = '[1 #uuid "f81d4fae-7dec-11d0-a765-00a0c91e6bf6" {:a "x"}]'
+
+    def test_ply(self):
+        with Stats() as stats:
+            self.assertEqual(3, len(loads(self.document)))
+        self.assertEqual({'parse': 1}, stats.calls)
+        self.assertEqual(len(self.document), stats.chars_read)
+        self.assertEqual(0, stats.bytes_read)
+        self.assertEqual({'VECTOR_START': 1, 'INTEGER': 1, 'TAG': 1, 'STRING': 2, 'MAP_START': 1,
+                          'KEYWORD': 1, 'MAP_OR_SET_END': 1, 'VECTOR_END': 1}, stats.tokens)
+        self.assertEqual(1, stats.reductions['vector -> VECTOR_START expressions VECTOR_END'])
+        self.assertEqual(1, stats.reductions['expression -> TAG operand'])
+        self.assertEqual({'uuid': 1}, stats.tag_calls)
+        self.assertEqual({'parse', 'build', 'lex', 'reduce', 'tags'}, set(stats.times))
+        self.assertLessEqual(stats.times['lex'] + stats.times['reduce'], stats.times['parse'])
+        self.assertLessEqual(stats.tag_times['uuid'], stats.times['reduce'])
+
+    def test_fast(self):
+        with Stats() as stats:
+            loads(self.document.encode('utf-8'), engine='fast')
+            loads_all(self.document.encode('utf-16'), input_encoding='utf-16', engine='fast')
+        self.assertEqual({'parse': 2}, stats.calls)
+        self.assertEqual(len(self.document.encode('utf-8')) + len(self.document.encode('utf-16')),
+                         stats.bytes_read)
+        self.assertEqual({}, stats.tokens)
+        self.assertEqual({'uuid': 2}, stats.tag_calls)
+        self.assertEqual({'parse', 'decode', 'read', 'tags'}, set(stats.times))
+
+    def test_dump(self):
+        with Stats() as stats:
+            text = dumps([1, 2, 3])
+            dump_to([1, 2, 3], io.BytesIO())
+        self.assertEqual({'dump': 2}, stats.calls)
+        self.assertEqual(2 * len(text), stats.chars_written)
+        self.assertEqual({'dump'}, set(stats.times))
+
+    def test_disabled(self):
+        stats = Stats()
+        loads(self.document)
+        with stats:
+            dumps(1)
+        loads(self.document)
+        dumps(1)
+        self.assertEqual({'dump': 1}, stats.calls)
+        stats.reset()
+        self.assertEqual({}, stats.calls)
+        self.assertEqual(0, stats.chars_written)
+
+    def test_nested(self):
+        with Stats() as outer:
+            loads("1")
+            with Stats() as inner:
+                loads("2")
+        self.assertEqual({'parse': 2}, outer.calls)
+        self.assertEqual({'parse': 1}, inner.calls)
+
+    def test_errors(self):
+        with Stats() as stats:
+            self.assertRaises(EDNDecodeError, loads, "[1 2")
+        self.assertEqual({'parse': 1}, stats.calls)
+        self.assertEqual({'INTEGER': 2, 'VECTOR_START': 1}, stats.tokens)
+
+    def test_as_dict(self):
+        with Stats() as stats:
+            dumps(loads(self.document))
+        exported = json.loads(json.dumps(stats.as_dict()))
+        self.assertEqual({'parse': 1, 'dump': 1}, exported['calls'])
+        self.assertEqual({'uuid': 1}, exported['tag_calls'])
+        self.assertEqual(len(self.document), exported['chars_read'])
+        self.assertEqual(stats.times['parse'], exported['times']['parse'])
+
+
+class IterLoadTest(unittest.TestCase):
+    document = (
+        '; a comment\n'
+        '{:a "x]}\\"(" :b [1 2 #{3}] :c \\] :d \\" :e \\;} 42 :kw sym\n'
+        '"s;tr" ; another comment\n'
+        '#_ {:x 1} #inst "2020-01-01" ^{:m 1} [1] #_ #_ 1 2 3 #:ns{:a 1}\n'
+        '##Inf \\newline #uuid "f81d4fae-7dec-11d0-a765-00a0c91e6bf6"\n'
+        '(1 #_ 2 3) [#_ ^:m x y] "\u00e9\u20ac\U0001f600" nil abc'
+    )
+
+    def test_chunk_boundaries(self):
+        expected = loads_all(self.document)
+        for chunk_size in range(1, 24):
+            self.assertEqual(expected, list(iter_load(
+                io.StringIO(self.document), chunk_size=chunk_size)))
+
+    def test_bytes(self):
+        expected = loads_all(self.document)
+        data = self.document.encode("utf-8")
+        # multi-byte characters are split across chunks
+        for chunk_size in range(1, 24):
+            self.assertEqual(expected, list(iter_load(
+                io.BytesIO(data), chunk_size=chunk_size)))
+        data = self.document.encode("utf-16")
+        self.assertEqual(expected, list(iter_load(
+            io.BytesIO(data), chunk_size=5, input_encoding="utf-16")))
+
+    def test_incremental(self):
+        lines = ["{:n %d :s \"%s\"}\n" % (i, "x" * i) for i in range(100)]
+        stream = io.StringIO("".join(lines))
+        values = iter_load(stream, chunk_size=16)
+        self.assertEqual({Keyword("n"): 0, Keyword("s"): ""}, next(values))
+        self.assertLess(stream.tell(), 32)
+        self.assertEqual(99, len(list(values)))
+
+    def test_engine(self):
+        self.assertEqual(loads_all(self.document), list(iter_load(
+            io.StringIO(self.document), chunk_size=7, engine="fast")))
+
+    def test_errors(self):
+        for edn_data in ("[1 2", "{:a 1} \"abc", "1 #tag", "^:m", "#_", "]"):
+            with self.assertRaises(EDNDecodeError):
+                list(iter_load(io.StringIO(edn_data), chunk_size=2))
+
+    def test_empty(self):
+        self.assertEqual([], list(iter_load(io.BytesIO(b""))))
+        self.assertEqual([], list(iter_load(io.StringIO(" ; comment\n, "))))
+
+
+class IncrementalParserTest(unittest.TestCase):
+    document = ('{:id 1 :name "été ]"} ; comment }\n'
+                '#_ {:id 0} [2 "\\"" \\]] #inst "2020-01-01" 42 :last')
+
+    def test_chunks(self):
+        expected = loads_all(self.document)
+        data = self.document.encode("utf-8")
+        for size in (1, 2, 7, len(data)):
+            for chunks in ([data[i:i + size] for i in range(0, len(data), size)],
+                           [self.document[i:i + size] for i in range(0, len(self.document), size)]):
+                parser = IncrementalParser()
+                values = []
+                for chunk in chunks:
+                    parser.feed(chunk)
+                    values.extend(parser.forms())
+                # the last atom isn't complete until the end of the text
+                self.assertEqual(expected[:-1], values)
+                parser.close()
+                values.extend(parser.forms())
+                self.assertEqual(expected, values)
+
+    def test_forms(self):
+        parser = IncrementalParser(engine="fast")
+        parser.feed(b"[1 2] (3) {:a")
+        forms = parser.forms()
+        self.assertEqual(ImmutableList([1, 2]), next(forms))
+        parser.feed(b" 1} 4 ")
+        self.assertEqual([(3,), ImmutableDict({Keyword("a"): 1}), 4], list(forms))
+        self.assertEqual([], list(parser.forms()))
+
+    def test_texts(self):
+        parser = IncrementalParser()
+        parser.feed(b"[1 2] #_ 3 (3) {:a")
+        self.assertEqual([ImmutableList([1, 2]), (3,)],
+                         [value for text in parser.texts() for value in loads_all(text)])
+        parser.feed(b" 1}")
+        parser.close()
+        self.assertEqual([ImmutableDict({Keyword("a"): 1})],
+                         [value for text in parser.texts() for value in loads_all(text)])
+        self.assertEqual([], list(parser.forms()))
+
+    def test_close(self):
+        parser = IncrementalParser()
+        parser.feed("[1 2] {:a")
+        parser.close()
+        parser.close()
+        self.assertRaises(ValueError, parser.feed, "1}")
+        forms = parser.forms()
+        self.assertEqual(ImmutableList([1, 2]), next(forms))
+        self.assertRaises(EDNDecodeError, next, forms)
+
+
+class LoadPathTest(unittest.TestCase):
+    document = '{:name "été" :tags #{:a}} ; comment\n[1 2.5 \\é] #_ 3 :end'
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".edn")
+        os.close(handle)
+        with io.open(self.path, "w", encoding="utf-8") as f:
+            f.write(self.document)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_load_path(self):
+        expected = loads_all(self.document)
+        self.assertEqual(expected, load_path(self.path))
+        self.assertEqual(expected, load_path(self.path, engine="ply"))
+        self.assertEqual(expected, load_path(self.path, lazy=True))
+
+    def test_empty_file(self):
+        with io.open(self.path, "w") as f:
+            f.write(u"")
+        self.assertEqual([], load_path(self.path))
+
+
+def parse_point(element):
+    # a tag handler that can be sent to other processes
+    return tuple(element)
+
+
+def encode_complex(value):
+    # an encoder that can be sent to other processes
+    return "#complex [{} {}]".format(value.real, value.imag)
+
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".edn")
+        os.close(handle)
+        self.lines = ['{{:id {0} :name "n\\n{0}" :point #point [{0} 1]}}'.format(i)
+                      for i in range(100)]
+        with io.open(self.path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.lines))
+        add_tag("point", parse_point)
+
+    def tearDown(self):
+        remove_tag("point")
+        os.remove(self.path)
+
+    def test_load_lines(self):
+        expected = loads_all("\n".join(self.lines))
+        self.assertEqual((0, 1), expected[0][Keyword("point")])
+        for chunk_bytes in (1, 100, 10 ** 6):
+            self.assertEqual(
+                expected, parallel.load_lines(self.path, workers=2, chunk_bytes=chunk_bytes))
+        self.assertEqual(expected, parallel.load_lines(self.path, workers=1, engine="ply"))
+
+    def test_multiline_forms(self):
+        # the chunks end at the end of a form, not of a line
+        document = ('{:id 0\n :text "a\nb ]"} ; c ]\n'
+                    '[1\n 2 \\]] #_\n{:id 1} 42 :été\n(#point\n[3 4])')
+        with io.open(self.path, "w", encoding="utf-8") as f:
+            f.write(document)
+        data = document.encode("utf-8")
+        for chunk_bytes in (1, 5, 20, 10 ** 6):
+            chunks = list(parallel._chunks(data, chunk_bytes))
+            self.assertEqual(0, chunks[0][0])
+            self.assertEqual(len(data), chunks[-1][1])
+            values = [value for start, end in chunks for value in loads_all(data[start:end])]
+            self.assertEqual(loads_all(document), values)
+            self.assertEqual(loads_all(document),
+                             parallel.load_lines(self.path, workers=2, chunk_bytes=chunk_bytes))
+
+    def test_unpicklable_handlers(self):
+        with io.open(self.path, "w") as f:
+            f.write(u"#point [0 1]")
+        add_tag("point", lambda element: tuple(element))
+        tags = parallel._picklable([("point", edn_parse._serializers["point"])], "tag handler")
+        tags = pickle.loads(pickle.dumps(tags))
+        # forked workers keep the handler they inherit
+        self.assertEqual([(0, 1)], parallel._load_chunk(self.path, 0, 12, tags, {}))
+        # the other ones raise an error that says why they don't have it
+        remove_tag("point")
+        with self.assertRaisesRegex(NotImplementedError, "tag handler .* of 'point' can't be sent"):
+            parallel._load_chunk(self.path, 0, 12, tags, {})
+        add_tag("point", parse_point)
+
+        encoders = parallel._picklable([(complex, lambda value: "#c")], "encoder")
+        encoders = pickle.loads(pickle.dumps(encoders))
+        try:
+            with self.assertRaisesRegex(NotImplementedError, "encoder .* can't be sent"):
+                parallel._dump_batch([1j], encoders, {})
+        finally:
+            unregister_encoder(complex)
+        register_encoder(complex, encode_complex)
+        try:
+            self.assertEqual("#complex [0.0 1.0]\n", parallel._dump_batch([1j], encoders, {}))
+        finally:
+            unregister_encoder(complex)
+
+    def test_iter_load_lines(self):
+        values = parallel.iter_load_lines(self.path, workers=2, chunk_bytes=100)
+        self.assertEqual(0, next(values)[Keyword("id")])
+        self.assertEqual(1, next(values)[Keyword("id")])
+        values.close()
+
+    def test_empty_file(self):
+        with io.open(self.path, "w") as f:
+            f.write(u"")
+        self.assertEqual([], parallel.load_lines(self.path, workers=2))
+
+    def test_dump_lines(self):
+        values = loads_all("\n".join(self.lines))
+        for batch in (1, 7, 1000):
+            fp = io.StringIO()
+            parallel.dump_lines(iter(values), fp, workers=2, batch=batch)
+            self.assertEqual(fp.getvalue(), "".join(dumps(value) + "\n" for value in values))
+
+        with io.open(self.path, "wb") as f:
+            parallel.dump_lines(values, f, workers=2, batch=30, sort_keys=True, keyword_keys=True)
+        self.assertEqual(values, parallel.load_lines(self.path, workers=2))
+        with io.open(self.path, encoding="utf-8") as f:
+            self.assertEqual(dumps(values[0], sort_keys=True), f.readline().rstrip("\n"))
+
+    def test_dump_lines_encoders(self):
+        register_encoder(complex, encode_complex)
+        try:
+            fp = io.StringIO()
+            parallel.dump_lines([1j, [2 + 0j]], fp, workers=2, batch=1)
+            self.assertEqual("#complex [0.0 1.0]\n[#complex [2.0 0.0]]\n", fp.getvalue())
+        finally:
+            unregister_encoder(complex)
+
+        fp = io.StringIO()
+        with self.assertRaises(NotImplementedError):
+            parallel.dump_lines([1, object()], fp, workers=2, batch=1)
+
+    def test_dump_lines_sends_registered_encoders(self):
+        self.assertEqual({}, parallel._picklable(parallel._registered_encoders(), "encoder"))
+        register_encoder(complex, encode_complex)
+        try:
+            encoders = parallel._picklable(parallel._registered_encoders(), "encoder")
+            self.assertEqual({complex: encode_complex}, encoders)
+            # the encoders of the subclasses stay resolved in the workers
+            dumps(OrderedDict())
+            encoders = pickle.loads(pickle.dumps(encoders))
+            self.assertEqual("#complex [0.0 1.0]\n", parallel._dump_batch([1j], encoders, {}))
+            self.assertIn(OrderedDict, edn_dump._resolved)
+        finally:
+            unregister_encoder(complex)
+
+
+class AioTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.sockets = socket.socketpair()
+        # the writers are kept, as their transport is closed with them
+        self.reader, self.reader_writer = self.run_until_complete(
+            asyncio.open_connection(sock=self.sockets[0]))
+        _, self.writer = self.run_until_complete(asyncio.open_connection(sock=self.sockets[1]))
+
+    def tearDown(self):
+        self.writer.close()
+        self.reader_writer.close()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+
+    def run_until_complete(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def read_all(self, forms):
+        # the values of an asynchronous iterator
+        values = []
+        forms = forms.__aiter__()
+        while True:
+            try:
+                values.append(self.run_until_complete(forms.__anext__()))
+            except StopAsyncIteration:
+                return values
+
+    def test_read_forms(self):
+        document = '{:id 1 :name "été"} [1 2 #{3}] ; comment\n#inst "2020-01-01" 42'
+        self.writer.write(document.encode("utf-8"))
+        self.writer.close()
+        forms = aio.read_forms(self.reader, chunk_size=3)
+        self.assertEqual(loads_all(document), self.read_all(forms))
+
+    def test_read_forms_partial(self):
+        forms = aio.read_forms(self.reader).__aiter__()
+        self.writer.write(b"[1 2] [3")
+        self.assertEqual(ImmutableList([1, 2]), self.run_until_complete(forms.__anext__()))
+        self.writer.write(b" 4]")
+        self.writer.close()
+        self.assertEqual(ImmutableList([3, 4]), self.run_until_complete(forms.__anext__()))
+        with self.assertRaises(StopAsyncIteration):
+            self.run_until_complete(forms.__anext__())
+
+    def test_incomplete_form(self):
+        self.writer.write(b"[1 2] {:a")
+        self.writer.close()
+        with self.assertRaises(EDNDecodeError):
+            self.read_all(aio.read_forms(self.reader))
+
+    def test_write_form(self):
+        values = [{Keyword("id"): i, Keyword("tags"): frozenset([Keyword("a")]),
+                   Keyword("name"): "n{}".format(i)}
+                  for i in range(100)]
+        self.run_until_complete(
+            aio.write_form(self.writer, values, chunk_size=16, keyword_keys=True))
+        self.run_until_complete(aio.write_form(self.writer, 42))
+        self.writer.close()
+        forms = aio.read_forms(self.reader, executor=concurrent.futures.ThreadPoolExecutor(1),
+                               offload_size=100)
+        self.assertEqual([values, 42], self.read_all(forms))
+
+
+class IndexTest(unittest.TestCase):
+    document = (
+        '{:id 1 :name "été ]"} ; comment }\n'
+        '#_ {:id 0}\n'
+        '[2 "\\"" \\]]\n'
+        '#inst "2020-01-01" 42\n'
+        ':last\n')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "records.edn")
+        with io.open(self.path, "w", encoding="utf-8") as f:
+            f.write(self.document)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_build(self):
+        expected = loads_all(self.document)
+        for chunk_size in (1, 3, 1024):
+            with index.build(self.path, chunk_size=chunk_size) as edn_index:
+                self.assertEqual(len(expected), len(edn_index))
+                self.assertEqual(expected, list(edn_index))
+                self.assertEqual(expected[2], edn_index.get(2))
+                self.assertEqual(expected[-1], edn_index[-1])
+                self.assertEqual(expected[1:3], edn_index[1:3])
+                self.assertRaises(IndexError, edn_index.get, len(expected))
+
+    def test_open(self):
+        index.build(self.path).close()
+        with index.EdnIndex(self.path, engine="fast") as edn_index:
+            self.assertEqual(loads_all(self.document), list(edn_index))
+            start, end = edn_index.span(1)
+            self.assertEqual(ImmutableList([2, '"', ']']), edn_index.between(start, end)[0])
+            self.assertEqual(loads_all(self.document)[1:],
+                             edn_index.between(start, len(self.document) * 2))
+
+    def test_incomplete_form(self):
+        with io.open(self.path, "a", encoding="utf-8") as f:
+            f.write(' {:id 3 :name "x')
+        with index.build(self.path) as edn_index:
+            self.assertEqual(5, len(edn_index))
+            self.assertEqual(Keyword("last"), edn_index[-1])
+
+    def test_truncated_atom(self):
+        with io.open(self.path, "a", encoding="utf-8") as f:
+            f.write(u'[3] 12')
+        with index.build(self.path) as edn_index:
+            self.assertEqual(6, len(edn_index))
+            self.assertEqual(ImmutableList([3]), edn_index[-1])
+        with io.open(self.path, "a", encoding="utf-8") as f:
+            f.write(u'34\n')
+        with index.build(self.path) as edn_index:
+            self.assertEqual(7, len(edn_index))
+            self.assertEqual(1234, edn_index[-1])
+
+    def test_empty_file(self):
+        with io.open(self.path, "w") as f:
+            f.write(u" ; nothing\n")
+        with index.build(self.path) as edn_index:
+            self.assertEqual(0, len(edn_index))
+            self.assertEqual([], list(edn_index))
+
+    def test_command(self):
+        # turn the warnings of the import of the module into errors
+        output = subprocess.check_output(
+            [sys.executable, "-W", "error", "-m", "edn_format.index", self.path],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.STDOUT)
+        self.assertEqual("{}: 5 forms\n".format(self.path), output.decode("utf-8"))
+
+    def test_out_of_date(self):
+        index.build(self.path).close()
+        with io.open(self.path, "w") as f:
+            f.write(u"1")
+        self.assertRaises(ValueError, index.EdnIndex, self.path)
+
+
+class PersistentTest(unittest.TestCase):
+    def test_map_operations(self):
+        rand = random.Random(42)
+        # a few keys with colliding hashes
+        keys = list(range(300)) + [-1, -2, Keyword("a"), "a", (1, 2)]
+        expected = {}
+        m = PersistentMap()
+        for _ in range(2000):
+            key = rand.choice(keys)
+            if rand.random() < 0.6:
+                expected[key] = rand.random()
+                m = m.assoc(key, expected[key])
+            else:
+                expected.pop(key, None)
+                m = m.dissoc(key)
+            self.assertEqual(len(expected), len(m))
+        self.assertEqual(expected, dict(m.items()))
+        for key in keys:
+            self.assertEqual(key in expected, key in m)
+            self.assertEqual(expected.get(key), m.get(key))
+        self.assertEqual(PersistentMap(expected), m)
+        self.assertEqual(hash(PersistentMap(expected)), hash(m))
+
+    def test_structural_sharing(self):
+        m = PersistentMap((i, i) for i in range(1000))
+        m2 = m.assoc(5, "five").dissoc(6)
+        self.assertEqual(5, m[5])
+        self.assertEqual(6, m[6])
+        self.assertEqual("five", m2[5])
+        self.assertNotIn(6, m2)
+        self.assertEqual(999, len(m2))
+        self.assertIs(m, m.assoc(1, 1))
+        self.assertIs(m, m.dissoc("missing"))
+        with self.assertRaises(KeyError):
+            m2[6]
+
+    def test_vector_operations(self):
+        for size in (0, 1, 31, 32, 33, 1024, 1025, 32 * 32 * 32 + 33):
+            items = list(range(size))
+            v = PersistentVector(items)
+            conj = PersistentVector()
+            for i in items:
+                conj = conj.conj(i)
+            self.assertEqual(items, list(v))
+            self.assertEqual(items, list(conj))
+            self.assertEqual(size, len(v))
+            for i in ({0, size // 2, size - 1} if size else ()):
+                self.assertEqual(i, v[i])
+                self.assertEqual("x", v.assoc(i, "x")[i])
+                self.assertEqual("x", conj.assoc(i, "x")[i])
+                self.assertEqual(i, v[i])
+            self.assertEqual(items + ["end"], v.assoc(size, "end"))
+        v = PersistentVector([1, 2, 3])
+        self.assertEqual(3, v[-1])
+        self.assertEqual([2, 3], v[1:])
+        self.assertIsNone(v.get(3))
+        with self.assertRaises(IndexError):
+            v[3]
+        with self.assertRaises(IndexError):
+            v.assoc(5, 0)
+
+    def test_set_operations(self):
+        s = PersistentSet([1, 2, 3])
+        self.assertEqual({1, 2, 3, 4}, s.conj(4))
+        self.assertEqual({1, 3}, s.disj(2))
+        self.assertEqual({1, 2, 3}, s)
+        self.assertIs(s, s.conj(1))
+        self.assertIsInstance(s | {5}, PersistentSet)
+        self.assertEqual({2}, s & {2, 7})
+
+    def test_update_in(self):
+        m = PersistentMap({Keyword("a"): PersistentMap({Keyword("b"): PersistentVector([1, 2])})})
+        updated = m.update_in([Keyword("a"), Keyword("b"), 1], lambda x, y: x + y, 10)
+        self.assertEqual({Keyword("a"): {Keyword("b"): [1, 12]}}, updated)
+        self.assertEqual({Keyword("a"): {Keyword("b"): [1, 2]}}, m)
+        self.assertEqual({"x": {"y": 1}}, PersistentMap().update_in(["x", "y"], lambda v: 1))
+
+    def test_compatible_with_immutable_collections(self):
+        edn_data = '[{:a #{1 2} :b [1 (2 3)]} #{3 4}]'
+        for engine in edn_parse.ENGINES:
+            immutable = loads(edn_data, engine=engine)
+            persistent = loads(edn_data, engine=engine, collections="persistent")
+            self.assertIsInstance(persistent, PersistentVector)
+            self.assertIsInstance(persistent[0], PersistentMap)
+            self.assertIsInstance(persistent[1], PersistentSet)
+            self.assertIsInstance(persistent[0][Keyword("a")], PersistentSet)
+            self.assertIsInstance(persistent[0][Keyword("b")][1], tuple)
+            self.assertEqual(immutable, persistent)
+            self.assertEqual(persistent, immutable)
+            self.assertEqual(hash(immutable), hash(persistent))
+            self.assertEqual(dumps(immutable, sort_sets=True, sort_keys=True),
+                             dumps(persistent, sort_sets=True, sort_keys=True))
+        self.assertEqual({Keyword("a/b"): 1}, loads('#:a{:b 1}', collections="persistent"))
+        self.assertRaises(ValueError, lambda: loads("[]", collections="mutable"))
+
+    def test_pickle(self):
+        value = loads('[{:a #{1}}]', collections="persistent")
+        copied = pickle.loads(pickle.dumps(value))
+        self.assertEqual(value, copied)
+        self.assertIsInstance(copied[0], PersistentMap)
+
+
+class NumericVectorTest(unittest.TestCase):
+    document = "[[1 -2 3] [1.5 ##Inf ##-Inf] [1 2.0] [] [99999999999999999999 1] #{[4 5]} ^:a [6]]"
+
+    def test_array(self):
+        for engine in ("ply", "fast"):
+            for text in (self.document, self.document.encode("utf-8")):
+                value = loads(text, engine=engine, numeric_vectors="array")
+                self.assertEqual(
+                    [NumericVector, NumericVector, ImmutableList, ImmutableList, ImmutableList],
+                    [type(item) for item in value[:5]])
+                self.assertEqual(loads(self.document), value)
+                self.assertIsInstance(next(iter(value[5])), NumericVector)
+                self.assertIsInstance(value[6].value, NumericVector)
+                self.assertEqual(self.document, dumps(value))
+
+    def test_numeric_vector(self):
+        vector = loads("[1 2 3]", numeric_vectors="array")
+        self.assertEqual(ImmutableList([1, 2, 3]), vector)
+        self.assertEqual([1, 2, 3], vector)
+        self.assertEqual(hash(ImmutableList([1, 2, 3])), hash(vector))
+        self.assertEqual(3, vector[-1])
+        self.assertEqual(NumericVector, type(vector[1:]))
+        self.assertEqual([2, 3], vector[1:])
+        self.assertFalse(vector.is_float)
+        self.assertTrue(vector.data.readonly)
+        self.assertEqual(vector, pickle.loads(pickle.dumps(vector)))
+        self.assertEqual("[\n  1\n  2\n  3\n]", dumps(vector, indent=2))
+        self.assertEqual("[1.0 ##NaN]", dumps(loads("[1.0 ##NaN]", numeric_vectors="array")))
+
+    def test_errors(self):
+        self.assertRaises(ValueError, loads, "[1]", numeric_vectors="list")
+        self.assertRaises(ValueError, loads, "[1]", numeric_vectors="array", lazy=True)
+        self.assertRaises(ValueError, loads, "[1]", numeric_vectors="array",
+                          collections="persistent")
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_numpy(self):
+        value = loads(self.document, engine="fast", numeric_vectors="numpy")
+        self.assertEqual(loads(self.document), value)
+        self.assertIsInstance(value[0].data, numpy.ndarray)
+        self.assertFalse(value[0].data.flags.writeable)
+        self.assertTrue(value[1].is_float)
+        self.assertEqual(self.document, dumps(value))
+
+
+class LazyTest(unittest.TestCase):
+    text = (
+        '{:id 1 :tags #{:a :b} :created #inst "2020-01-02T03:04:05Z" '
+        ':items [{:sku "x]" :qty 2} {:sku "y" :qty 3 #_ :ignored}] ; comment ]\n'
+        ':path (1 \\) 2) :ns #:user{:name "n" :_/plain 1} :meta ^:m [1]}')
+
+    def test_equal_to_eager(self):
+        value = loads(self.text, lazy=True)
+        expected = loads(self.text)
+        self.assertIsInstance(value, LazyMap)
+        self.assertEqual(expected, value)
+        self.assertEqual(value, expected)
+        self.assertEqual(hash(expected), hash(loads(self.text, lazy=True)))
+        self.assertEqual(dumps(expected), dumps(value))
+        self.assertEqual(loads_all("1 [2] (3) {4 5}"), loads_all("1 [2] (3) #_ 6 {4 5}", lazy=True))
+        deep = "[" * 20 + "1 \"]\"" + "]" * 20 + " 2"
+        self.assertEqual(loads_all(deep), loads_all(deep, lazy=True))
+
+    def test_types(self):
+        value = loads(self.text, lazy=True)
+        items = value[Keyword("items")]
+        self.assertIsInstance(items, LazyVector)
+        self.assertIsInstance(items[0], LazyMap)
+        self.assertIsInstance(value[Keyword("path")], LazyList)
+        self.assertIsInstance(value[Keyword("tags")], frozenset)
+        self.assertEqual("x]", items[0][Keyword("sku")])
+        self.assertEqual(ImmutableList([2, 3]), [item[Keyword("qty")] for item in items])
+        self.assertEqual((1, ")", 2), value[Keyword("path")])
+        self.assertNotEqual((1, ")", 2), loads('[1 ")" 2]', lazy=True))
+        self.assertNotEqual([1], loads('(1)', lazy=True))
+        self.assertEqual([2, 3], loads('[1 2 3]', lazy=True)[1:])
+        self.assertIsInstance(loads('[1 2 3]', lazy=True)[1:], list)
+        self.assertEqual((2,), loads('(1 2)', lazy=True)[1:])
+        self.assertEqual("n", value[Keyword("ns")][Keyword("user/name")])
+        self.assertEqual(1, value[Keyword("ns")][Keyword("plain")])
+
+    def test_tags_called_on_access(self):
+        calls = []
+        add_tag("lazy-test", lambda element: calls.append(element) or element)
+        try:
+            value = loads('[#lazy-test 1 [#lazy-test 2] #lazy-test 3]', lazy=True)
+            self.assertEqual([], calls)
+            self.assertEqual(3, value[2])
+            self.assertEqual([3], calls)
+            self.assertEqual(3, value[2])
+            self.assertEqual([3], calls)
+            value[1]
+            self.assertEqual([3], calls)
+        finally:
+            remove_tag("lazy-test")
+
+    def test_tokenization_edge_cases(self):
+        # the lazy reader either reads the same values as the eager ones, or
+        # raises an error, never other values
+        for text in ("1/", "01", "+1a", "a/b/c", "1.5M2", "\\a1", "1e5e", "1N2", ":a:b", "-",
+                     '#inst"2020-01-01"x', '"a"b', "[1]2", "1 2", "#_1 2", "^:m[1]"):
+            eager = loads_all(text)
+            for document in ("[{}]".format(text), "({})".format(text), "{{:k [{}]}}".format(text)):
+                expected = loads(document)
+                try:
+                    value = loads(document, lazy=True)
+                    if isinstance(expected, dict):
+                        expected, value = expected[Keyword("k")], value[Keyword("k")]
+                    self.assertEqual(list(expected), list(value))
+                except EDNDecodeError:
+                    self.assertNotEqual(1, len(eager), text)
+        self.assertRaises(EDNDecodeError, lambda: loads("[1/]", lazy=True)[0])
+        self.assertRaises(EDNDecodeError, lambda: loads("[01]", lazy=True)[0])
+        self.assertRaises(EDNDecodeError, loads, "+1a", lazy=True)
+
+    def test_errors_on_access(self):
+        value = loads('[1 {:a} (2]]', lazy=True)
+        self.assertEqual(1, value[0])
+        self.assertRaises(EDNDecodeError, lambda: value[1][Keyword("a")])
+        self.assertRaises(EDNDecodeError, lambda: value[2])
+        self.assertRaises(EDNDecodeError, loads, '[1 2', lazy=True)
+        # an incomplete discard is an error, not a discarded form
+        value = loads('[1 #_]', lazy=True)
+        self.assertEqual(1, value[0])
+        self.assertRaises(EDNDecodeError, lambda: value[1])
+        value = loads('{:a 1 #_}', lazy=True)
+        self.assertRaises(EDNDecodeError, lambda: value[Keyword("a")])
+        self.assertRaises(EDNDecodeError, loads, '#_ {', lazy=True)
+        self.assertEqual([1, 2], loads('[1 #_ 3 2 #_ 4]', lazy=True))
+        self.assertRaises(ValueError, loads, '[1]', lazy=True, collections="persistent")
+
+    def test_pickle(self):
+        value = pickle.loads(pickle.dumps(loads(self.text, lazy=True)))
+        self.assertIsInstance(value, ImmutableDict)
+        self.assertEqual(loads(self.text), value)
+
+
+class Rfc3339Test(unittest.TestCase):
+    timestamps = [
+        ("2012-12-22T19:40:18Z",
+         datetime.datetime(2012, 12, 22, 19, 40, 18, tzinfo=pytz.utc)),
+        ("2012-12-22t19:40:18.5z",
+         datetime.datetime(2012, 12, 22, 19, 40, 18, 500000, tzinfo=pytz.utc)),
+        ("2012-12-22 19:40:18.1234567-00:00",
+         datetime.datetime(2012, 12, 22, 19, 40, 18, 123456, tzinfo=pytz.utc)),
+        ("2012-12-22T19:40:18.123+05:30",
+         datetime.datetime(2012, 12, 22, 14, 10, 18, 123000, tzinfo=pytz.utc)),
+    ]
+
+    def check_parse_datetime(self):
+        for text, expected in self.timestamps:
+            value = rfc3339.parse_datetime(text)
+            self.assertEqual(expected, value)
+        self.assertEqual(datetime.timedelta(hours=-8),
+                         rfc3339.parse_datetime("2012-12-22T19:40:18-08:00").utcoffset())
+        self.assertRaises(ValueError, rfc3339.parse_datetime, "2012-12-22T25:40:18Z")
+
+    def test_parse_datetime(self):
+        self.check_parse_datetime()
+
+    def test_parse_datetime_without_fromisoformat(self):
+        fromisoformat = rfc3339._fromisoformat
+        rfc3339._fromisoformat = None
+        try:
+            self.check_parse_datetime()
+        finally:
+            rfc3339._fromisoformat = fromisoformat
+
+    def test_shared_tzinfo(self):
+        values = loads_all('#inst "2012-12-22 19:40:18+05:30" #inst "2013-01-02 03:04:05.6+05:30"')
+        self.assertIs(values[0].tzinfo, values[1].tzinfo)
+
+    def test_parse_inst(self):
+        self.assertEqual(datetime.date(2011, 1, 1), rfc3339.parse_inst("2011"))
+        self.assertEqual(datetime.date(2011, 10, 1), rfc3339.parse_inst("2011-10"))
+        self.assertEqual(datetime.date(2011, 10, 9), rfc3339.parse_inst("2011-10-09"))
+        for text in ("2011-13", "2011-02-30", "2011-1-09", "201a", "2011-+1"):
+            self.assertRaises(ValueError, rfc3339.parse_inst, text)
+
+    def test_format_datetime(self):
+        eastern = pytz.timezone("US/Eastern")
+        for value, expected in (
+                (datetime.datetime(2012, 12, 22, 19, 40, 18, tzinfo=pytz.utc),
+                 "2012-12-22T19:40:18.000000Z"),
+                (eastern.localize(datetime.datetime(2012, 7, 1, 1, 2, 3, 4)),
+                 "2012-07-01T05:02:03.000004Z"),
+                (datetime.datetime(5, 1, 1, 23, 0, tzinfo=pytz.FixedOffset(-120)),
+                 "0005-01-02T01:00:00.000000Z")):
+            self.assertEqual(expected, rfc3339.format_datetime(value))
+        self.assertRaises(ValueError, rfc3339.format_datetime, datetime.datetime(2012, 1, 1))
+
+
 class EdnInstanceTest(unittest.TestCase):
     def test_hashing(self):
         pop_count = len(set(map(hash,
@@ -679,6 +1632,191 @@ class EdnInstanceTest(unittest.TestCase):
         self.assertTrue(Symbol("db/id") == Symbol("db/id"))
 
 
+class DumpToTest(unittest.TestCase):
+    data = [
+        {Keyword("a"): (1, 2.5, None), "b": frozenset([Keyword("c")])},
+        MetadataValue({Keyword("m"): True}, [Symbol("s"), Char("x"), ""]),
+        [], {}, (), [[[]]], "\u00e9\u20ac",
+    ]
+
+    def test_same_as_dumps(self):
+        for kwargs in ({}, {"indent": 2}, {"indent": 0},
+                       {"sort_keys": True, "keyword_keys": True}):
+            expected = dumps(self.data, **kwargs)
+            self.assertEqual(expected, "".join(iterdump(self.data, **kwargs)))
+
+            fp = io.StringIO()
+            dump_to(self.data, fp, **kwargs)
+            self.assertEqual(expected, fp.getvalue())
+
+    def test_binary_stream(self):
+        fp = io.BytesIO()
+        dump_to(self.data, fp)
+        self.assertEqual(dumps(self.data), fp.getvalue().decode("utf-8"))
+        fp = io.BytesIO()
+        dump_to("\u00e9", fp, output_encoding="latin-1")
+        self.assertEqual(b'"\xe9"', fp.getvalue())
+
+    def test_chunks(self):
+        data = list(range(10000))
+        chunks = list(iterdump(data))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(dumps(data), "".join(chunks))
+
+    def test_number_chunks(self):
+        # small vectors of numbers don't make chunks of their own
+        self.assertEqual(["[[1.5 2.5] [1.5 2.5] [1.5 2.5]]"], list(iterdump([[1.5, 2.5]] * 3)))
+        numbers = array.array("d", range(10 ** 5))
+        self.assertEqual(dumps(numbers.tolist()), "".join(iterdump(numbers)))
+        if tracemalloc is not None:
+            # the numbers are converted to Python floats by slices
+            tracemalloc.start()
+            try:
+                for _ in iterdump(numbers):
+                    pass
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, 10 ** 6)
+
+    def test_numbers(self):
+        nan = float("nan")
+        for data, expected in (
+            ([1, -2, 3], "[1 -2 3]"),
+            ((1.5, 2.0), "(1.5 2.0)"),
+            ([1.5, nan, float("-inf")], "[1.5 ##NaN ##-Inf]"),
+            ([1, 2.5, True], "[1 2.5 true]"),
+            (array.array("d", [0.5, nan]), "[0.5 ##NaN]"),
+            (array.array("i", [1, 2]), "[1 2]"),
+            (array.array("u", "ab"), '["a" "b"]'),
+            (memoryview(b"\x01\xff"), "[1 255]"),
+            (memoryview(array.array("f", [0.5])), "[0.5]"),
+            (range(3), "[0 1 2]"),
+        ):
+            self.assertEqual(expected, dumps(data))
+            self.assertEqual(expected, "".join(iterdump(data)))
+            items = data if isinstance(data, tuple) else list(data)
+            self.assertEqual(dumps(items, indent=2), dumps(data, indent=2))
+        self.assertEqual("[[1 2] {:a (3)}]", dumps([[1, 2], {Keyword("a"): (3,)}]))
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_numpy(self):
+        self.assertEqual("[1 2 3]", dumps(numpy.arange(1, 4)))
+        self.assertEqual("[0.5 ##Inf]", dumps(numpy.array([0.5, numpy.inf], dtype=numpy.float32)))
+        self.assertEqual("[[1 2] [3 4]]", dumps(numpy.array([[1, 2], [3, 4]])))
+        self.assertEqual("[true false]", dumps(numpy.array([True, False])))
+
+    def test_deep_nesting(self):
+        data = []
+        for _ in range(10000):
+            data = [data]
+        self.assertEqual("[" * 10001 + "]" * 10001, dumps(data))
+
+    def test_unknown_type(self):
+        with self.assertRaises(NotImplementedError):
+            list(iterdump([1, object()]))
+
+
+class RegisterEncoderTest(unittest.TestCase):
+    class Dog(object):
+        def __init__(self, name):
+            self.name = name
+
+    class Puppy(Dog):
+        pass
+
+    def register_encoder(self, cls, encoder):
+        register_encoder(cls, encoder)
+        self.addCleanup(unregister_encoder, cls)
+
+    def test_register_encoder(self):
+        self.register_encoder(self.Dog, lambda dog: '#dog "{}"'.format(dog.name))
+        self.assertEqual('[#dog "Max" #dog "Rex"]',
+                         dumps([self.Dog("Max"), self.Puppy("Rex")]))
+        self.register_encoder(self.Puppy, lambda dog: '#puppy "{}"'.format(dog.name))
+        self.assertEqual('[#dog "Max" #puppy "Rex"]',
+                         dumps([self.Dog("Max"), self.Puppy("Rex")]))
+
+    def test_override_collection_subclass(self):
+        data = OrderedDict([(1, 2)])
+        self.assertEqual("{1 2}", dumps(data))
+        self.register_encoder(OrderedDict, lambda d: "#ordered {}".format(dumps(list(d.items()))))
+        self.assertEqual("#ordered [(1 2)]", dumps(data))
+
+    def test_number_encoders(self):
+        self.register_encoder(float, lambda f: "#f")
+        self.assertEqual("[#f #f]", dumps([1.5, 2.5]))
+        self.assertEqual("[#f #f]", dumps(array.array("d", [1.5, 2.5])))
+        self.assertEqual("[1 2]", dumps([1, 2]))
+
+    def test_unregister_encoder(self):
+        register_encoder(self.Dog, lambda dog: '#dog "{}"'.format(dog.name))
+        self.assertEqual('#dog "Rex"', dumps(self.Puppy("Rex")))
+        unregister_encoder(self.Dog)
+        # the encoder resolved for the subclass is forgotten too
+        self.assertRaises(NotImplementedError, dumps, self.Puppy("Rex"))
+        self.assertRaises(KeyError, unregister_encoder, self.Dog)
+        self.assertRaises(KeyError, unregister_encoder, self.Puppy)
+
+        data = OrderedDict([(1, 2)])
+        register_encoder(OrderedDict, lambda d: "#ordered")
+        self.assertEqual("#ordered", dumps(data))
+        unregister_encoder(OrderedDict)
+        self.assertEqual("{1 2}", dumps(data))
+
+        # the default encoder of a type is restored
+        register_encoder(float, lambda f: "#float")
+        self.assertEqual("#float", dumps(1.5))
+        unregister_encoder(float)
+        self.assertEqual("1.5", dumps(1.5))
+
+    def test_subclasses(self):
+        class MyStr(unicode):
+            pass
+
+        class MyInt(int):
+            pass
+
+        class MyList(list):
+            pass
+
+        data = MyList([MyStr("a"), MyInt(1), OrderedDict([(MyStr("b"), 2)])])
+        self.assertEqual('["a" 1 {"b" 2}]', dumps(data))
+        # the second time the types are cached
+        self.assertEqual('["a" 1 {"b" 2}]', dumps(data))
+
+    def test_unknown_type(self):
+        with self.assertRaises(NotImplementedError):
+            dumps(self.Dog("Max"))
+
+
+class EncoderTest(unittest.TestCase):
+    data = {"b": [1, {"c": frozenset([3, 2])}], "a": None}
+
+    def test_same_as_dumps(self):
+        for kwargs in ({}, {"indent": 2}, {"sort_keys": True, "sort_sets": True},
+                       {"keyword_keys": True}):
+            encoder = Encoder(**kwargs)
+            self.assertEqual(dumps(self.data, **kwargs), encoder.encode(self.data))
+            self.assertEqual(dumps(self.data, **kwargs),
+                             "".join(encoder.iterencode(self.data)))
+
+    def test_reuse(self):
+        encoder = Encoder(sort_keys=True, sort_sets=True, keyword_keys=True)
+        self.assertEqual('{:a nil :b [1 {:c #{2 3}}]}', encoder.encode(self.data))
+        self.assertEqual('{:a 1 :b 2}', encoder.encode({"b": 2, "a": 1}))
+        self.assertEqual('{:a nil :b [1 {:c #{2 3}}]}', encoder.encode(self.data))
+
+    def test_dump(self):
+        encoder = Encoder(indent=1, output_encoding="latin-1")
+        fp = io.BytesIO()
+        encoder.dump(["\u00e9"], fp)
+        self.assertEqual(b'[\n "\xe9"\n]', fp.getvalue())
+
+    def test_indent_step(self):
+        self.assertEqual("[\n    1\n  ]", Encoder(indent=2).encode([1], indent_step=2))
+
+
 class ImmutableDictTest(unittest.TestCase):
     def test_mutation(self):
         x = ImmutableDict({})
@@ -689,6 +1827,40 @@ class ImmutableDictTest(unittest.TestCase):
 
         self.assertRaises(TypeError, mutate)
 
+    def test_copy(self):
+        d = {"a": 1}
+        self.assertIsNot(d, ImmutableDict(d).dict)
+        self.assertIs(d, ImmutableDict(d, copy=False).dict)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(ImmutableDict({}), "__dict__"))
+
+    def test_hash(self):
+        a = ImmutableDict([(Keyword("a"), 1), (Keyword("b"), (2, 3))])
+        b = ImmutableDict([(Keyword("b"), (2, 3)), (Keyword("a"), 1)])
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(1, len({a, b}))
+        self.assertNotEqual(hash(a), hash(ImmutableDict({Keyword("a"): 1})))
+
+    def test_mapping_methods(self):
+        d = ImmutableDict({"a": 1, "b": 2})
+        self.assertIn("a", d)
+        self.assertNotIn("c", d)
+        self.assertEqual(1, d.get("a"))
+        self.assertIsNone(d.get("c"))
+        self.assertEqual(3, d.get("c", 3))
+        self.assertEqual({"a", "b"}, set(d.keys()))
+        self.assertEqual({("a", 1), ("b", 2)}, set(d.items()))
+        self.assertEqual({1, 2}, set(d.values()))
+
+    def test_pickle(self):
+        d = ImmutableDict({Keyword("a"): ImmutableDict({1: 2})})
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copied = pickle.loads(pickle.dumps(d, protocol))
+            self.assertIsInstance(copied, ImmutableDict)
+            self.assertEqual(d, copied)
+            self.assertEqual(hash(d), hash(copied))
+
 
 class ImmutableListTest(unittest.TestCase):
     def test_list(self):
@@ -702,6 +1874,74 @@ class ImmutableListTest(unittest.TestCase):
         y = ImmutableList([3, 1, 4])
         self.assertTrue(y.sort() == [1, 3, 4])
 
+    def test_tuple_backing(self):
+        items = (1, 2, 3)
+        x = ImmutableList(items)
+        self.assertIs(items, x._items)
+        self.assertFalse(hasattr(x, "__dict__"))
+        # hashing doesn't copy the items
+        self.assertEqual(hash(items), hash(x))
+        self.assertIs(items, x._items)
+
+    def test_copy(self):
+        items = [1, 2]
+        copied = ImmutableList(items)
+        wrapped = ImmutableList(items, copy=False)
+        items.append(3)
+        self.assertEqual([1, 2], copied)
+        self.assertEqual([1, 2, 3], wrapped)
+        self.assertEqual(ImmutableList((1, 2, 3)), wrapped)
+        self.assertEqual(wrapped, ImmutableList((1, 2, 3)))
+        self.assertNotEqual(copied, wrapped)
+        self.assertEqual(hash((1, 2, 3)), hash(wrapped))
+        self.assertEqual([1, 2, 3, 4], wrapped.append(4))
+        self.assertEqual([0, 1, 2, 3], wrapped.insert(0, 0))
+        self.assertEqual([2, 3], wrapped[1:])
+        self.assertIsInstance(pickle.loads(pickle.dumps(wrapped)), ImmutableList)
+        # the items are converted to a tuple once
+        self.assertEqual((1, 2, 3), wrapped._items)
+        items = wrapped._items
+        wrapped.append(4)
+        self.assertIs(items, wrapped._items)
+
+    def test_list_equality(self):
+        nan = float("nan")
+        self.assertEqual([1, nan], ImmutableList((1, nan)))
+        self.assertEqual([1, nan], ImmutableList([1, nan], copy=False))
+        self.assertNotEqual([1, 2], ImmutableList((1, 3)))
+        self.assertNotEqual([1, 2], ImmutableList((1, 2, 3)))
+        self.assertNotEqual([1, 2, 3], ImmutableList((1, 2)))
+
+    def test_equality(self):
+        x = ImmutableList([1, 2, 3])
+        self.assertEqual(x, ImmutableList((1, 2, 3)))
+        self.assertEqual(x, [1, 2, 3])
+        self.assertEqual([1, 2, 3], x)
+        self.assertNotEqual(x, [1, 2])
+        self.assertNotEqual(x, (1, 2, 3))
+        self.assertFalse(x != [1, 2, 3])
+        self.assertEqual(1, len({x, ImmutableList([1, 2, 3])}))
+
+    def test_new_lists(self):
+        x = ImmutableList([3, 1, 2])
+        self.assertEqual([3, 1, 2, 4], x.append(4))
+        self.assertEqual([3, 1, 0, 2], x.insert(-1, 0))
+        self.assertEqual([0, 3, 1, 2], x.insert(-10, 0))
+        self.assertEqual([3, 1, 2, 0], x.insert(10, 0))
+        self.assertEqual([3, 2, 1], x.sort(reverse=True))
+        self.assertEqual([1, 2, 3], x.sort(key=lambda i: -i).sort())
+        self.assertEqual([3, 1, 2], x)
+        self.assertIsInstance(x[1:], list)
+        self.assertEqual([1, 2, 0], x[1:] + [0])
+        self.assertEqual([2, 1, 3], list(reversed(x)))
+
+    def test_pickle(self):
+        x = ImmutableList([Keyword("a"), ImmutableList([1])])
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copied = pickle.loads(pickle.dumps(x, protocol))
+            self.assertIsInstance(copied, ImmutableList)
+            self.assertEqual(x, copied)
+
 
 class CharTest(unittest.TestCase):
     def test_new_ok(self):